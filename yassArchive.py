@@ -0,0 +1,132 @@
+################################################################################
+# File:    yassArchive.py
+# Author:  Ryan Yusko
+#
+# Class that records the pages and csvs we fetch (finviz quote & screener
+# pages, Yahoo! histories) into an archive directory, so that yassFixture.py
+# can replay them later without touching the real sites.  Set record in
+# yassParam.py to the archive directory to record a run.
+#
+# Responses are filed under the last part of the url path plus its sorted
+# query, less the parameters that change from run to run (Yahoo!'s crumb and
+# date range), so a replayed request finds the recording whatever host it was
+# sent to.
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import os, os.path, json, hashlib, threading, urlparse, urllib
+
+class Archive:
+  def_dir = './archive/'   #default archive directory
+  def_index = 'index.json' #name of the archive's index
+
+  #query parameters that aren't part of what was asked for
+  volatile = ('crumb', 'period1', 'period2')
+
+################################################################################
+# __init__(path)
+# Opens (creating if need be) an archive directory.
+#
+# @param path - directory holding the archive
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, path=def_dir):
+    self.path = path
+    self.lock = threading.Lock()
+    if not os.path.exists(path):
+      os.makedirs(path)
+
+    #key -> body file name
+    try:
+      with open(os.path.join(path, Archive.def_index), 'r') as f:
+        self.index = json.load(f)
+    except (IOError, ValueError):
+      self.index = dict()
+
+    #number of responses recorded this run
+    self.recorded = 0
+###############################################################  __init__(path)
+
+
+################################################################################
+# add(url, body)
+# Records a (successful) response body under its url's key, replacing any
+#  earlier recording of it.
+#
+# @param url  - url (or path & query) that was fetched
+# @param body - raw response body
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def add(self, url, body):
+    key = Archive.key(url)
+    name = hashlib.sha1(key).hexdigest() + '.body'
+
+    tmp = os.path.join(self.path, name + '.%i.tmp' % threading.current_thread().ident)
+    with open(tmp, 'wb') as f:
+      f.write(body)
+    os.rename(tmp, os.path.join(self.path, name))
+
+    with self.lock:
+      self.index[key] = name
+      self.recorded += 1
+################################################################  add(url, body)
+
+
+################################################################################
+# find(url)
+# Returns the recorded body for a url, or None if it wasn't recorded.
+#
+# @param url - url (or path & query) to look up
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def find(self, url):
+    with self.lock:
+      name = self.index.get(Archive.key(url))
+    if name is None:
+      return None
+    try:
+      with open(os.path.join(self.path, name), 'rb') as f:
+        return f.read()
+    except IOError:
+      return None
+####################################################################  find(url)
+
+
+################################################################################
+# save()
+# Writes the archive's index to disk.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def save(self):
+    with self.lock:
+      name = os.path.join(self.path, Archive.def_index)
+      with open(name + '.tmp', 'w') as f:
+        json.dump(self.index, f)
+      os.rename(name + '.tmp', name)
+#######################################################################  save()
+
+
+################################################################################
+# key(url) <static>
+# Returns the archive key for a url: the last part of its path and its
+#  sorted query, without the volatile parameters.
+#
+# @param url - full url, or just its path & query
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def key(url):
+    parts = urlparse.urlsplit(url)
+    query = [(k, v) for k, v in urlparse.parse_qsl(parts.query, True)
+             if k not in Archive.volatile]
+    return '%s?%s' % (parts.path.rsplit('/', 1)[-1],
+                      urllib.urlencode(sorted(query)))
+##############################################################  key(url) <static>
+
+#//yassArchive.py
@@ -0,0 +1,266 @@
+################################################################################
+# File:    yassCache.py
+# Author:  Ryan Yusko
+#
+# Class that provides an on-disk HTTP response cache, keyed by url, so that
+# rerunning the screener minutes later does not re-download every page.
+# Entries carry their own TTL, are revalidated with ETag/Last-Modified once
+# stale, and the cache is held under a size limit by evicting the least
+# recently used entries.
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import os, os.path, json, time, hashlib, threading, urllib2
+
+class HttpCache:
+  def_dir = './cache/'                 #default cache directory
+  def_ttl = 15 * 60                    #default time to live (seconds)
+  def_max_bytes = 256 * 1024 * 1024    #default size limit for stored bodies
+
+################################################################################
+# __init__(path, ttl, max_bytes)
+# Initializes the cache, loading the index of stored entries if one exists.
+#
+# @param path      - directory holding the index and response bodies
+# @param ttl       - default time to live for new entries (seconds)
+# @param max_bytes - total size of stored bodies before LRU eviction kicks in
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, path=def_dir, ttl=def_ttl, max_bytes=def_max_bytes):
+    self.path = path
+    self.ttl = ttl
+    self.max_bytes = max_bytes
+    self.lock = threading.Lock()
+
+    if not os.path.exists(self.path):
+      os.makedirs(self.path)
+
+    #index of entries: key -> {url, etag, modified, stored, ttl, size, used}
+    self.index_name = os.path.join(self.path, 'index.json')
+    try:
+      with open(self.index_name, 'r') as f:
+        self.index = json.load(f)
+    except (IOError, ValueError):
+      self.index = dict()
+
+    #drop entries whose body has gone missing
+    for key in self.index.keys():
+      if not os.path.isfile(self.bodyName(key)):
+        del self.index[key]
+
+    self.size = sum(e['size'] for e in self.index.itervalues())
+
+    #counters for reporting
+    self.hits = 0
+    self.revalidated = 0
+    self.misses = 0
+#####################################################  __init__(path, ttl, ...)
+
+
+################################################################################
+# fetch(url, getter, ttl)
+# Returns the body for url, from the cache when the entry is still fresh.  A
+#  stale entry is revalidated with a conditional request (fetched again in
+#  full if its body has gone by the time the server answers 304), and
+#  anything else is fetched and stored.
+#
+# @param url    - full url to retrieve
+# @param getter - function(url, headers) returning (status, headers, body),
+#                 headers being a dict with lowercase keys (ConnPool.request
+#                 fits, as does HttpCache.urllibGet)
+# @param ttl    - time to live for this entry; defaults to the cache's ttl
+#
+# @return (status, body) - status is 200 for cache hits and revalidations
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def fetch(self, url, getter, ttl=None):
+    key = HttpCache.key(url)
+    now = time.time()
+
+    with self.lock:
+      entry = self.index.get(key)
+      if entry is not None and now - entry['stored'] < entry['ttl']:
+        entry['used'] = now
+        self.hits += 1
+        return 200, self.read(key)
+
+    #stale or missing...ask the server, conditionally if we can
+    headers = dict()
+    if entry is not None:
+      if entry['etag']:
+        headers['If-None-Match'] = entry['etag']
+      if entry['modified']:
+        headers['If-Modified-Since'] = entry['modified']
+
+    status, hdrs, body = getter(url, headers)
+
+    if status == 304 and entry is not None:
+      #the entry may have been evicted (or replaced by another thread) while
+      # we were asking; without a body, ask again for the whole page
+      with self.lock:
+        if key in self.index:
+          if self.index[key] is entry:
+            entry['stored'] = entry['used'] = now
+          try:
+            body = self.read(key)
+            self.revalidated += 1
+            return 200, body
+          except IOError:
+            pass
+      status, hdrs, body = getter(url, dict())
+
+    with self.lock:
+      self.misses += 1
+    if status == 200:
+      self.store(url, hdrs, body, ttl)
+    return status, body
+#####################################################  fetch(url, getter, ttl)
+
+
+################################################################################
+# store(url, headers, body, ttl)
+# Writes a response body to the cache and records its validators, evicting
+#  least recently used entries if the cache has grown past max_bytes.
+#
+# @param url     - url the body was retrieved from
+# @param headers - response headers (lowercase keys)
+# @param body    - response body
+# @param ttl     - time to live for this entry; defaults to the cache's ttl
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def store(self, url, headers, body, ttl=None):
+    key = HttpCache.key(url)
+    now = time.time()
+
+    #write to a temporary name first so readers never see a partial body
+    tmp = self.bodyName(key) + '.%i.tmp' % threading.current_thread().ident
+    with open(tmp, 'wb') as f:
+      f.write(body)
+    os.rename(tmp, self.bodyName(key))
+
+    with self.lock:
+      old = self.index.get(key)
+      if old is not None:
+        self.size -= old['size']
+      self.index[key] = {'url' : url,
+                         'etag' : headers.get('etag'),
+                         'modified' : headers.get('last-modified'),
+                         'stored' : now,
+                         'used' : now,
+                         'ttl' : self.ttl if ttl is None else ttl,
+                         'size' : len(body)}
+      self.size += len(body)
+
+      if self.size > self.max_bytes:
+        self.evict()
+#######################################################  store(url, body, ...)
+
+
+################################################################################
+# evict()
+# Removes least recently used entries until the cache is back under 90% of
+#  max_bytes (the slack keeps us from evicting on every store).
+# Caller must hold self.lock.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def evict(self):
+    target = int(self.max_bytes * 0.9)
+    for key in sorted(self.index, key=lambda k: self.index[k]['used']):
+      if self.size <= target:
+        break
+      self.size -= self.index[key]['size']
+      del self.index[key]
+      try:
+        os.remove(self.bodyName(key))
+      except OSError:
+        pass
+#######################################################################  evict()
+
+
+################################################################################
+# read(key) / bodyName(key)
+# Reads a stored body, and returns the path of the file holding it.
+#
+# @param key - cache key, as returned by HttpCache.key(url)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def read(self, key):
+    with open(self.bodyName(key), 'rb') as f:
+      return f.read()
+
+  def bodyName(self, key):
+    return os.path.join(self.path, key + '.body')
+######################################################  read() / bodyName(key)
+
+
+################################################################################
+# save()
+# Writes the index to disk; called once a run has finished with the cache.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def save(self):
+    with self.lock:
+      tmp = self.index_name + '.tmp'
+      with open(tmp, 'w') as f:
+        json.dump(self.index, f)
+      os.rename(tmp, self.index_name)
+########################################################################  save()
+
+
+################################################################################
+# summary()
+# Returns a one-line summary of cache activity, for logging.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def summary(self):
+    return '%i hits, %i revalidated, %i fetched, %i entries (%.1f MB)' % \
+              (self.hits, self.revalidated, self.misses, len(self.index),
+               self.size / (1024.0 * 1024.0))
+#####################################################################  summary()
+
+
+################################################################################
+# key(url) <static>
+# Returns the cache key (sha1 hex digest) for a url.
+#
+# @param url - url to hash
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def key(url):
+    return hashlib.sha1(url).hexdigest()
+##############################################################  key(url) <static>
+
+
+################################################################################
+# urllibGet(url, headers) <static>
+# Getter for fetch() that uses a fresh urllib2 connection, for callers that
+#  are not using a ConnPool.  HTTP errors (including 304) are returned as a
+#  status rather than raised; network errors still raise IOError.
+#
+# @param url     - full url to retrieve
+# @param headers - dict of extra request headers
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def urllibGet(url, headers):
+    req = urllib2.Request(url, headers=headers)
+    try:
+      resp = urllib2.urlopen(req)
+    except urllib2.HTTPError as he:
+      return he.code, dict(), ''
+    hdrs = dict((k.lower(), v) for k, v in resp.info().items())
+    return resp.getcode(), hdrs, resp.read()
+###############################################  urllibGet(url, headers) <static>
+
+#//yassCache.py
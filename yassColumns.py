@@ -0,0 +1,257 @@
+################################################################################
+# File:    yassColumns.py
+# Author:  Ryan Yusko
+#
+# Columnar store of the daily histories, so nothing that reads them has to
+# parse csv text.  Every symbol's series is kept in one consolidated store
+# (./hist/columns/): one raw binary file per column -- the date as an int32
+# date ordinal, open/high/low/close/adj close as float64 and the volume as
+# int64 -- with each symbol's rows contiguous and in date order, and an index
+# (index.json) of where each symbol's rows start and stop.  Opening the store
+# memory-maps the columns, so loading thousands of symbols costs a few file
+# opens and the index, and a symbol's series is a slice of each column.
+#
+# yassHistory writes the store directly (set history_format = 'columns' in
+# yassParam.py).  A store is written whole, to a new directory that then
+# replaces the old one, so readers never see a half-written store.
+#
+# Running this file converts the csvs in a history directory to a store and
+# times loading it back:
+#   python yassColumns.py {hist=./hist/}
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import sys, os, os.path, json, shutil, time, datetime, gzip
+import numpy as np
+
+class Columns:
+  def_path = './hist/columns/' #default store directory
+  format = 1                   #version of the store's layout
+
+  #the columns, in the order of the csv's fields
+  fields = [('date', np.int32), ('open', np.float64), ('high', np.float64),
+            ('low', np.float64), ('close', np.float64),
+            ('adj_close', np.float64), ('volume', np.int64)]
+
+################################################################################
+# __init__(path)
+# Opens the store (memory-mapped, read only).  A store that doesn't exist yet
+#  is empty.
+#
+# @param path - store directory
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, path=def_path):
+    self.path = os.path.join(path, '')
+    self.index = dict()
+    self.columns = dict()
+    rows = 0
+    try:
+      with open(self.path + 'index.json', 'r') as f:
+        saved = json.load(f)
+      if saved['format'] == Columns.format:
+        self.index = dict((sym, tuple(span))
+                          for sym, span in saved['symbols'].iteritems())
+        rows = saved['rows']
+    except (IOError, ValueError, KeyError):
+      self.index = dict()
+
+    for name, kind in Columns.fields:
+      if rows > 0:
+        #plain array views of the maps slice faster than the maps do
+        self.columns[name] = np.memmap(self.path + name, dtype=kind,
+                                       mode='r', shape=(rows,)) \
+                               .view(np.ndarray)
+      else:
+        self.columns[name] = np.zeros(0, dtype=kind)
+####################################################################  __init__(path)
+
+
+################################################################################
+# series(sym) / span(sym)
+# Returns a symbol's series, as a dict of column name -> array (slices of the
+#  memory-mapped columns, nothing is copied), or None if it isn't stored;
+#  and the first & last days (date objects) stored for it, or None.
+#
+# @param sym - symbol (as its history is named, without '^')
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def series(self, sym):
+    if sym not in self.index:
+      return None
+    start, stop = self.index[sym]
+    return dict((name, self.columns[name][start:stop])
+                for name, kind in Columns.fields)
+
+  def span(self, sym):
+    if sym not in self.index or self.index[sym][0] == self.index[sym][1]:
+      return None
+    start, stop = self.index[sym]
+    dates = self.columns['date']
+    return (datetime.date.fromordinal(int(dates[start])),
+            datetime.date.fromordinal(int(dates[stop - 1])))
+#############################################################  series() / span()
+
+
+################################################################################
+# write(updates)
+# Writes a new store holding the passed series plus every stored series they
+#  don't replace, then reopens it.
+#
+# @param updates - dict of symbol -> series (dict of column name -> array,
+#                  in date order) to store in full
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def write(self, updates):
+    syms = sorted(set(self.index) | set(updates))
+    parts = dict((name, []) for name, kind in Columns.fields)
+    spans = dict()
+    rows = 0
+    for sym in syms:
+      series = updates[sym] if sym in updates else self.series(sym)
+      n = len(series['date'])
+      for name, kind in Columns.fields:
+        parts[name].append(np.asarray(series[name], dtype=kind))
+      spans[sym] = (rows, rows + n)
+      rows += n
+
+    #write the new store alongside, then swap it in
+    tmp = self.path.rstrip('/') + '.tmp/'
+    old = self.path.rstrip('/') + '.old/'
+    for d in (tmp, old):
+      if os.path.exists(d):
+        shutil.rmtree(d)
+    os.makedirs(tmp)
+    for name, kind in Columns.fields:
+      column = np.concatenate(parts[name]) if parts[name] else \
+                 np.zeros(0, dtype=kind)
+      column.tofile(tmp + name)
+    with open(tmp + 'index.json', 'w') as f:
+      json.dump({'format' : Columns.format, 'rows' : rows,
+                 'symbols' : spans}, f)
+
+    if os.path.exists(self.path):
+      os.rename(self.path, old)
+    os.rename(tmp, self.path)
+    if os.path.exists(old):
+      shutil.rmtree(old)
+
+    self.__init__(self.path)
+    return rows
+################################################################  write(updates)
+
+
+################################################################################
+# parse(text) / merge(old, new) <static>
+# Parses a Yahoo! history csv into a series (rows with missing values, which
+#  Yahoo! marks 'null', are dropped; duplicate dates keep the last row), and
+#  merges two series by date, the new one's rows replacing the old one's for
+#  the same date.
+#
+# @param text - csv text, header & rows
+# @param old  - stored series, or None
+# @param new  - downloaded series
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def parse(text):
+    rows = dict()
+    for line in text.splitlines()[1:]:
+      cols = line.strip().split(',')
+      if len(cols) < len(Columns.fields) or 'null' in cols:
+        continue
+      try:
+        day = datetime.date(int(cols[0][0:4]), int(cols[0][5:7]),
+                            int(cols[0][8:10])).toordinal()
+        rows[day] = [float(c) for c in cols[1:6]] + [int(float(cols[6]))]
+      except ValueError:
+        continue
+
+    days = sorted(rows)
+    series = {'date' : np.array(days, dtype=np.int32)}
+    for i, (name, kind) in enumerate(Columns.fields[1:]):
+      series[name] = np.array([rows[d][i] for d in days], dtype=kind)
+    return series
+
+  @staticmethod
+  def merge(old, new):
+    if old is None or len(old['date']) == 0:
+      return new
+    keep = ~np.in1d(old['date'], new['date'])
+    order = np.argsort(np.concatenate((old['date'][keep], new['date'])),
+                       kind='mergesort')
+    return dict((name, np.concatenate((old[name][keep], new[name]))[order])
+                for name, kind in Columns.fields)
+#################################################  parse() / merge() <static>
+
+
+################################################################################
+# convert(prefix, path) <static>
+# Builds a store from the csvs (or gzipped csvs) in a history directory
+#  (replacing what's stored for those symbols); csvs without any history
+#  rows are skipped.
+#
+# @param prefix - directory of SYM.csv (or SYM.csv.gz) histories
+# @param path   - store directory
+#
+# @return the store
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def convert(prefix='./hist/', path=None):
+    store = Columns(path or os.path.join(prefix, 'columns'))
+    updates = dict()
+    for name in sorted(os.listdir(prefix)):
+      if name.endswith('.csv'):
+        with open(os.path.join(prefix, name), 'rb') as f:
+          series = Columns.parse(f.read())
+        sym = name[:-4]
+      elif name.endswith('.csv.gz'):
+        with gzip.open(os.path.join(prefix, name), 'rb') as f:
+          series = Columns.parse(f.read())
+        sym = name[:-7]
+      else:
+        continue
+      #a csv without a single history row in it (e.g. the status report
+      # older runs left in hist/) isn't a symbol's history
+      if len(series['date']) > 0:
+        updates[sym] = series
+    store.write(updates)
+    return store
+##########################################################  convert(...) <static>
+
+
+################################################################################
+# __main__
+# Converts the csvs in a history directory (./hist/ by default) and reports
+#  how long that took (mostly parsing), against opening the store they went
+#  into and slicing out every series.
+#
+# @created 10/18/26
+# @updated 10/18/26
+if __name__ == '__main__':
+  prefix = sys.argv[1] if len(sys.argv) > 1 else './hist/'
+
+  start = time.time()
+  store = Columns.convert(prefix)
+  converted = time.time() - start
+
+  start = time.time()
+  store = Columns(store.path)
+  opened = time.time() - start
+  closes = [store.series(sym)['close'] for sym in store.index]
+  sliced = time.time() - start - opened
+
+  print 'converted %i histories (%i rows) in %.3fs' % \
+          (len(store.index), len(store.columns['date']), converted)
+  print 'opened the store in %.2f ms, sliced every series in %.2f ms' % \
+          (1000.0 * opened, 1000.0 * sliced)
+######################################################################  __main__
+
+#//yassColumns.py
@@ -0,0 +1,205 @@
+################################################################################
+# File:    yassConn.py
+# Author:  Ryan Yusko
+#
+# Class that provides a bounded pool of persistent (keep-alive) HTTP/HTTPS
+# connections, shared by worker threads so that each symbol does not pay for
+# a fresh TCP+TLS handshake.
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import httplib, urlparse, threading, socket, zlib
+
+################################################################################
+# class StatusError
+# IOError raised for a non-200 response, carrying the HTTP status so callers
+#  (e.g. the Scheduler) can tell throttling apart from other failures.
+#
+# @created 10/18/26
+# @updated 10/18/26
+class StatusError(IOError):
+  def __init__(self, status, url):
+    IOError.__init__(self, 'HTTP %i for %s' % (status, url))
+    self.status = status
+############################################################  class StatusError
+
+
+class ConnPool:
+  def_size = 20     #default maximum number of open connections per host
+  def_timeout = 30  #default socket timeout (seconds)
+
+  #sent with every request; finviz rejects the default urllib agent
+  def_headers = {'User-Agent' : 'Mozilla/5.0 (yass)',
+                 'Accept-Encoding' : 'gzip',
+                 'Connection' : 'keep-alive'}
+
+################################################################################
+# __init__(size, timeout)
+# Initializes an empty pool.  Connections are opened lazily, up to size per
+# host, and handed back to the pool after each response has been read.
+#
+# @param size    - maximum number of open connections per host
+# @param timeout - socket timeout for each connection (seconds)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, size=def_size, timeout=def_timeout):
+    self.size = size
+    self.timeout = timeout
+
+    #idle connections and connection slots, keyed by (scheme, host)
+    self.idle = dict()
+    self.slots = dict()
+    self.lock = threading.Lock()
+
+    #counters for reporting connection reuse
+    self.opened = 0
+    self.requests = 0
+##########################################################  __init__(size, ...)
+
+
+################################################################################
+# request(url, headers)
+# Performs a GET on the passed url over a pooled connection.  A stale
+#  keep-alive connection (closed by the server while idle) is retried once on
+#  a fresh connection.  Network failures are raised as IOError so callers can
+#  treat them like urllib failures.
+#
+# @param url     - full url to retrieve
+# @param headers - optional dict of extra request headers
+#
+# @return (status, headers, body) - headers is a dict with lowercase keys and
+#                                   body is the (decompressed) response body
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def request(self, url, headers=None):
+    parts = urlparse.urlsplit(url)
+    key = (parts.scheme, parts.netloc)
+    path = parts.path or '/'
+    if parts.query:
+      path += '?' + parts.query
+
+    hdrs = dict(ConnPool.def_headers)
+    if headers:
+      hdrs.update(headers)
+
+    slot = self.slot(key)
+    slot.acquire()
+    try:
+      for attempt in range(2):
+        #the retry goes over a new connection, not another idle one that may
+        # be just as stale
+        conn, reused = self.checkout(key, fresh=attempt > 0)
+        try:
+          conn.request('GET', path, headers=hdrs)
+          resp = conn.getresponse()
+          body = resp.read()
+        except (httplib.HTTPException, socket.error) as e:
+          conn.close()
+          #only a reused connection gets a second chance
+          if reused and attempt == 0:
+            continue
+          raise IOError('request failed for %s: %r' % (url, e))
+
+        with self.lock:
+          self.requests += 1
+
+        #return the connection unless the server asked us to close it
+        if resp.will_close:
+          conn.close()
+        else:
+          self.checkin(key, conn)
+        break
+    finally:
+      slot.release()
+
+    rhdrs = dict((k.lower(), v) for k, v in resp.getheaders())
+    if rhdrs.get('content-encoding', '') == 'gzip':
+      body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+
+    return resp.status, rhdrs, body
+##########################################################  request(url, ...)
+
+
+################################################################################
+# get(url)
+# Convenience wrapper around request() that returns only the body, raising a
+#  StatusError for anything other than a 200 response.
+#
+# @param url - full url to retrieve
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def get(self, url):
+    status, hdrs, body = self.request(url)
+    if status != 200:
+      raise StatusError(status, url)
+    return body
+#####################################################################  get(url)
+
+
+################################################################################
+# slot(key)
+# Returns the semaphore bounding the number of connections open to a host.
+#
+# @param key - (scheme, host) tuple
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def slot(self, key):
+    with self.lock:
+      if key not in self.slots:
+        self.slots[key] = threading.BoundedSemaphore(self.size)
+        self.idle[key] = []
+      return self.slots[key]
+####################################################################  slot(key)
+
+
+################################################################################
+# checkout(key, fresh) / checkin(key, conn)
+# Takes an idle connection for the host out of the pool (opening a new one if
+#  none are idle, or if a fresh one is asked for), and hands it back
+#  afterwards.
+#
+# @param key   - (scheme, host) tuple
+# @param fresh - True to open a new connection even if some are idle
+# @param conn  - connection being returned to the pool
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def checkout(self, key, fresh=False):
+    with self.lock:
+      if self.idle[key] and not fresh:
+        return self.idle[key].pop(), True
+      self.opened += 1
+
+    scheme, host = key
+    if scheme == 'https':
+      conn = httplib.HTTPSConnection(host, timeout=self.timeout)
+    else:
+      conn = httplib.HTTPConnection(host, timeout=self.timeout)
+    return conn, False
+
+  def checkin(self, key, conn):
+    with self.lock:
+      self.idle[key].append(conn)
+#######################################################  checkout() / checkin()
+
+
+################################################################################
+# close()
+# Closes every idle connection in the pool.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def close(self):
+    with self.lock:
+      for key in self.idle:
+        for conn in self.idle[key]:
+          conn.close()
+        self.idle[key] = []
+#######################################################################  close()
+
+#//yassConn.py
@@ -0,0 +1,262 @@
+################################################################################
+# File:    yassDaily.py
+# Author:  Ryan Yusko
+#
+# Per-day sentiment aggregates of the mined documents, so Rank can weight
+# recent news above old news.  Each line of a symbol's document (a rating or
+# a headline) starts with its finviz date; the lines of each day are scored
+# together and the day's score & token count are kept in a SQLite file
+# (./docs/daily.db), once.  A document that hasn't changed since is skipped,
+# and one that has only been appended to (incremental mining) only has its
+# new lines scored.
+#
+# Rankings are read off prefix sums of the daily scores: a fixed window (the
+# last 1, 7, 30... days) is the difference of two prefix sums, and an
+# exponentially decayed sum (by half-life, in days) is a prefix sum of the
+# scores scaled by each day's weight.  Changing the window or the half-life
+# only recomputes the sums, not the scores.
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import os.path, re, sqlite3, hashlib, bisect
+from datetime import datetime
+
+class Daily:
+  def_name = './docs/daily.db' #default aggregates file
+
+  #the date each line of a mined document starts with
+  date_re = re.compile(r'^([A-Z][a-z]{2}-\d\d-\d\d), ')
+
+################################################################################
+# __init__(scorer, name)
+# Opens (creating if need be) the aggregates for the passed scorer.  Those
+#  computed by any other scorer version are dropped.
+#
+# @param scorer - scorer (yassScore.py, yassPhrase.py or yassMemo.py) for
+#                 the lines not aggregated yet
+# @param name   - aggregates file
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, scorer, name=def_name):
+    self.scorer = scorer
+    self.name = name
+    self.version = scorer.version
+
+    if not os.path.exists(os.path.dirname(name) or '.'):
+      os.makedirs(os.path.dirname(name))
+    self.db = sqlite3.connect(name, timeout=30)
+    with self.db:
+      #day is a date ordinal, 0 for lines without a date
+      self.db.execute('CREATE TABLE IF NOT EXISTS days (symbol TEXT, day '
+                      'INTEGER, score REAL, tokens INTEGER, PRIMARY KEY '
+                      '(symbol, day))')
+      #what each symbol's aggregates were computed from
+      self.db.execute('CREATE TABLE IF NOT EXISTS sources (symbol TEXT '
+                      'PRIMARY KEY, digest TEXT, size INTEGER, version TEXT)')
+      if self.db.execute('SELECT 1 FROM sources WHERE version != ? LIMIT 1',
+                         (self.version,)).fetchone():
+        self.db.execute('DELETE FROM days')
+        self.db.execute('DELETE FROM sources')
+
+    #documents unchanged, appended to & scored in full, and lines scored
+    self.counts = {'same' : 0, 'appended' : 0, 'scored' : 0, 'lines' : 0}
+##################################################  __init__(scorer, name)
+
+
+################################################################################
+# update(sym, text)
+# Brings a symbol's aggregates up to date with its (utf-8) document: skips it
+#  if it's unchanged, scores only what's been appended if the start of it is
+#  what was aggregated last time, and rescores all of it otherwise.
+#
+# @param sym  - symbol (as its document is named)
+# @param text - the symbol's mined document
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def update(self, sym, text):
+    row = self.db.execute('SELECT digest, size FROM sources WHERE symbol = ?',
+                          (sym,)).fetchone()
+    digest = hashlib.sha1(text).hexdigest()
+    if row is not None and row[0] == digest:
+      self.counts['same'] += 1
+      return
+
+    if row is not None and len(text) > row[1] and \
+       hashlib.sha1(text[:row[1]]).hexdigest() == row[0]:
+      days = self.aggregate(text[row[1]:])
+      found = dict((d, (s, t)) for d, s, t in self.db.execute(
+                     'SELECT day, score, tokens FROM days WHERE symbol = ?',
+                     (sym,)) if d in days)
+      for d, (s, t) in found.iteritems():
+        days[d] = (days[d][0] + s, days[d][1] + t)
+      self.counts['appended'] += 1
+    else:
+      days = self.aggregate(text)
+      self.db.execute('DELETE FROM days WHERE symbol = ?', (sym,))
+      self.counts['scored'] += 1
+
+    self.db.executemany('INSERT OR REPLACE INTO days VALUES (?, ?, ?, ?)',
+                        [(sym, d, s, t) for d, (s, t) in days.iteritems()])
+    self.db.execute('INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)',
+                    (sym, digest, len(text), self.version))
+################################################################  update(sym, text)
+
+
+################################################################################
+# aggregate(text)
+# Scores the lines of a document by day: the lines of each day are scored
+#  together.
+#
+# @param text - utf-8 lines, each starting with its finviz date
+#
+# @return dict of day (date ordinal, 0 for none) -> (score, tokens)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def aggregate(self, text):
+    lines = dict()
+    for line in text.splitlines(True):
+      if len(line.strip()) == 0:
+        continue
+      found = Daily.date_re.match(line)
+      day = Daily.ordinal(found.group(1)) if found else 0
+      lines.setdefault(day, []).append(line)
+      self.counts['lines'] += 1
+
+    return dict((day, self.scorer.score(''.join(group)))
+                for day, group in lines.iteritems())
+##############################################################  aggregate(text)
+
+
+################################################################################
+# rank(syms, asof, window, half_life)
+# Ranks symbols from their daily aggregates, up to & including a day: over
+#  the last window days, with each day's score decayed by its age (halving
+#  every half_life days), or both.  With neither, every dated day counts in
+#  full.
+#
+# @param syms      - symbols to rank
+# @param asof      - date to rank as of
+# @param window    - number of days (1 for just asof), or None for all
+# @param half_life - days for a score to decay to half, or None for no decay
+#
+# @return dict of symbol -> (score, tokens); tokens aren't decayed
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def rank(self, syms, asof, window=None, half_life=None):
+    table = dict((sym, (0, 0)) for sym in syms)
+    for sym, series in self.series(syms).iteritems():
+      table[sym] = series.total(asof.toordinal(), window, half_life)
+    return table
+###############################################  rank(syms, asof, window, ...)
+
+
+################################################################################
+# series(syms)
+# Reads the dated aggregates of the passed symbols.
+#
+# @param syms - symbols to read
+#
+# @return dict of symbol -> Series
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def series(self, syms):
+    wanted = set(syms)
+    rows = dict()
+    for sym, day, score, tokens in self.db.execute(
+          'SELECT symbol, day, score, tokens FROM days WHERE day > 0 '
+          'ORDER BY symbol, day'):
+      if sym in wanted:
+        rows.setdefault(sym, []).append((day, score, tokens))
+    return dict((sym, Series(r)) for sym, r in rows.iteritems())
+################################################################  series(syms)
+
+
+################################################################################
+# close()
+# Commits the aggregates and closes the file.  Returns a summary for logging.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def close(self):
+    self.db.commit()
+    self.db.close()
+    return '%(same)i documents unchanged, %(appended)i appended to, ' \
+           '%(scored)i scored in full; %(lines)i lines scored' % self.counts
+#######################################################################  close()
+
+
+################################################################################
+# ordinal(date) / days(window) <static>
+# Helpers: a finviz date (e.g. 'Dec-18-17') as a date ordinal, or 0 for
+#  finviz's placeholder; and a window given as days or e.g. '7d' in days.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def ordinal(finviz):
+    try:
+      return datetime.strptime(finviz, '%b-%d-%y').toordinal()
+    except ValueError:
+      return 0
+
+  @staticmethod
+  def days(window):
+    if window is None:
+      return None
+    if isinstance(window, basestring):
+      window = window.strip().lower().rstrip('d')
+    return int(window)
+###################################################  ordinal() / days() <static>
+
+
+################################################################################
+# class Series
+# A symbol's daily scores with their prefix sums, so the total over any run
+#  of days is two lookups.  Prefix sums of decayed scores are built the first
+#  time a half-life is asked for, and kept.
+#
+# @created 10/18/26
+# @updated 10/18/26
+class Series:
+  def __init__(self, rows):
+    self.days = [r[0] for r in rows]
+    self.scores = [r[1] for r in rows]
+    self.plain = Series.prefix(self.scores)
+    self.tokens = Series.prefix([r[2] for r in rows])
+    self.decayed = dict()
+
+  #(score, tokens) over the days up to & including asof (an ordinal)
+  def total(self, asof, window=None, half_life=None):
+    hi = bisect.bisect_right(self.days, asof)
+    lo = 0 if window is None else bisect.bisect_right(self.days, asof - window)
+    if half_life is None:
+      score = self.plain[hi] - self.plain[lo]
+    else:
+      #weights are relative to the last day, so none of them overflows, and
+      # are rescaled to asof
+      if half_life not in self.decayed:
+        last = self.days[-1]
+        self.decayed[half_life] = Series.prefix(
+          s * 0.5 ** (float(last - d) / half_life)
+          for d, s in zip(self.days, self.scores))
+      prefix = self.decayed[half_life]
+      score = (prefix[hi] - prefix[lo]) * \
+                0.5 ** (float(asof - self.days[-1]) / half_life)
+    return score, self.tokens[hi] - self.tokens[lo]
+
+  #running sums, starting from 0
+  @staticmethod
+  def prefix(values):
+    out = [0]
+    for v in values:
+      out.append(out[-1] + v)
+    return out
+####################################################################  class Series
+
+#//yassDaily.py
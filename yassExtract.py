@@ -0,0 +1,192 @@
+################################################################################
+# File:    yassExtract.py
+# Author:  Ryan Yusko
+#
+# Fast-path extractor for finviz quote pages.  Rather than building a tree,
+# the raw html is scanned once with regular expressions for the analyst
+# ratings and the news table.  If the page doesn't look the way we expect,
+# extract() returns None and FinOne falls back to BeautifulSoup.
+#
+# Run this file against a directory of saved quote pages to compare the fast
+# path with the soup path page by page (differential mode):
+#   python yassExtract.py {corpus=./corpus/}
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import sys, os, os.path, re, HTMLParser
+from bs4 import UnicodeDammit
+
+class FastExtract:
+  #class attribute must be exactly (or contain the word) fullview-ratings-inner;
+  # the cells inside are fullview-ratings-inner-cell, which must not match
+  rate_re = re.compile(r'<td[^>]*\sclass="(?:[^"]*\s)?fullview-ratings-inner'
+                       r'(?:\s[^"]*)?"[^>]*>(.*?)</table>', re.S | re.I)
+  news_re = re.compile(r'<table[^>]*\sid="news-table"[^>]*>(.*?)</table>',
+                       re.S | re.I)
+  row_re = re.compile(r'<tr[\s>].*?</tr>', re.S | re.I)
+  cell_re = re.compile(r'<td[^>]*>(.*?)</td>', re.S | re.I)
+  link_re = re.compile(r'<a\s[^>]*?href="([^"]*)"[^>]*>(.*?)</a>', re.S | re.I)
+  span_re = re.compile(r'<span[^>]*>(.*?)</span>', re.S | re.I)
+  tag_re = re.compile(r'<[^>]*>')
+
+  parser = HTMLParser.HTMLParser()
+
+################################################################################
+# extract(html) <static>
+# Scans a quote page for its ratings and news.
+#
+# @param html - raw html of a finviz quote page
+#
+# @return (rate, news) in the same form as FinOne.rate and FinOne.news, or
+#         None if the page structure isn't recognised
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def extract(html):
+    if not isinstance(html, unicode):
+      html = UnicodeDammit(html, is_html=True).unicode_markup
+      if html is None:
+        return None
+
+    rate = list()
+    for block in FastExtract.rate_re.findall(html):
+      rows = FastExtract.row_re.findall(block)
+      if len(rows) == 0:
+        return None
+      for row in rows:
+        cols = [FastExtract.text(c) for c in FastExtract.cell_re.findall(row)]
+        if len(cols) >= 4:
+          rate.append([cols[0], cols[1], cols[3], cols[2],
+                       cols[4] if len(cols) > 4 else u''])
+
+    #no news table at all means this isn't a page we know
+    tables = FastExtract.news_re.findall(html)
+    if len(tables) == 0:
+      return None
+
+    news = list()
+    date = u'Jan-00-00'
+    for table in tables:
+      rows = FastExtract.row_re.findall(table)
+
+      #nested tables or unclosed rows would confuse the scan
+      if '<table' in table or len(rows) != table.count('<tr'):
+        return None
+
+      for row in rows:
+        cell = FastExtract.cell_re.search(row)
+        link = FastExtract.link_re.search(row)
+        if cell is None or link is None:
+          return None
+
+        stamp = FastExtract.text(cell.group(1))
+        if len(stamp) == 0 or len(stamp.split()) == 0:
+          return None
+        if stamp[0].isalpha():
+          date = stamp.split(' ')[0]
+
+        span = FastExtract.span_re.search(row)
+        if span is not None:
+          source = FastExtract.text(span.group(1)).strip()
+        else:
+          source = u''
+
+        news.append([date, FastExtract.text(link.group(2)), stamp.split()[-1],
+                     FastExtract.parser.unescape(link.group(1)), source])
+
+    return rate, news
+#####################################################  extract(html) <static>
+
+
+################################################################################
+# text(fragment) <static>
+# Returns the text of an html fragment: tags dropped and entities decoded,
+#  which is what BeautifulSoup's .text gives for the same fragment.
+#
+# @param fragment - unicode html fragment
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def text(fragment):
+    return FastExtract.parser.unescape(FastExtract.tag_re.sub(u'', fragment))
+###################################################  text(fragment) <static>
+
+
+################################################################################
+# differential(pages) <static>
+# Runs both the fast and the soup extractors over each page and reports any
+#  disagreement, along with how many pages the fast path didn't recognise
+#  (those fall back to the soup in production, so they can't disagree).
+#
+# @param pages - list of (name, raw html) pairs
+#
+# @return number of pages where the extractors disagree
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def differential(pages):
+    from yassFinOne import FinOne
+
+    bad = 0
+    fallback = 0
+    for name, html in pages:
+      soup = FinOne()
+      try:
+        soup.parseSoup(html)
+      except Exception as e:
+        print '%s: soup extractor failed (%r); skipping' % (name, e)
+        continue
+
+      found = FastExtract.extract(html)
+      if found is None:
+        fallback += 1
+        continue
+
+      rate, news = found
+      for what, mine, theirs in (('rating', rate, soup.rate),
+                                 ('news', news, soup.news)):
+        if mine == theirs:
+          continue
+        bad += 1
+        print '%s: %s disagrees (fast %i rows, soup %i rows)' % \
+                (name, what, len(mine), len(theirs))
+        for i in range(max(len(mine), len(theirs))):
+          a = mine[i] if i < len(mine) else None
+          b = theirs[i] if i < len(theirs) else None
+          if a != b:
+            print '  row %i\n    fast: %r\n    soup: %r' % (i, a, b)
+            break
+        break
+
+    print 'compared %i pages: %i disagree, %i fell back to soup' % \
+            (len(pages), bad, fallback)
+    return bad
+##################################################  differential(pages) <static>
+
+
+################################################################################
+# __main__
+# Differential mode: compares the extractors over a saved page corpus (every
+#  file in the passed directory, ./corpus/ by default).  Exits non-zero if
+#  they disagree on any page.
+#
+# @created 10/18/26
+# @updated 10/18/26
+if __name__ == '__main__':
+  corpus = sys.argv[1] if len(sys.argv) > 1 else './corpus/'
+  pages = list()
+  for name in sorted(os.listdir(corpus)):
+    path = os.path.join(corpus, name)
+    if os.path.isfile(path):
+      with open(path, 'rb') as f:
+        pages.append((name, f.read()))
+
+  if FastExtract.differential(pages) > 0:
+    exit(1)
+######################################################################  __main__
+
+#//yassExtract.py
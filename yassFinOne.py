@@ -6,13 +6,42 @@
 #
 # @created 12/16/17
 # @updated 12/18/17 - Added base url retrieval method for building html
+# @updated 10/18/26 - Split parsing out of retrieve(); optional pooled fetch
+# @updated 10/18/26 - Partial-parse extraction profiles & parse benchmark
+# @updated 10/18/26 - Regex fast-path extractor (yassExtract.py); news rows
+#                     now carry time, link & source
 ################################################################################
-import urllib
-from bs4 import BeautifulSoup
+import urllib, sys, time
+from bs4 import BeautifulSoup, SoupStrainer
+from yassCache import HttpCache
+from yassConn import StatusError
+from yassExtract import FastExtract
 
 class FinOne:
   base_url = "https://finviz.com/quote.ashx?t=ZZZZ&ty=c&ta=1&p=d&b=1"
   
+  #extraction profiles: the regions of the quote page that get materialised
+  # while parsing, as (tag name, {attribute : value}) pairs.  'full' builds
+  # the whole tree.  Add regions (or profiles) here to extract more.
+  profiles = {'full' : None,
+              'quote' : [('td', {'class' : 'fullview-ratings-inner'}),
+                         ('table', {'id' : 'news-table'})],
+              'screener' : [('td', {'class' : 'table-top-h'}),
+                            ('td', {'class' : 'table-top-s'}),
+                            ('td', {'class' : 'table-top'}),
+                            ('tr', {'class' : 'table-dark-row-cw'}),
+                            ('tr', {'class' : 'table-light-row-cw'})]}
+  def_profile = 'quote'
+  
+  #how pages are turned into ratings & news:
+  #  'fast' - single regex scan of the raw html (yassExtract.py), falling back
+  #           to the soup when the page structure isn't recognised
+  #  'soup' - BeautifulSoup, restricted to the regions of def_profile
+  def_extractor = 'fast'
+  
+  #Archive (yassArchive.py) recording every page fetched, if we're recording
+  archive = None
+  
 ################################################################################
 # __init__(symbol)
 # Initializes FinOne class with passed stock.  Defaults to AAPL.
@@ -28,21 +57,106 @@ class FinOne:
 
 
 ################################################################################
-# retrieve()
+# retrieve(pool, cache)
 # Retrieves rankings and news stories for this FinOne object.
 # This functionality was moved into a separate method so that FinOne objects 
 #  could be created simply to retrieve the finviz url for individual stocks.
 # After this method is called, the data members 'rate' and 'news' should be 
 #  available to access the respective statistics.
 #
+# @param pool - optional ConnPool (yassConn.py) to fetch over a persistent
+#              connection; a fresh urllib connection is used otherwise
+# @param cache - optional HttpCache (yassCache.py) to serve the page from, 
+#              when a fresh copy is already on disk
+#
 # @created 12/16/18
-# @updated 12/18/17
-  def retrieve(self):
+# @updated 10/18/26
+  def retrieve(self, pool=None, cache=None):
     #retrieve the web page
-    html = urllib.urlopen(self.url).read()
+    html = FinOne.fetch(self.url, pool, cache)
+    
+    self.parse(html)
+####################################################################  retrieve()
+
+
+################################################################################
+# fetch(url, pool, cache) <static>
+# Retrieves a finviz page, from the cache and/or over a pooled connection
+#  when those are passed.  Non-200 responses are raised as StatusError.
+#  Pages are recorded in FinOne.archive when it's set.
+#
+# @param url   - full url to retrieve
+# @param pool  - optional ConnPool (yassConn.py)
+# @param cache - optional HttpCache (yassCache.py)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def fetch(url, pool=None, cache=None):
+    if cache is not None:
+      if pool is None:
+        status, html = cache.fetch(url, HttpCache.urllibGet)
+      else:
+        status, html = cache.fetch(url, pool.request)
+      if status != 200:
+        raise StatusError(status, url)
+    elif pool is None:
+      html = urllib.urlopen(url).read()
+    else:
+      html = pool.get(url)
+    
+    if FinOne.archive is not None:
+      FinOne.archive.add(url, html)
+    return html
+#################################################  fetch(url, pool, cache) <static>
+
+
+################################################################################
+# parse(html, extractor)
+# Extracts the ratings and news stories from a quote page's html into the 
+#  data members 'rate' and 'news'.
+# Each rating is [date, action, rating change, firm, price target change] and
+#  each news story is [date, headline, time, link, source].  (yassRatings.py
+#  turns ratings into typed records.)
+#
+# @param html      - raw html of a finviz quote page
+# @param extractor - 'fast' or 'soup'; defaults to FinOne.def_extractor
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def parse(self, html, extractor=None):
+    if extractor is None:
+      extractor = FinOne.def_extractor
+    
+    if extractor == 'fast':
+      found = FastExtract.extract(html)
+      if found is not None:
+        self.rate, self.news = found
+        return
+    
+    #unrecognised page (or we asked for it)...build a tree
+    self.parseSoup(html)
+###########################################################  parse(html, ...)
+
+
+################################################################################
+# parseSoup(html, profile)
+# Extracts the ratings and news stories from a quote page's html with 
+#  BeautifulSoup, into the data members 'rate' and 'news' (see parse()).
+#
+# @param html    - raw html of a finviz quote page
+# @param profile - name of the extraction profile (see FinOne.profiles) that
+#                  decides which regions of the page are parsed into a tree
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def parseSoup(self, html, profile=None):
+    if profile is None:
+      profile = FinOne.def_profile
     
-    #soup it up
-    soup = BeautifulSoup(html, "html.parser")
+    #soup it up...only the regions we are going to look at
+    soup = BeautifulSoup(html, "html.parser", 
+                         parse_only=FinOne.strainer(profile))
     
     #store titles & values
     ratings = soup.findAll("td", "fullview-ratings-inner")
@@ -50,11 +164,14 @@ class FinOne:
     #set up list of rankings
     self.rate = list()
     
-    #load up ratings for retrieval
+    #load up ratings for retrieval: every row of every ratings table, each
+    # row's cells looked at once
     for item in ratings:
       for row in item.table.find_all('tr'):
-        col = item.table.find_all('td')
-      self.rate.append([col[0].text, col[1].text, col[3].text])
+        col = [td.text for td in row.find_all('td')]
+        if len(col) >= 4:
+          self.rate.append([col[0], col[1], col[3], col[2],
+                            col[4] if len(col) > 4 else u''])
       
     #get news table
     news_table = soup.findAll("table", {"id":"news-table"})
@@ -68,10 +185,19 @@ class FinOne:
     #build out news list
     for table in news_table:
       for story in table.find_all('tr'):
-        if story.td.text[0].isalpha():
-          date = story.td.text.split(' ')[0]
-        self.news.append([date, story.a.text])
-####################################################################  retrieve()
+        stamp = story.td.text
+        if stamp[0].isalpha():
+          date = stamp.split(' ')[0]
+        
+        #the source sits in a span next to the headline
+        if story.span is not None:
+          source = story.span.text.strip()
+        else:
+          source = u''
+        
+        self.news.append([date, story.a.text, stamp.split()[-1],
+                          story.a.get('href', u''), source])
+#####################################################  parseSoup(html, profile)
     
     
 ################################################################################
@@ -86,5 +212,103 @@ class FinOne:
   def stockUrl(symbol):
     return (FinOne.base_url.replace('ZZZZ', symbol))
 ##############################################################  stockUrl(symbol)
+
+
+################################################################################
+# strainer(profile)
+# Returns a SoupStrainer that keeps only the regions declared for the passed
+#  extraction profile (None for profiles that want the whole tree).
+# The strainer is handed raw attribute values while parsing, so the class 
+#  attribute is still a single space-separated string at that point.
+#
+# @param profile - name of a profile in FinOne.profiles
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def strainer(profile):
+    regions = FinOne.profiles[profile]
+    if regions is None:
+      return None
+    
+    def wanted(name, attrs):
+      for tag, want in regions:
+        if name != tag:
+          continue
+        for key, value in want.items():
+          if value not in (attrs.get(key) or '').split():
+            break
+        else:
+          return True
+      return False
+    
+    return SoupStrainer(wanted)
+#############################################################  strainer(profile)
+
+
+################################################################################
+# benchmark(pages, rounds, profiles)
+# Parses each saved quote page with every extraction profile and prints the
+#  average parse time per page, and the number of nodes (and approximate 
+#  bytes) each profile materialises, so the partial parse can be compared 
+#  against the full tree.  The regex fast path is timed alongside.
+#
+# @param pages    - list of raw html pages
+# @param rounds   - number of times to parse each page per profile
+# @param profiles - extraction profiles to compare
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def benchmark(pages, rounds=10, profiles=('full', 'quote')):
+    print '%-8s %10s %10s %12s' % ('profile', 'ms/page', 'nodes/page', 
+                                   'KB/page')
+    for profile in profiles:
+      strainer = FinOne.strainer(profile)
+      
+      start = time.time()
+      for dummy in range(rounds):
+        for html in pages:
+          BeautifulSoup(html, "html.parser", parse_only=strainer)
+      elapsed = (time.time() - start) / (rounds * len(pages))
+      
+      #rough footprint: each node plus its attribute dictionary
+      nodes = 0
+      size = 0
+      for html in pages:
+        soup = BeautifulSoup(html, "html.parser", parse_only=strainer)
+        for node in soup.descendants:
+          nodes += 1
+          size += sys.getsizeof(node) + sys.getsizeof(node.__dict__)
+      
+      print '%-8s %10.2f %10i %12.1f' % (profile, elapsed * 1000.0,
+                                         nodes / len(pages),
+                                         size / 1024.0 / len(pages))
+    
+    #the regex scan builds no tree at all
+    start = time.time()
+    for dummy in range(rounds):
+      for html in pages:
+        FastExtract.extract(html)
+    elapsed = (time.time() - start) / (rounds * len(pages))
+    print '%-8s %10.2f %10i %12.1f' % ('fast', elapsed * 1000.0, 0, 0)
+########################################################  benchmark(pages, ...)
+
+
+################################################################################
+# __main__
+# Benchmarks the extraction profiles against saved quote pages passed on the
+#  command line, or against a freshly retrieved AAPL page if none are given.
+#
+# @created 10/18/26
+# @updated 10/18/26
+if __name__ == '__main__':
+  if len(sys.argv) > 1:
+    pages = [open(name, 'rb').read() for name in sys.argv[1:]]
+  else:
+    pages = [urllib.urlopen(FinOne.stockUrl('AAPL')).read()]
+  
+  FinOne.benchmark(pages)
+######################################################################  __main__
     
 #//yassFinOne.py
\ No newline at end of file
@@ -6,79 +6,168 @@
 # Updated to provide threaded loading of individual stocks.
 #
 # @created 12/5/17
-# @updated 12/18/17
+# @updated 10/18/26
 ################################################################################
-import urllib, sys, os.path, time, threading, Queue
+import urllib, sys, os.path, time, threading, Queue, multiprocessing
 from datetime import date
+#datetime.strptime imports this on first use, which races when the first use
+# is in several threads at once
+import _strptime
 #from bs4 import BeautifulSoup
 from yassFinOne import FinOne
+from yassConn import ConnPool
+from yassCache import HttpCache
+from yassSched import Scheduler
+from yassScreener import Screener
+from yassWatermark import Watermarks
+from yassStore import Store
+from yassArchive import Archive
+from yassRatings import Ratings
+
+################################################################################
+# parsePage(sym, html)
+# Parses a quote page in a parse worker process.  Module level, so the worker
+#  processes can find it.
+#
+# @param sym  - symbol the page is for
+# @param html - raw html of the page
+#
+# @return (rate, news) as in FinOne.rate and FinOne.news
+#
+# @created 10/18/26
+# @updated 10/18/26
+def parsePage(sym, html):
+  fv1 = FinOne(sym)
+  fv1.parse(html)
+  return fv1.rate, fv1.news
+########################################################  parsePage(sym, html)
+
 
 class Finviz:
   def_connections = 20 #default maximum number of connections/threads
+  def_rate = 10.0      #default maximum requests per second to finviz
+  def_backlog = 100    #default maximum number of fetched pages awaiting parsing
 ################################################################################
 # class FinOneThread
-# Establishes a thread for loading a single stock from finviz.com, and sends
-#  selected data back to the finviz object for updating once all threads have
-#  completed.
+# Establishes a thread for loading stocks from finviz.com.  Symbols are handed
+#  out by the shared Scheduler (yassSched.py), and each result (success or
+#  failure) is reported back to it so it can pace and retry the requests.
+#
+# When there are parse workers, the thread only fetches: the raw page goes on
+#  the bounded queue of pages for the ParseThreads (and the fetch is reported
+#  done), and the thread blocks while that queue is full rather than fetching
+#  further ahead.  A page that was fetched but can't be parsed isn't fetched
+#  again; it's noted in Finviz.unparsed.
 #
 # @created 12/5/17
-# @updated 12/18/17
+# @updated 10/18/26
   class FinOneThread(threading.Thread):
-    def __init__(self, queue, pre, finviz):
+    def __init__(self, sched, pre, finviz, pool=None, cache=None):
       threading.Thread.__init__(self)
-      self.queue = queue
+      self.sched = sched
       self.prefix = pre
       self.fv = finviz
+      self.pool = pool
+      self.cache = cache
       
     def run(self):
       while 1:
-        try:
-          sym = self.queue.get_nowait()
-        except Queue.Empty:
+        job = self.sched.get()
+        if job is None:
           raise SystemExit
         
         #correction for bad input  
+        sym = job
         if sym[0] == "^":
           sym = sym[1:]
-          
-        filename = self.prefix + "%s.txt" % sym
         
         #load stock data
         fv1 = FinOne(sym)
         
+        start = time.time()
+        fetched = None
         try:
           #print 'retrieving FViz for %s' % row[0]
           #retrieving stock data sometimes throws IOErrors
-          fv1.retrieve()
+          html = FinOne.fetch(fv1.url, self.pool, self.cache)
+          fetched = time.time()
+          self.fv.tally('fetch', fetched - start)
           
           self.fv.yp.log('%s: retrieved %s (FinOneThread.run)' % 
                           (sym, fv1.url))
-                          
-          f = open(filename, 'w')
           
-          #write ratings
-          for rating in fv1.rate:
-            #f.write(rating)
-            f.write(("%s, %s, %s\n" % (rating[0], rating[1], rating[2])).encode('utf-8'))
-            
-          #write news headlines
-          for story in fv1.news:
-            #f.write(story)
-            f.write(("%s, %s\n" % (story[0], story[1])).encode('utf-8'))
-            
-          #close the file
-          f.close()
+          if self.fv.pages is not None:
+            #the fetch is done, so report it now: pages waiting on the queue
+            # don't hold up the scheduler, and the parse stage's pace
+            # doesn't count as finviz's latency
+            self.sched.success(job, fetched - start)
+            self.fv.pages.put((job, sym, html))
+            self.fv.tally('fetch wait', time.time() - fetched)
+            continue
+          
+          fv1.parse(html)
+          self.fv.tally('parse', time.time() - fetched)
+          self.fv.save(job, sym, fv1.rate, fv1.news)
+          
+          self.sched.success(job, fetched - start)
 
         except IOError as ioe:
-          self.fv.yp.log('IOError loading %s (FinOneThread.run)' % sym)
-          #failed to load, so add this row to reload queue
-          self.fv.reload.insert(len(self.fv.reload), sym)
-          self.fv.info('adding %s to reload queue... (FinOneThread.run)' %
-                            sym)
+          self.fv.yp.log('IOError loading %s: %s (FinOneThread.run)' % 
+                            (sym, ioe))
+          #failed to load, so let the scheduler decide when to retry
+          self.sched.failure(job, getattr(ioe, 'status', None))
           #print ioe
+        except Exception as e:
+          if fetched is None:
+            self.fv.yp.log('error loading %s: %r (FinOneThread.run)' % 
+                             (sym, e))
+            self.sched.failure(job)
+          elif self.fv.pages is None:
+            #the page came back fine, so fetching it again won't help
+            self.fv.unparsable(job, sym, e, 'FinOneThread.run')
+            self.sched.success(job, fetched - start)
+          else:
+            #already reported when it was queued
+            self.fv.unparsable(job, sym, e, 'FinOneThread.run')
 ##########################################################  class FinOneThread()
 
 
+################################################################################
+# class ParseThread
+# Takes fetched pages off the queue, has one of the parse worker processes
+#  extract the ratings & headlines, and saves them.  There is one thread per
+#  worker process, so each thread has at most one page out at a time.  The
+#  scheduler has already been told the page was fetched, so a page that can't
+#  be parsed is only noted in Finviz.unparsed.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  class ParseThread(threading.Thread):
+    def __init__(self, sched, finviz):
+      threading.Thread.__init__(self)
+      self.sched = sched
+      self.fv = finviz
+      
+    def run(self):
+      while 1:
+        waiting = time.time()
+        item = self.fv.pages.get()
+        if item is None:
+          raise SystemExit
+        start = time.time()
+        self.fv.tally('parse wait', start - waiting)
+        
+        job, sym, html = item
+        try:
+          rate, news = self.fv.workers.apply(parsePage, (sym, html))
+          self.fv.tally('parse', time.time() - start)
+          self.fv.save(job, sym, rate, news)
+        except Exception as e:
+          #the fetch was already reported to the scheduler as done
+          self.fv.unparsable(job, sym, e, 'ParseThread.run')
+###########################################################  class ParseThread()
+
+
 ################################################################################
 # __init__(yp)
 # Initializes Finviz class with parameters.
@@ -87,7 +176,7 @@ class Finviz:
 #             Finviz screen.
 #
 # @created 12/5/17
-# @updated 12/16/17
+# @updated 10/18/26
   def __init__(self, yp):
     #store a reference to the preferences
     self.yp = yp
@@ -113,23 +202,110 @@ class Finviz:
     #store reference to hist directory for this week's stocks
     self.prefix = "./docs/"
                   
-    #main queue for symbols to look up and mine
-    self.keepers = Queue.Queue()
-    
     #copy of stock data for error processing
-    self.tickers = []
+    self.tickers = list(self.symbols)
     
-    #populate our data structures
-    for tick in self.symbols:
-      self.keepers.put(tick)
-      self.tickers.insert(len(self.tickers), tick)
+    #symbols that could not be loaded within their retry budget, or whose
+    # pages were loaded but couldn't be parsed
+    self.failed = []
+    self.unparsed = []
     
-    #and data for reloading
-    self.reload = []
+    #tabular data from the screener views (symbol -> {column : value})
+    self.table = dict()
     
-    #and start mining!
-    self.mineSymbols()
+    #when mining incrementally: the watermarks, the number of new ratings &
+    # headlines per symbol, and the text appended to each symbol's document
+    if self.yp.incremental:
+      self.marks = Watermarks(self.prefix)
+    else:
+      self.marks = None
+    self.fresh = dict()
+    self.delta = dict()
+    
+    #fetched pages waiting to be parsed, and the parse worker processes
+    # (set up by mineSymbols), plus the time spent in each stage
+    self.pages = None
+    self.workers = None
+    self.stages = dict()
+    self.lock = threading.Lock()
+    
+    #parsing is CPU-bound, so it can go to worker processes; they're started
+    # before any connection, cache or database is opened, so none of those
+    # are inherited by them
+    self.parse_workers = self.yp.parse_workers
+    if self.parse_workers is None:
+      self.parse_workers = multiprocessing.cpu_count()
+    if self.yp.headlines and self.parse_workers > 0:
+      self.workers = multiprocessing.Pool(self.parse_workers)
+    
+    if not os.path.exists(self.prefix):
+      os.makedirs(self.prefix)
+    
+    #share one pool of keep-alive connections between all threads, unless
+    # we've been asked for the original connection-per-symbol behavior
+    if self.yp.fetch_mode == 'pool':
+      self.pool = ConnPool(Finviz.def_connections)
+    else:
+      self.pool = None
+    
+    #serve pages we fetched recently from disk
+    if self.yp.cache_dir:
+      self.cache = HttpCache(self.yp.cache_dir)
+    else:
+      self.cache = None
+    
+    #single-file storage for the mined ratings & headlines
+    if self.yp.storage == 'db':
+      self.store = Store()
+    else:
+      self.store = None
+    
+    #the analyst ratings as typed records, whichever storage the rest is in,
+    # if Rank is going to score them
+    if self.yp.ratings_weight:
+      self.ratings = Ratings(self.prefix + 'ratings.db')
+    else:
+      self.ratings = None
+    
+    #record the pages we fetch, for replaying offline
+    if self.yp.record:
+      FinOne.archive = Archive(self.yp.record)
+    
+    #bulk data for every symbol from a handful of screener pages...
+    if self.yp.screener:
+      self.screenSymbols()
+    
+    #...and start mining the individual pages if we need the headlines!
+    if self.yp.headlines:
+      self.mineSymbols()
+    
+    self.disconnect()
 ##################################################################  __init__(yp)
+
+
+################################################################################
+# screenSymbols()
+# Pulls tabular data for all symbols from the paginated screener views (see
+#  yassScreener.py) and writes it to screener.csv alongside the mined docs.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def screenSymbols(self):
+    start = time.time()
+    
+    sc = Screener(self.yp, self.tickers, self.pool, self.cache)
+    self.table = sc.fetch()
+    sc.write(self.prefix + 'screener.csv')
+    
+    self.info('screened %i symbols with %i requests in %.2fs '
+              '(Finviz.screenSymbols)' % (len(self.table), sc.requests,
+                                          time.time() - start))
+    
+    missing = sc.missing()
+    if len(missing) > 0:
+      self.info('%i symbols not found by the screener: %s '
+                '(Finviz.screenSymbols)' % (len(missing), ', '.join(missing)))
+###############################################################  screenSymbols()
   
   
 ################################################################################
@@ -137,58 +313,228 @@ class Finviz:
 # Iterates through symbols and mines data from individual pages on Finviz
 #
 # @created 12/5/17
-# @updated 12/18/17
+# @updated 10/18/26
   def mineSymbols(self):
-    if not os.path.exists(self.prefix):
-      os.makedirs(self.prefix)
-      
-    #load maximum of Finviz.def_connections stocks at a time
-    connections = min(Finviz.def_connections,len(self.keepers.queue))
+    #pace & retry requests; the concurrency limit starts low and grows to
+    # def_connections while finviz keeps up
+    sched = Scheduler(self.tickers, rate=Finviz.def_rate,
+                      most=Finviz.def_connections)
+    
+    start = time.time()
+    
+    #the parse worker processes (started by __init__) are fed by a bounded
+    # queue of fetched pages
+    workers = self.parse_workers if self.workers is not None else 0
+    parsers = []
+    if workers > 0:
+      self.pages = Queue.Queue(Finviz.def_backlog)
+      for dummy in range(workers):
+        t = self.ParseThread(sched, self)
+        t.start()
+        parsers.append(t)
     
     #fire off the threads
     threads = []
-    for dummy in range(connections):
-      t = self.FinOneThread(self.keepers, self.prefix, self)
+    for dummy in range(min(Finviz.def_connections, len(self.tickers))):
+      t = self.FinOneThread(sched, self.prefix, self, self.pool, self.cache)
       t.start()
       threads.append(t)
 
-    #set up a counter and let user know we are fetching...
-    cnt = 0
-    #sys.stdout.write("waiting for finviz threads to finish  >>")
-    #sys.stdout.flush()
     self.info("waiting for finviz threads to finish... (Finviz.mineSymbols)")
     
-    #wait for all threads to finish
+    #wait for all threads to finish; once the fetch threads have, every page
+    # is on the queue ahead of the parse threads' signal to stop
     for thread in threads:
       thread.join()
+    for thread in parsers:
+      self.pages.put(None)
+    for thread in parsers:
+      thread.join()
+    if self.workers is not None:
+      self.workers.close()
+      self.workers.join()
+      self.workers = None
+      self.pages = None
     
-    #reload stocks that had problems
-    while len(self.reload) > 0:
-      cnx = min(5,len(self.reload))
-      self.info('trying to reload %i stocks (Finviz.mineSymbols)' % 
-                  len(self.reload))
-                  
-      q2 = Queue.Queue()
-      
-      for row in self.reload:
-        q2.put(row)
-        self.info("added %s to queue (Finviz.mineSymbols)" % row[0])
-      
-      #reset reload
-      self.reload = []
-      
-      thr = []
-      for dummy in range(cnx):
-        t = self.FinOneThread(q2, self.prefix, self)
-        t.start()
-        thr.append(t)
-      
-      self.info("waiting for reload threads to finish... (Finviz.mineSymbols)")
-      
-      for thread in thr:
-        thread.join()
-    #//while len(self.reload) > 0
+    self.info('scheduler: %s (Finviz.mineSymbols)' % sched.summary())
+    self.report(len(threads), workers)
+    
+    #stocks that used up their retries, or couldn't be parsed
+    self.failed = sched.failed + self.unparsed
+    if len(self.failed) > 0:
+      self.info('could not load %i stocks: %s (Finviz.mineSymbols)' %
+                  (len(self.failed), ', '.join(self.failed)))
+    
+    if self.marks is not None:
+      self.marks.save()
+      for sym in self.tickers:
+        if sym in self.fresh:
+          self.yp.log('%s: %i new ratings, %i new headlines '
+                      '(Finviz.mineSymbols)' % ((sym,) + self.fresh[sym]))
+      self.info('%i new ratings, %i new headlines across %i symbols '
+                '(Finviz.mineSymbols)' % 
+                  (sum(r for r, n in self.fresh.values()),
+                   sum(n for r, n in self.fresh.values()), len(self.fresh)))
+    
+    #report throughput so the fetch modes can be compared
+    elapsed = max(time.time() - start, 1e-6)
+    self.info('mined %i symbols in %.2fs, %.1f symbols/s (mode %s) '
+              '(Finviz.mineSymbols)' % (len(self.tickers), elapsed,
+                                        len(self.tickers) / elapsed,
+                                        self.yp.fetch_mode))
 #################################################################  mineSymbols()
+
+
+################################################################################
+# unparsable(job, sym, error, where)
+# Notes a symbol whose page was fetched but couldn't be parsed (or saved).
+#
+# @param job   - symbol as listed (and scheduled)
+# @param sym   - symbol without any leading '^'
+# @param error - the exception raised
+# @param where - method it was raised in, for the log
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def unparsable(self, job, sym, error, where):
+    self.yp.log('error parsing %s: %r (%s)' % (sym, error, where))
+    with self.lock:
+      self.unparsed.append(job)
+###############################################  unparsable(job, sym, error, ...)
+
+
+################################################################################
+# save(job, sym, rate, news)
+# Writes a symbol's ratings & headlines to docs/SYM.txt or the store (only
+#  the new ones, when mining incrementally) and notes what changed for Rank.
+#
+# @param job  - symbol as listed (and scheduled)
+# @param sym  - symbol without any leading '^'
+# @param rate - ratings, as in FinOne.rate
+# @param news - news stories, as in FinOne.news
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def save(self, job, sym, rate, news):
+    start = time.time()
+    
+    #only the ratings & headlines we haven't seen before, when we're
+    # mining incrementally
+    mode = 'w'
+    if self.marks is not None:
+      rate, news, seen = self.marks.update(sym, rate, news)
+      if seen:
+        mode = 'a'
+    
+    lines = []
+    
+    #ratings
+    for rating in rate:
+      lines.append(("%s, %s, %s\n" % (rating[0], rating[1], rating[2])).encode('utf-8'))
+      
+    #news headlines
+    for story in news:
+      lines.append(("%s, %s\n" % (story[0], story[1])).encode('utf-8'))
+    
+    if self.store is not None:
+      #a symbol mined from scratch replaces what was stored for it
+      if mode == 'w':
+        self.store.replace(sym)
+      self.store.add(sym, rate, news)
+    else:
+      f = open(self.prefix + "%s.txt" % sym, mode)
+      f.writelines(lines)
+      f.close()
+    if self.ratings is not None:
+      self.ratings.add(sym, rate, mode == 'w')
+    
+    #appended lines are all Rank needs to look at for this symbol
+    if mode == 'a':
+      self.delta[job] = ''.join(lines)
+    self.fresh[job] = (len(rate), len(news))
+    
+    self.tally('write', time.time() - start)
+###################################################  save(job, sym, rate, news)
+
+
+################################################################################
+# tally(stage, seconds) / report(fetchers, parsers)
+# Counts the pages through each pipeline stage and the time spent in it, and
+#  logs each stage's throughput once mining is done.  The waits show which
+#  stage held the other up: fetch threads waiting on a full queue means the
+#  parsers are the bottleneck, parse threads waiting on an empty one means
+#  the network (or the rate limit) is.
+#
+# @param stage    - 'fetch', 'parse', 'write', 'fetch wait' or 'parse wait'
+# @param seconds  - time spent on one page
+# @param fetchers - number of fetch threads
+# @param parsers  - number of parse worker processes
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def tally(self, stage, seconds):
+    with self.lock:
+      n, total = self.stages.get(stage, (0, 0.0))
+      self.stages[stage] = (n + 1, total + seconds)
+    
+  def report(self, fetchers, parsers):
+    #with no parse workers, the fetch threads parse (and write) the pages
+    for stage, workers in (('fetch', fetchers), ('parse', parsers or fetchers),
+                           ('write', parsers or fetchers)):
+      n, total = self.stages.get(stage, (0, 0.0))
+      if n == 0:
+        continue
+      self.info('%s: %i pages, %.1f ms each, %.1f pages/s across %i workers '
+                '(Finviz.report)' % (stage, n, 1000.0 * total / n,
+                                     n * workers / max(total, 1e-6), workers))
+    
+    if parsers > 0:
+      self.info('fetch threads waited %.2fs on a full queue, parse threads '
+                '%.2fs on an empty one (Finviz.report)' %
+                  (self.stages.get('fetch wait', (0, 0.0))[1],
+                   self.stages.get('parse wait', (0, 0.0))[1]))
+#######################################################  tally() / report()
+
+
+################################################################################
+# disconnect()
+# Closes the connection pool and saves the http cache once we're done with
+#  finviz, logging how much each of them saved us, and closes the store, the
+#  ratings and the archive (and the parse workers, if mining didn't).
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def disconnect(self):
+    if self.workers is not None:
+      self.workers.terminate()
+      self.workers.join()
+      self.workers = None
+    
+    if self.store is not None:
+      self.store.close()
+      self.info('stored %i rows in %s (Finviz.disconnect)' %
+                  (self.store.written, self.store.name))
+    
+    if self.ratings is not None:
+      self.ratings.close()
+      self.info('recorded %i analyst ratings in %s (Finviz.disconnect)' %
+                  (self.ratings.written, self.ratings.name))
+    
+    if self.pool is not None:
+      self.info('%i requests over %i connections (Finviz.disconnect)' %
+                  (self.pool.requests, self.pool.opened))
+      self.pool.close()
+    
+    if self.cache is not None:
+      self.cache.save()
+      self.info('http cache: %s (Finviz.disconnect)' % self.cache.summary())
+    
+    if FinOne.archive is not None:
+      FinOne.archive.save()
+      self.info('recorded %i pages in %s (Finviz.disconnect)' %
+                  (FinOne.archive.recorded, FinOne.archive.path))
+      FinOne.archive = None
+##################################################################  disconnect()
     
 
 ################################################################################
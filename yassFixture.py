@@ -0,0 +1,512 @@
+################################################################################
+# File:    yassFixture.py
+# Author:  Ryan Yusko
+#
+# Local stand-in for finviz.com and Yahoo!'s history downloads, so mining can
+# be exercised (and load tested) offline.  Responses recorded in an archive
+# (yassArchive.py) are replayed; anything else is synthesised from its symbol
+# (the same symbol always gets the same page), in the same markup finviz uses
+# for its quote.ashx and screener.ashx pages, or as a Yahoo! history csv.
+# Latency, jitter, injected errors and throttling can be configured, so the
+# scheduler sees something like the real sites.
+#
+# Running this file checks the screener pagination against the fixture:
+#   python yassFixture.py
+# serves until interrupted (replaying an archive, if one is given):
+#   python yassFixture.py serve {port=8000} {archive=None} {option=value ...}
+# or mines a synthetic universe end to end and reports the throughput:
+#   python yassFixture.py load {symbols=10000} {option=value ...}
+# where the options are latency, jitter (seconds), errors (fraction of
+# requests failed with a 500) and rate (requests per second before the
+# fixture answers 429; 0 for no limit).
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import sys, os, threading, random, time, urlparse, cgi, datetime
+import BaseHTTPServer, SocketServer
+from yassArchive import Archive
+from yassSched import TokenBucket
+
+################################################################################
+# class FixtureServer
+# Threaded http server; one thread per (keep-alive) connection.
+#
+# @created 10/18/26
+# @updated 10/18/26
+class FixtureServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+  daemon_threads = True
+  allow_reuse_address = True
+##########################################################  class FixtureServer
+
+
+################################################################################
+# class FixtureHandler
+# Serves quote.ashx, screener.ashx and history downloads from the Fixture
+#  that owns the server: delayed, failed or throttled as it's configured,
+#  then replayed from its archive or synthesised.
+#
+# @created 10/18/26
+# @updated 10/18/26
+class FixtureHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+  protocol_version = 'HTTP/1.1'
+  history_path = '/v7/finance/download/'
+
+  def do_GET(self):
+    fx = self.server.fixture
+    parts = urlparse.urlsplit(self.path)
+    query = urlparse.parse_qs(parts.query)
+    fx.count(parts.path)
+
+    status = fx.admit()
+    if status != 200:
+      return self.reply(status, 'unavailable')
+
+    if fx.archive is not None:
+      body = fx.archive.find(self.path)
+      if body is not None:
+        return self.reply(200, body)
+
+    if parts.path == '/quote.ashx' and 't' in query:
+      sym = query['t'][0]
+      if sym in fx.missing:
+        return self.reply(404, 'not found')
+      return self.reply(200, Fixture.quotePage(sym))
+
+    if parts.path == '/screener.ashx':
+      tickers = query.get('t', [''])[0].split(',')
+      row = int(query.get('r', ['1'])[0])
+      found = sorted(t for t in tickers if t and t not in fx.missing)
+      return self.reply(200, Fixture.screenerPage(found, row))
+
+    if parts.path.startswith(FixtureHandler.history_path):
+      sym = parts.path[len(FixtureHandler.history_path):]
+      if sym in fx.missing:
+        return self.reply(404, 'not found')
+      return self.reply(200, Fixture.historyCsv(sym,
+                               int(query.get('period1', ['0'])[0]),
+                               int(query.get('period2', ['0'])[0])), 'text/csv')
+
+    self.reply(404, 'not found')
+
+  def reply(self, status, body, kind='text/html'):
+    self.send_response(status)
+    self.send_header('Content-Type', kind + '; charset=utf-8')
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  #keep the fixture quiet
+  def log_message(self, format, *args):
+    pass
+#########################################################  class FixtureHandler
+
+
+class Fixture:
+  rows = 20 #rows per screener page, as on finviz
+
+################################################################################
+# __init__(missing, archive, latency, jitter, errors, rate)
+# Initializes the fixture.  Call start() to begin serving.
+#
+# @param missing - symbols the fixture should pretend don't exist
+# @param archive - Archive (yassArchive.py) of recorded responses to replay
+# @param latency - seconds every response is delayed by
+# @param jitter  - up to this many more seconds (uniformly random) of delay
+# @param errors  - fraction of requests answered with a 500
+# @param rate    - requests per second served before answering 429 (None or
+#                  0 for no limit)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, missing=(), archive=None, latency=0.0, jitter=0.0,
+               errors=0.0, rate=None):
+    self.missing = set(missing)
+    self.archive = archive
+    self.latency = latency
+    self.jitter = jitter
+    self.errors = errors
+    if rate:
+      self.bucket = TokenBucket(rate, rate)
+    else:
+      self.bucket = None
+    self.requests = dict()
+    self.statuses = dict()
+    self.lock = threading.Lock()
+    self.server = None
+    self.saved = None
+##################################################################  __init__()
+
+
+################################################################################
+# admit()
+# Delays a request by the configured latency and jitter, then decides whether
+#  it gets a 429 (over the rate), a 500 (injected error) or served (200).
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def admit(self):
+    delay = self.latency + random.uniform(0, self.jitter)
+    if delay > 0:
+      time.sleep(delay)
+
+    with self.lock:
+      if self.bucket is not None and self.bucket.take(time.time()) > 0:
+        status = 429
+      elif random.random() < self.errors:
+        status = 500
+      else:
+        status = 200
+      self.statuses[status] = self.statuses.get(status, 0) + 1
+    return status
+#######################################################################  admit()
+
+
+################################################################################
+# start() / stop()
+# Starts serving on a free local port (returning the base url), and stops.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def start(self):
+    self.server = FixtureServer(('127.0.0.1', 0), FixtureHandler)
+    self.server.fixture = self
+    t = threading.Thread(target=self.server.serve_forever)
+    t.daemon = True
+    t.start()
+    return self.url()
+
+  def stop(self):
+    self.server.shutdown()
+    self.server.server_close()
+#############################################################  start() / stop()
+
+
+################################################################################
+# url()
+# Returns the base url of the running fixture.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def url(self):
+    return 'http://127.0.0.1:%i' % self.server.server_port
+#######################################################################  url()
+
+
+################################################################################
+# attach() / detach()
+# Points FinOne and Screener (and yassHistory, when it can be loaded) at the
+#  fixture instead of finviz.com and Yahoo!, and puts them back.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def attach(self):
+    from yassFinOne import FinOne
+    from yassScreener import Screener
+    self.saved = (FinOne.base_url, Screener.base_url)
+    FinOne.base_url = self.url() + '/quote.ashx?t=ZZZZ&ty=c&ta=1&p=d&b=1'
+    Screener.base_url = self.url() + '/screener.ashx?v=111&t=TTTT&r=RRRR'
+
+    #yassHistory needs requests & yaml
+    try:
+      from yassHistory import yassHistory
+    except ImportError:
+      return
+    self.saved += (yassHistory.base_url, yassHistory.token)
+    yassHistory.base_url = self.url() + FixtureHandler.history_path + 'ZZZZ?'
+    yassHistory.token = {'crumb' : 'fixture', 'cookie' : 'fixture'}
+
+  def detach(self):
+    from yassFinOne import FinOne
+    from yassScreener import Screener
+    FinOne.base_url, Screener.base_url = self.saved[:2]
+    if len(self.saved) > 2:
+      from yassHistory import yassHistory
+      yassHistory.base_url, yassHistory.token = self.saved[2:]
+#######################################################  attach() / detach()
+
+
+################################################################################
+# count(path) / total(path)
+# Tallies requests by path, and returns the tally for a path (or all paths).
+#
+# @param path - request path, e.g. /screener.ashx
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def count(self, path):
+    with self.lock:
+      self.requests[path] = self.requests.get(path, 0) + 1
+
+  def total(self, path=None):
+    with self.lock:
+      if path is None:
+        return sum(self.requests.values())
+      return self.requests.get(path, 0)
+###########################################################  count() / total()
+
+
+################################################################################
+# quotePage(sym, stories, ratings) <static>
+# Returns a synthesised finviz quote page for the passed symbol.
+#
+# @param sym     - symbol to build the page for
+# @param stories - number of rows in the news table
+# @param ratings - number of analyst ratings
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def quotePage(sym, stories=100, ratings=10):
+    r = random.Random(sym)
+    out = ['<!DOCTYPE html><html><head><title>%s Stock Quote</title></head>'
+           '<body><table class="fullview-title"><tr><td>%s</td></tr></table>'
+           % (sym, sym)]
+
+    #snapshot table (not extracted, but it's most of the page)
+    out.append('<table class="snapshot-table2">')
+    for i in range(12):
+      out.append('<tr>')
+      for j in range(6):
+        out.append('<td class="snapshot-td2-cp">Field%i</td>'
+                   '<td class="snapshot-td2"><b>%.2f</b></td>' %
+                   (i * 6 + j, r.uniform(0, 100)))
+      out.append('</tr>')
+    out.append('</table>')
+
+    out.append('<table class="fullview-ratings-outer">')
+    for i in range(ratings):
+      action = r.choice(['Upgrade', 'Downgrade', 'Reiterated', 'Initiated'])
+      low = r.randint(10, 200)
+      out.append('<tr><td class="fullview-ratings-inner"><table width="100%%">'
+                 '<tr class="body-table-rating-neutral">'
+                 '<td class="fullview-ratings-inner-cell">Dec-%02i-17</td>'
+                 '<td class="fullview-ratings-inner-cell">%s</td>'
+                 '<td class="fullview-ratings-inner-cell">Firm %i &amp; Co</td>'
+                 '<td class="fullview-ratings-inner-cell">Hold &rarr; Buy</td>'
+                 '<td class="fullview-ratings-inner-cell">$%i &rarr; $%i</td>'
+                 '</tr></table></td></tr>' %
+                 (18 - i % 18, action, r.randint(1, 50), low, low + 10))
+    out.append('</table>')
+
+    words = ['beats', 'misses', 'soars', 'slumps', 'estimates', 'strong',
+             'weak', 'upgrade', 'downgrade', 'profit', 'loss', 'record']
+    out.append('<table width="100%" id="news-table" class="fullview-news-outer">')
+    for i in range(stories):
+      if i % 8 == 0:
+        stamp = 'Dec-%02i-17 %02i:%02iAM' % (18 - i // 8 % 18,
+                                             r.randint(1, 11), r.randint(0, 59))
+      else:
+        stamp = '%02i:%02iPM' % (r.randint(1, 11), r.randint(0, 59))
+      headline = '%s %s' % (sym, ' '.join(r.sample(words, 4)))
+      out.append('<tr><td width="130" align="right">%s&nbsp;&nbsp;</td>'
+                 '<td align="left"><a href="https://news.example.com/%s/%i" '
+                 'class="tab-link-news">%s</a> <span style="color:#aa6dc0;'
+                 'font-size:9px">Source %i</span></td></tr>' %
+                 (stamp, sym, i, headline, r.randint(1, 5)))
+    out.append('</table></body></html>')
+    return ''.join(out)
+#####################################################  quotePage(sym) <static>
+
+
+################################################################################
+# screenerPage(tickers, row) <static>
+# Returns a synthesised finviz screener page (overview view, v=111) showing
+#  the passed tickers from row onwards.  As on finviz, asking for rows past
+#  the end gets the last page again.
+#
+# @param tickers - sorted list of tickers the screen matched
+# @param row     - 1-based first row of the page
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def screenerPage(tickers, row):
+    columns = ['No.', 'Ticker', 'Company', 'Sector', 'Industry', 'Country',
+               'Market Cap', 'P/E', 'Price', 'Change', 'Volume']
+    total = len(tickers)
+    if row > total:
+      row = max(1, total - (total - 1) % Fixture.rows)
+
+    out = ['<html><body><table><tr><td class="count-text"><b>Total: </b>%i '
+           '#%i</td></tr></table>' % (total, row)]
+    out.append('<table width="100%" cellpadding="3" cellspacing="1"><tr>')
+    for i, col in enumerate(columns):
+      cls = 'table-top-h' if i == 0 else ('table-top-s' if i == 1 else
+                                          'table-top')
+      out.append('<td class="%s">%s</td>' % (cls, col))
+    out.append('</tr>')
+
+    for n in range(row - 1, min(total, row - 1 + Fixture.rows)):
+      sym = tickers[n]
+      r = random.Random(sym)
+      cells = [str(n + 1), sym, '%s Inc.' % sym, 'Technology', 'Software',
+               'USA', '%.2fB' % r.uniform(0.1, 900), '%.2f' % r.uniform(5, 60),
+               '%.2f' % r.uniform(1, 500), '%.2f%%' % r.uniform(-5, 5),
+               '{:,}'.format(r.randint(1000, 9000000))]
+      cls = 'table-dark-row-cw' if n % 2 == 0 else 'table-light-row-cw'
+      out.append('<tr valign="top" class="%s">' % cls)
+      for cell in cells:
+        out.append('<td class="screener-body-table-nw"><a href="quote.ashx?'
+                   't=%s" class="screener-link">%s</a></td>' %
+                   (sym, cgi.escape(cell)))
+      out.append('</tr>')
+    out.append('</table></body></html>')
+    return ''.join(out)
+##############################################  screenerPage(tickers, row) <static>
+
+
+################################################################################
+# historyCsv(sym, start, end) / symbols(n) <static>
+# Returns a synthesised Yahoo! daily history csv for the passed symbol (a
+#  random walk over the weekdays from start to end, epoch seconds), and a
+#  synthetic universe of n symbols.
+#
+# @param sym   - symbol to build the history for
+# @param start - first day, in seconds since the epoch
+# @param end   - last day, in seconds since the epoch
+# @param n     - number of symbols
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def historyCsv(sym, start, end):
+    r = random.Random(sym)
+    day = datetime.date.fromtimestamp(max(start, 0))
+    last = datetime.date.fromtimestamp(max(end, start, 0))
+    price = r.uniform(5, 500)
+
+    out = ['Date,Open,High,Low,Close,Adj Close,Volume\n']
+    while day <= last:
+      if day.weekday() < 5:
+        close = max(0.01, price * (1 + r.gauss(0, 0.02)))
+        high = max(price, close) * (1 + r.uniform(0, 0.01))
+        low = min(price, close) * (1 - r.uniform(0, 0.01))
+        out.append('%s,%.6f,%.6f,%.6f,%.6f,%.6f,%i\n' %
+                   (day.isoformat(), price, high, low, close, close,
+                    r.randint(1000, 9000000)))
+        price = close
+      day += datetime.timedelta(1)
+    return ''.join(out)
+
+  @staticmethod
+  def symbols(n):
+    return ['S%05i' % i for i in range(n)]
+###################################  historyCsv() / symbols() <static>
+
+
+################################################################################
+# checkPagination() / serve(port, archive, options) / load(n, options) <static>
+# The __main__ modes: the screener pagination check (returns the number of
+#  failures), serving until interrupted, and mining a synthetic universe of
+#  n symbols end to end against the fixture (in the current directory, so
+#  docs/ and logs/ end up there) and reporting the throughput.
+#
+# @param port    - port to serve on
+# @param archive - archive directory to replay, or None
+# @param options - dict of Fixture options (latency, jitter, errors, rate)
+# @param n       - number of symbols to mine
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def checkPagination():
+    from yassParam import Param
+    from yassConn import ConnPool
+    from yassScreener import Screener
+
+    yp = Param()
+    failed = 0
+    for n in (1, 19, 20, 21, 99, 100, 101, 250, 2000):
+      symbols = ['S%04i' % i for i in range(n)]
+      missing = symbols[7::13]
+
+      fx = Fixture(missing)
+      fx.start()
+      fx.attach()
+
+      pool = ConnPool()
+      sc = Screener(yp, symbols, pool)
+      table = sc.fetch()
+      pool.close()
+      want = set(symbols) - set(missing)
+      ok = set(table) == want and sorted(sc.missing()) == sorted(missing)
+      if not ok:
+        failed += 1
+
+      print '%5i symbols: %s, %i screener requests (vs %i quote pages)' % \
+              (n, 'ok' if ok else 'FAILED', fx.total('/screener.ashx'), n)
+
+      fx.detach()
+      fx.stop()
+    return failed
+
+  @staticmethod
+  def serve(port, archive, options):
+    if archive is not None:
+      archive = Archive(archive)
+    fx = Fixture(archive=archive, **options)
+    fx.server = FixtureServer(('127.0.0.1', port), FixtureHandler)
+    fx.server.fixture = fx
+    print 'serving on %s (%s); ^C to stop' % \
+            (fx.url(), 'replaying ' + archive.path if archive else 'synthetic')
+    try:
+      fx.server.serve_forever()
+    except KeyboardInterrupt:
+      pass
+    print 'served %i requests, statuses %r' % (fx.total(), fx.statuses)
+
+  @staticmethod
+  def load(n, options):
+    from yassParam import Param
+    from yassFinviz import Finviz
+
+    fx = Fixture(**options)
+    fx.start()
+    fx.attach()
+
+    name = 'fixture-symbols.txt'
+    with open(name, 'w') as f:
+      f.write('\n'.join(Fixture.symbols(n)) + '\n')
+
+    #the fixture does the throttling (if any), so don't hold back on our side
+    pace = Finviz.def_rate
+    Finviz.def_rate = 1e6
+
+    yp = Param(name)
+    yp.cache_dir = None
+    start = time.time()
+    yf = Finviz(yp)
+    elapsed = time.time() - start
+
+    Finviz.def_rate = pace
+    fx.detach()
+    fx.stop()
+    print '%i symbols (%i failed) in %.2fs: %.1f symbols/s; fixture served ' \
+          '%i requests, statuses %r' % (n, len(yf.failed), elapsed,
+                                        n / elapsed, fx.total(), fx.statuses)
+#########################################################  __main__ modes <static>
+
+
+################################################################################
+# __main__
+# Runs the pagination check (exiting non-zero on failure), or serves, or load
+#  tests; see the file header.
+#
+# @created 10/18/26
+# @updated 10/18/26
+if __name__ == '__main__':
+  args = [a for a in sys.argv[1:] if '=' not in a]
+  options = dict((k, float(v)) for k, v in
+                 (a.split('=', 1) for a in sys.argv[1:] if '=' in a))
+
+  if len(args) > 0 and args[0] == 'serve':
+    Fixture.serve(int(args[1]) if len(args) > 1 else 8000,
+                  args[2] if len(args) > 2 else None, options)
+  elif len(args) > 0 and args[0] == 'load':
+    Fixture.load(int(args[1]) if len(args) > 1 else 10000, options)
+  elif Fixture.checkPagination() > 0:
+    exit(1)
+######################################################################  __main__
+
+#//yassFixture.py
@@ -10,45 +10,79 @@
 #   requests
 #
 # @created 12/1/17
-# @updated 12/15/17
+# @updated 10/18/26
 ################################################################################
-import sys, threading, Queue, datetime, os.path
+import sys, threading, Queue, datetime, os, os.path, time, gzip
 import urllib, yaml, io, requests, re
 from yassParam import Param
+from yassCache import HttpCache
+from yassSched import Scheduler, StatusTable
+from yassArchive import Archive
 
 dateTimeFormat = "%Y%m%d %H:%M:%S"
 
 class yassHistory:
+  base_url = "https://query1.finance.yahoo.com/v7/finance/download/ZZZZ?"
   def_delta = -180     #default "lookback" time is 6 months
   def_connections = 20 #default maximum number of connections/threads
+  def_ttl = 12 * 60 * 60 #cached histories are good for 12 hours
+  def_rate = 5.0       #default maximum requests per second to yahoo!
+  def_chunk = 65536    #bytes read at a time when streaming a download
+  def_slack = 5        #days a stored history may start after the lookback 
+                       # (weekends, holidays) without being backfilled
+  
+  #fixed cookie & crumb to use instead of yahoo!'s (e.g. for yassFixture.py)
+  token = None
 
 ################################################################################
 # class HistoryThread
 # Establishes a thread for loading stock history data from Yahoo!, and writes 
-#  data to an appropriate subdirectory for this screen
+#  data to an appropriate subdirectory for this screen.  Jobs are handed out 
+#  by the shared Scheduler (yassSched.py), and each result is reported back
+#  to it so it can pace and retry the downloads.  Every attempt is also
+#  recorded in the history's StatusTable, which decides whether a failure is
+#  worth retrying.
+# Each thread keeps its own requests Session, so its downloads reuse one
+#  keep-alive connection (and accept gzip), and a download is streamed into
+#  a temporary file that only replaces the history once it's complete.
 #
 # @created 12/1/17
-# @updated 12/15/17
+# @updated 10/18/26
   class HistoryThread(threading.Thread):
-    def __init__(self, queue, pre, hist):
+    def __init__(self, sched, pre, hist):
       threading.Thread.__init__(self)
-      self.queue = queue
+      self.sched = sched
       self.prefix = pre
       self.hist = hist
+      
+      #one pooled connection per thread, with yahoo!'s cookie on every request
+      self.session = requests.Session()
+      self.session.mount('https://', requests.adapters.HTTPAdapter(
+                                       pool_connections=1, pool_maxsize=1))
+      self.session.mount('http://', requests.adapters.HTTPAdapter(
+                                      pool_connections=1, pool_maxsize=1))
+      self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+      self.session.cookies.set('B', self.hist._token['cookie'])
 
     def run(self):
       while 1:
-        try:
-          # fetch a job from the queue
-          ticker, fromdate, todate = self.queue.get_nowait()
-        except Queue.Empty:
+        # fetch a job from the scheduler
+        job = self.sched.get()
+        if job is None:
           raise SystemExit
+        ticker, fromdate, todate = job
         if ticker[0] == "^": 
           tick = ticker[1:]
         else:
           tick = ticker
-        filename = self.prefix + "%s.csv" % tick
-        fp = open(filename, "wb")
+        filename = self.hist.filename(tick)
+        
+        #an incremental download is merged into the stored series once it
+        # arrives, and the columnar store is written once they all have;
+        # otherwise the csv is replaced -- straight from the response, unless
+        # the body is wanted for the cache or the archive as well
+        streamed = not self.hist.incremental and self.hist.columns is None \
+                     and self.hist.cache is None and self.hist.archive is None
         quote = dict()
         quote['period1'] = yassHistory.epoch_seconds(fromdate)
         quote['period2'] = yassHistory.epoch_seconds(todate)
@@ -59,22 +93,99 @@ class yassHistory:
         #encode quote
         params = urllib.urlencode(quote)
 
-        url = "https://query1.finance.yahoo.com/v7/finance/download/%s?%s" % \
-                          (tick, params)
+        url = yassHistory.base_url.replace('ZZZZ', tick) + params
+        start = time.time()
         try:
-          data = requests.get(url, cookies={'B':self.hist._token['cookie']})
-          fp.write(data.text)
+          if streamed:
+            status, size, rows = self.stream(url, filename)
+          else:
+            if self.hist.cache is not None:
+              status, body = self.hist.cache.fetch(url, self.get, 
+                                                   yassHistory.def_ttl)
+            else:
+              status, hdrs, body = self.get(url, dict())
+            size = len(body)
+            rows = max(0, len(body.splitlines()) - 1)
+            
+            if status == 200 and size > 0:
+              if self.hist.columns is not None:
+                self.hist.collect(tick, body)
+              elif self.hist.incremental:
+                self.hist.merge(filename, body)
+              else:
+                self.hist.write(filename, body)
+              if self.hist.archive is not None:
+                self.hist.archive.add(url, body)
+          
+          #anything but a non-empty 200 goes back to the scheduler to retry
+          if status == 200 and size > 0:
+            self.hist.status.record(ticker, True, status, size, rows, None,
+                                    time.time() - start)
+            self.sched.success(job, time.time() - start)
+          else:
+            self.hist.yp.log('HTTP %i loading %s (HistoryThread.run)' % 
+                                            (status, tick))
+            retry = self.hist.status.record(ticker, False, status, size,
+                                            0, 'HTTP %i' % status,
+                                            time.time() - start)
+            self.sched.failure(job, status, retry)
         except IOError as ioe:
           self.hist.yp.log('IOError loading %s (HistoryThread.run)' % tick)
-          self.hist.reload.insert(len(self.hist.reload), 
-                                            (ticker, fromdate, todate))
-          self.hist.info('adding %s to reload queue... (HistoryThread.run)' %
-                                            tick)
+          retry = self.hist.status.record(ticker, False, None, 0, 0,
+                                          'IOError: %s' % ioe,
+                                          time.time() - start)
+          self.sched.failure(job, None, retry)
+        except Exception as e:
+          #anything else still has to be reported, or the scheduler would
+          # wait on this job forever
+          self.hist.yp.log('error loading %s: %r (HistoryThread.run)' % 
+                                            (tick, e))
+          retry = self.hist.status.record(ticker, False, None, 0, 0, repr(e),
+                                          time.time() - start)
+          self.sched.failure(job, None, retry)
 
-        #close up & cleanup
-        fp.close()
+        #a little progress
         sys.stdout.write(".")
         sys.stdout.flush()
+        
+    #getter for HttpCache.fetch(); yahoo! wants the cookie that goes with the
+    # crumb on every request (it's on the session)
+    def get(self, url, headers):
+      data = self.session.get(url, headers=headers)
+      hdrs = dict((k.lower(), v) for k, v in data.headers.items())
+      return data.status_code, hdrs, data.content
+    
+    #streams a download into filename (through a temporary file, renamed 
+    # over it once the whole body is in; gzipped if the name ends .gz), and
+    # returns (status, bytes, rows)
+    def stream(self, url, filename):
+      data = self.session.get(url, stream=True)
+      try:
+        if data.status_code != 200:
+          return data.status_code, len(data.content), 0
+        
+        tmp = filename + '.tmp'
+        size = lines = 0
+        last = '\n'
+        try:
+          with yassHistory.open_csv(tmp, 'wb', filename.endswith('.gz')) as f:
+            for chunk in data.iter_content(yassHistory.def_chunk):
+              f.write(chunk)
+              size += len(chunk)
+              lines += chunk.count('\n')
+              last = chunk[-1:] or last
+        except:
+          os.remove(tmp)
+          raise
+      finally:
+        data.close()
+      
+      if size == 0:
+        os.remove(tmp)
+      else:
+        os.rename(tmp, filename)
+      #rows after the header, counting a last one without a newline
+      return 200, size, max(0, lines - 1 + (last != '\n'))
 ###########################################################  class HistoryThread
 
 
@@ -86,7 +197,7 @@ class yassHistory:
 #             yassHistory object.
 #
 # @created 12/1/17
-# @updated 12/14/17
+# @updated 10/18/26
   def __init__(self, yp):
     #store a reference to the preferences
     self.yp = yp
@@ -94,7 +205,10 @@ class yassHistory:
     #store some basics
     self.today = datetime.datetime.now()
     self.today_str = datetime.datetime.now().strftime("%Y%m%d")
-    self.lookback = self.today+datetime.timedelta(yassHistory.def_delta)
+    if self.yp.history_days:
+      self.lookback = self.today - datetime.timedelta(self.yp.history_days)
+    else:
+      self.lookback = self.today+datetime.timedelta(yassHistory.def_delta)
     self.lookback_str = self.lookback.strftime("%Y%m%d")
     
     #print self.today, self.today_str
@@ -118,17 +232,43 @@ class yassHistory:
     #store reference to hist directory for this week's stocks
     self.prefix = "./hist/"
                   
-    #main queue for retrieving historical quotes
-    self.keepers = Queue.Queue()
-    
-    #copy of stock data for error processing
+    #jobs for retrieving historical quotes
     self.tickers = []
     
-    #and data for reloading
+    #histories that could not be retrieved within their retry budget, and
+    # the outcome of every download attempt
     self.reload = []
+    self.status = StatusTable()
+    
+    #only download the days missing from each stored history, and merge
+    # them in (instead of downloading & replacing the whole lookback)
+    self.incremental = self.yp.history_incremental
+    self.merge_lock = threading.Lock()
+    self.merged = 0
+    
+    #the columnar store (yassColumns.py) the histories go into instead of
+    # csvs, and the series downloaded for it
+    if self.yp.history_format == 'columns':
+      from yassColumns import Columns
+      self.columns = Columns(self.prefix + 'columns/')
+    else:
+      self.columns = None
+    self.updates = dict()
+    
+    #on-disk cache for downloaded histories
+    self.cache = None
+    
+    #record the histories we download, for replaying offline
+    if self.yp.record:
+      self.archive = Archive(self.yp.record)
+    else:
+      self.archive = None
     
     #get token from disk or yahoo
-    self._token = self.loadToken()
+    if yassHistory.token is not None:
+      self._token = yassHistory.token
+    else:
+      self._token = self.loadToken()
     
     #build the queue
     self.buildQueue()
@@ -137,46 +277,222 @@ class yassHistory:
     
 ################################################################################
 # buildQueue()
-# Builds the queue for retrieving historical data from symbols in symbol list
+# Builds the list of jobs for retrieving historical data from symbols in 
+#  symbol list
+# When downloading incrementally, each symbol's job only asks for the days
+#  after the last one stored; symbols that are up to date get no job at all.
+#  A history is only backfilled (downloaded over the whole lookback) once 
+#  the lookback reaches back past the first day stored.
 #
 # @created 12/1/17
-# @updated 12/10/17
+# @updated 10/18/26
   def buildQueue(self):
-    # put symbols into the queue
+    counts = {'full' : 0, 'forward' : 0, 'backfill' : 0, 'current' : 0}
+    
+    # put symbols into the job list
     for tick in self.symbols:
-      self.keepers.put((tick, self.lookback_str, self.today_str))
+      start = self.lookback_str
+      if self.incremental:
+        if self.columns is not None:
+          stored = self.columns.span(tick[1:] if tick[0] == "^" else tick)
+        else:
+          stored = yassHistory.stored_range(self.filename(tick))
+        if stored is None:
+          counts['full'] += 1
+        elif stored[0] > self.lookback.date() + \
+                         datetime.timedelta(yassHistory.def_slack):
+          counts['backfill'] += 1
+        else:
+          #the download ends before today, so yesterday is the last day due
+          # (and there's nothing to come on weekends)
+          after = stored[1] + datetime.timedelta(1)
+          while after.weekday() >= 5:
+            after += datetime.timedelta(1)
+          if after >= self.today.date():
+            counts['current'] += 1
+            continue
+          start = after.strftime("%Y%m%d")
+          counts['forward'] += 1
+      
       self.tickers.insert(len(self.tickers), 
-                        (tick, self.lookback_str, self.today_str))
+                        (tick, start, self.today_str))
     
     self.yp.log('read %i symbols from %s (yassHistory.buildQueue)' % \
-                    (len(self.tickers), self.yp.symbols_list))
+                    (len(self.symbols), self.yp.symbols_list))
+    if self.incremental:
+      self.yp.log('histories: %(current)i up to date, %(forward)i to fill '
+                  'forward, %(backfill)i to backfill, %(full)i to download in '
+                  'full (yassHistory.buildQueue)' % counts)
 ##################################################################  buildQueue()
 
 
 ################################################################################
 # checkFailed()
-# checks the history files compiled in the hist directory to determine if any
-#  are 0KB, and adds those stocks to the reload list
+# Collects the histories whose last download attempt failed (or that never
+#  got one) from the status table into the reload list for reporting, and
+#  writes the table out as a per-symbol report (hist/status/downloads.csv,
+#  in a directory of its own so nothing takes it for a history).
 #
 # @created 12/1/17
-# @updated 12/14/17
+# @updated 10/18/26
   def checkFailed(self):
+    seen = set()
     for tick in self.tickers:
-      if os.path.getsize(self.prefix + tick[0] + '.csv') == 0:
-        match = False
-        for sym in self.reload:
-          if tick[0] is sym[0]:
-            match = True
-        
-        #if the reload queue didn't already have the 0-sized stock, add it      
-        if match == False:
-          self.reload.insert(len(self.reload), tick)
+      if tick[0] not in seen and not self.status.ok(tick[0]):
+        self.reload.append(tick)
+      seen.add(tick[0])
     
-    self.info('found %i histories to reload... (yassHistory.checkFailed)' %
+    self.status.save(self.prefix + 'status/downloads.csv')
+    self.info('found %i histories that failed... (yassHistory.checkFailed)' %
                   len(self.reload))
+    self.info('status: %s (yassHistory.checkFailed)' % self.status.summary())
 #################################################################  checkFailed()
 
 
+################################################################################
+# filename(tick)
+# Returns the history file of a symbol (SYM.csv, or SYM.csv.gz when they're
+#  kept compressed).
+#
+# @param tick - symbol, with or without a leading '^'
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def filename(self, tick):
+    if tick[0] == "^":
+      tick = tick[1:]
+    if self.yp.history_gzip:
+      return self.prefix + "%s.csv.gz" % tick
+    return self.prefix + "%s.csv" % tick
+##############################################################  filename(tick)
+
+
+################################################################################
+# merge(filename, body)
+# Merges a downloaded csv into a stored history: rows are keyed by date, a
+#  downloaded row replaces a stored one for the same date, and the series is
+#  written back in date order (to a temporary file first, then renamed over
+#  the old one).  Returns the number of dates added.
+# write() just replaces a history with a downloaded csv, the same way.
+#
+# @param filename - stored history
+# @param body     - downloaded csv (header & rows)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def merge(self, filename, body):
+    header, rows = yassHistory.read_rows(body)
+    try:
+      with yassHistory.open_csv(filename, 'rb') as f:
+        old_header, stored = yassHistory.read_rows(f.read())
+    except IOError:
+      old_header, stored = None, dict()
+    
+    added = len(set(rows) - set(stored))
+    stored.update(rows)
+    
+    tmp = filename + '.tmp'
+    with yassHistory.open_csv(tmp, 'wb', filename.endswith('.gz')) as f:
+      f.write(header or old_header or '')
+      for day in sorted(stored):
+        f.write(stored[day])
+    os.rename(tmp, filename)
+    
+    with self.merge_lock:
+      self.merged += added
+    return added
+  
+  def write(self, filename, body):
+    tmp = filename + '.tmp'
+    with yassHistory.open_csv(tmp, 'wb', filename.endswith('.gz')) as f:
+      f.write(body)
+    os.rename(tmp, filename)
+############################################  merge(filename, body) / write()
+
+
+################################################################################
+# collect(tick, body)
+# Parses a downloaded csv for the columnar store, merged into what's stored
+#  for the symbol when downloading incrementally.  The store is written once
+#  every download is in (see getHistory()).
+#
+# @param tick - symbol (without '^')
+# @param body - downloaded csv
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def collect(self, tick, body):
+    from yassColumns import Columns
+    
+    series = Columns.parse(body)
+    if self.incremental:
+      old = self.columns.series(tick)
+      added = len(series['date']) if old is None else \
+                len(set(series['date']) - set(old['date']))
+      series = Columns.merge(old, series)
+    else:
+      added = len(series['date'])
+    with self.merge_lock:
+      self.updates[tick] = series
+      self.merged += added
+##########################################################  collect(tick, body)
+
+
+################################################################################
+# read_rows(text) / stored_range(filename) / open_csv(...) <static>
+# Splits a history csv into its header line and a dict of date -> row line
+#  (with its newline), and returns the first and last dates (date objects)
+#  stored in a history file, or None if there's no (non-empty) file.
+#  open_csv() opens a history file, through gzip if it's compressed.
+#
+# @param text     - csv text
+# @param filename - history file
+# @param mode     - file mode
+# @param compress - whether the file is gzipped; by default, if its name
+#                   ends .gz
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def read_rows(text):
+    lines = text.splitlines(True)
+    if len(lines) == 0:
+      return None, dict()
+    rows = dict()
+    for line in lines[1:]:
+      if line.strip():
+        if not line.endswith('\n'):
+          line += '\n'
+        rows[line.split(',', 1)[0]] = line
+    return lines[0], rows
+  
+  @staticmethod
+  def stored_range(filename):
+    try:
+      with yassHistory.open_csv(filename, 'rb') as f:
+        header, rows = yassHistory.read_rows(f.read())
+    except IOError:
+      return None
+    days = []
+    for day in rows:
+      try:
+        days.append(datetime.datetime.strptime(day, "%Y-%m-%d").date())
+      except ValueError:
+        pass
+    if len(days) == 0:
+      return None
+    return min(days), max(days)
+  
+  @staticmethod
+  def open_csv(filename, mode, compress=None):
+    if compress is None:
+      compress = filename.endswith('.gz')
+    if compress:
+      return gzip.open(filename, mode)
+    return open(filename, mode)
+######################  read_rows() / stored_range() / open_csv() <static>
+
+
 ################################################################################
 # epoch_seconds(date_string)
 # Returns an integer representation of the number of seconds elapsed from the
@@ -215,25 +531,37 @@ class yassHistory:
 
 ################################################################################
 # getHistory()
-# gets the historical quotes based on the loaded queue (self.keepers)
+# gets the historical quotes based on the loaded jobs (self.tickers)
 #
 # @created 12/2/17
-# @updated 12/14/17
+# @updated 10/18/26
   def getHistory(self):
     #add directory if not already created
     if not os.path.exists(self.prefix):
       os.makedirs(self.prefix)
+    
+    #serve histories we fetched recently from disk
+    if self.yp.cache_dir:
+      self.cache = HttpCache(self.yp.cache_dir)
 
-    num = len(self.keepers.queue)
+    num = len(self.tickers)
+    if num == 0:
+      self.info('every history is up to date (yassHistory.getHistory)')
+      return
     connections = min(yassHistory.def_connections, num)
     assert 1 <= connections <= 255, "too much concurrent connections asked"
 
-    # start a bunch of threads, passing them the queue of jobs to do
+    #pace & retry downloads; the concurrency limit starts low and grows to
+    # def_connections while yahoo! keeps up
+    sched = Scheduler(self.tickers, rate=yassHistory.def_rate, 
+                      most=connections)
+
+    # start a bunch of threads, passing them the scheduler of jobs to do
     threads = []
     for dummy in range(connections):
-      	t = self.HistoryThread(self.keepers, self.prefix, self)
-      	t.start()
-      	threads.append(t)
+      t = self.HistoryThread(sched, self.prefix, self)
+      t.start()
+      threads.append(t)
       
     self.info("waiting for history threads to finish... (yassHistory.getHistory)")
     
@@ -247,45 +575,58 @@ class yassHistory:
 
     self.info('finished trying %i histories... (yassHistory.getHistory)' %
                                   num)
+    self.info('scheduler: %s (yassHistory.getHistory)' % sched.summary())
+    if self.incremental:
+      self.info('merged %i new days into the stored histories '
+                '(yassHistory.getHistory)' % self.merged)
+    if self.columns is not None:
+      rows = self.columns.write(self.updates)
+      self.info('wrote %i histories into %s, %i rows in all '
+                '(yassHistory.getHistory)' % (len(self.updates), 
+                                              self.columns.path, rows))
 
-    #for some reason, IOErrors are not being fired off for some histories that
-    # remain empty...these files show up as 0KB files in the 'hist' directory,
-    # so we'll have to examine the filesystem to see which ones failed.
+    #the scheduler retries failed downloads itself (as the status table says);
+    # whatever still failed used up its retries, or wasn't worth retrying
     self.checkFailed()
     
-    while len(self.reload) > 0:
-      #clear the queue
-      with self.keepers.mutex:
-        self.keepers.queue.clear()
-      
-      cnx = min(5, len(self.reload))
-      self.info('trying to retrieve %i histories (yassHistory.getHistory)' %
-                          len(self.reload))
-      
-      for stock in self.reload:
-        self.keepers.put(stock)
-        self.info('added %s to reload queue (yassHistory.getHistory)' % stock[0])
-      
-      #reset reload
-      self.reload = []
-      
-      thr = []
-      for dummy in range(cnx):
-        t = self.HistoryThread(self.keepers, self.prefix, self)
-        t.start()
-        thr.append(t)
-      
-      self.info('waiting for reload threads to finish... (yassHistory.getHistory)')
-      
-      for thread in thr:
-        thread.join()
-      
-      #once threads have finished, check for histories that are still failed
-      self.checkFailed()
-    #//while len(self.reload) > 0
+    if self.cache is not None:
+      self.cache.save()
+      self.info('http cache: %s (yassHistory.getHistory)' % 
+                  self.cache.summary())
+    
+    if self.archive is not None:
+      self.archive.save()
+      self.info('recorded %i histories in %s (yassHistory.getHistory)' %
+                  (self.archive.recorded, self.archive.path))
 ##################################################################  getHistory()
 
 
+################################################################################
+# indicators(days)
+# Screens the stored histories (the columnar store or the csvs, as
+#  Param.history_format says) with the technical indicators of
+#  yassIndicators.py, computed for every symbol at once.  Needs numpy.
+#
+# @param days - most recent days to load; 52 weeks' worth by default
+#
+# @return dict of symbol -> dict of indicator -> value on the last day
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def indicators(self, days=None):
+    from yassIndicators import Panel, Indicators
+    start = time.time()
+    panel = Panel.load(self.prefix, days=days or Indicators.def_year,
+                       format=self.yp.history_format)
+    latest = Indicators.latest(panel, Indicators.screen(panel))
+    self.info('screened %i histories over %i days in %.2fs '
+              '(yassHistory.indicators)' % (len(panel.syms), 
+                                            len(panel.dates), 
+                                            time.time() - start))
+    return latest
+##############################################################  indicators(days)
+
+
 ################################################################################
 # loadToken()
 # Loads a browser token for retrieving historical data from Yahoo!...
@@ -392,7 +733,7 @@ if __name__ == '__main__':
 #  print 'hello'
 #  yp = Param()
 #  h = History(yp)
-#  h.averageVolumes()
+#  h.indicators()
   print 'hello'
   
 #//yassHistory.py
\ No newline at end of file
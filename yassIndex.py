@@ -0,0 +1,210 @@
+################################################################################
+# File:    yassIndex.py
+# Author:  Ryan Yusko
+#
+# Class that keeps a metapy inverted index over the mined documents in
+# ./docs/ (described by config.toml), so ranking is a lookup of the lexicon's
+# terms in the index (postings x weights, through a custom RankingFunction)
+# rather than a tokenizing pass over every document on every run.
+#
+# metapy indexes can't be updated in place, so the index remembers the
+# version (mtime & size) of each document it was built from.  Documents that
+# have changed since are scored directly (an overlay on the index) until more
+# than def_stale of them have, and then the index is rebuilt.
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import os, os.path, shutil, json, metapy
+
+################################################################################
+# class LexiconRanking
+# Scores a document as the sum, over the query's (lexicon) terms, of the
+#  term's count in the document times its weight.
+#
+# @created 10/18/26
+# @updated 10/18/26
+class LexiconRanking(metapy.index.RankingFunction):
+  def __init__(self, weights):
+    metapy.index.RankingFunction.__init__(self)
+    self.weights = weights #term id -> weight
+
+  def score_one(self, sd):
+    return self.weights.get(sd.t_id, 0) * sd.doc_term_count
+#######################################################  class LexiconRanking
+
+
+class DocIndex:
+  def_config = 'config.toml'   #metapy configuration (corpus, index, analyzer)
+  def_corpus = 'file.toml'     #corpus description, copied into the dataset
+  def_dataset = './docs/'      #the mined documents, as in config.toml
+  def_index = './idx/'         #the index, as in config.toml
+  def_list = 'docs-full-corpus.txt' #document list metapy reads the corpus from
+  def_manifest = 'yass-manifest.json' #documents (& versions) in the index
+  def_stale = 0.1              #fraction of changed documents before a rebuild
+
+################################################################################
+# __init__(yp, lexicon)
+# Opens the index if one has been built.  Call scores() to rank.
+#
+# @param yp      - Param() object from yassParam.py that handles logging
+# @param lexicon - Lexicon of sentiments (yassLexicon.py)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, yp, lexicon):
+    self.yp = yp
+    self.lexicon = lexicon
+    self.idx = None
+    self.manifest = dict()
+    self.rebuilt = False
+
+    try:
+      with open(os.path.join(DocIndex.def_index, DocIndex.def_manifest)) as f:
+        self.manifest = json.load(f)
+      self.idx = metapy.index.make_inverted_index(DocIndex.def_config)
+    except (IOError, ValueError):
+      self.idx = None
+      self.manifest = dict()
+##########################################################  __init__(yp, lexicon)
+
+
+################################################################################
+# scores(ticks, scorer)
+# Ranks the documents of the passed symbols: unchanged ones through the
+#  index, changed ones (the overlay) with the passed scorer.  Rebuilds the
+#  index first if it's missing or too much of it is out of date.
+#
+# @param ticks  - symbols (without '^') to rank
+# @param scorer - BatchScorer or PhraseScorer for the documents the index
+#                 doesn't have
+#
+# @return dict of symbol -> (score, tokens)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def scores(self, ticks, scorer):
+    table = dict()
+    
+    #symbols that have no document (yet) rank 0
+    versions = dict()
+    for tick in ticks:
+      v = self.version(tick)
+      if v is None:
+        table[tick] = (0, 0)
+      else:
+        versions[tick] = v
+    if len(versions) == 0:
+      return table
+    
+    stale = [tick for tick in versions
+             if self.manifest.get(tick) != list(versions[tick])]
+    if self.idx is None or len(stale) > DocIndex.def_stale * len(versions):
+      self.rebuild(versions)
+      stale = []
+
+    #every indexed document, looked up by the lexicon's terms
+    query, weights = self.query()
+    ranker = LexiconRanking(weights)
+    wanted = set(versions) - set(stale)
+    docs = dict()
+    for d_id in self.idx.docs():
+      tick = self.idx.label(d_id)
+      if tick in wanted:
+        docs[d_id] = tick
+        #no lexicon terms in it at all, unless the ranker finds some
+        table[tick] = (0, self.idx.doc_size(d_id))
+    for d_id, score in ranker.score(self.idx, query, self.idx.num_docs()):
+      if d_id in docs:
+        table[docs[d_id]] = (score, self.idx.doc_size(d_id))
+
+    #the overlay
+    for tick in stale:
+      with open(DocIndex.def_dataset + tick + '.txt', 'r') as f:
+        table[tick] = scorer.score(f.read())
+
+    self.yp.log('index ranked %i documents, %i from the overlay%s '
+                '(DocIndex.scores)' % (len(table), len(stale),
+                                       ', after a rebuild' if self.rebuilt
+                                       else ''))
+    return table
+#######################################################  scores(ticks, scorer)
+
+
+################################################################################
+# rebuild(versions)
+# Rebuilds the index over the passed documents: writes metapy's corpus
+#  description & document list into the dataset, indexes it, and saves the
+#  manifest of what was indexed.
+#
+# @param versions - dict of symbol -> version() of its (existing) document
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def rebuild(self, versions):
+    shutil.copy(DocIndex.def_corpus,
+                os.path.join(DocIndex.def_dataset, DocIndex.def_corpus))
+    with open(os.path.join(DocIndex.def_dataset, DocIndex.def_list), 'w') as f:
+      for tick in sorted(versions):
+        f.write('%s %s.txt\n' % (tick, tick))
+
+    self.idx = None
+    if os.path.exists(DocIndex.def_index):
+      shutil.rmtree(DocIndex.def_index)
+    self.idx = metapy.index.make_inverted_index(DocIndex.def_config)
+
+    self.manifest = dict((tick, list(v)) for tick, v in versions.iteritems())
+    with open(os.path.join(DocIndex.def_index, DocIndex.def_manifest),
+              'w') as f:
+      json.dump(self.manifest, f)
+    self.rebuilt = True
+
+    self.yp.log('indexed %i documents, %i terms (DocIndex.rebuild)' %
+                  (self.idx.num_docs(), self.idx.unique_terms()))
+#############################################################  rebuild(versions)
+
+
+################################################################################
+# query()
+# Builds the query holding every lexicon term the index knows, and the
+#  weights of their term ids.
+#
+# @return (query, weights) - metapy Document and dict of term id -> weight
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def query(self):
+    weights = dict()
+    terms = []
+    for term, weight in self.lexicon.weights.iteritems():
+      #metapy looks terms up (and returns them) as unicode; one it doesn't
+      # know gets an id past the last
+      t_id = self.idx.get_term_id(term)
+      if t_id < self.idx.unique_terms() and self.idx.term_text(t_id) == term:
+        weights[t_id] = weight
+        terms.append(term)
+
+    query = metapy.index.Document()
+    query.content(u' '.join(terms))
+    return query, weights
+######################################################################  query()
+
+
+################################################################################
+# version(tick)
+# Returns the version (mtime, size) of a symbol's document, or None if it
+#  doesn't have one.
+#
+# @param tick - symbol to look up
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def version(self, tick):
+    try:
+      st = os.stat(DocIndex.def_dataset + tick + '.txt')
+    except OSError:
+      return None
+    return (st.st_mtime, st.st_size)
+###############################################################  version(tick)
+
+#//yassIndex.py
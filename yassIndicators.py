@@ -0,0 +1,483 @@
+################################################################################
+# File:    yassIndicators.py
+# Author:  Ryan Yusko
+#
+# Technical indicators over the stored histories, for every symbol at once.
+# The histories are laid out as a Panel: one 2-D array (date x symbol) per
+# field, over the union of the symbols' trading days.  Gaps in a symbol's
+# prices are carried forward from its last close; days before its first row
+# are NaN.  Every indicator is then a few whole-array numpy operations on the
+# panel -- cumulative sums for the simple averages, a decayed cumulative sum
+# for the exponential ones, and block prefix/suffix maxima (van Herk/Gil-
+# Werman) for the rolling highs & lows -- with no loop over days or symbols.
+#
+# Indicators:
+#   sma, ema        - simple & exponential moving averages of the close
+#   rsi             - relative strength index (Wilder)
+#   atr             - average true range (Wilder)
+#   avg_volume      - average daily volume
+#   rel_volume      - the day's volume over the average of the days before
+#   high_52, low_52 - highest high & lowest low of the last 52 weeks
+#
+# Panels load from the columnar store (yassColumns.py) or from the csvs in a
+# history directory, as Param.history_format says the histories are kept.
+# Running this file times the indicators on a synthetic panel, and screens a
+# history directory if one is passed:
+#   python yassIndicators.py {symbols=5000} {days=250} {hist} {format=csv}
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import sys, os, os.path, time, gzip
+import numpy as np
+from yassColumns import Columns
+
+class Panel:
+  #the price fields carried forward over a symbol's gaps
+  prices = ['open', 'high', 'low', 'close', 'adj_close']
+
+################################################################################
+# __init__(dates, syms, fields)
+# Holds date x symbol arrays of the history fields.
+#
+# @param dates  - int32 array of date ordinals, ascending (the rows)
+# @param syms   - list of symbols (the columns)
+# @param fields - dict of field name (as in Columns.fields) -> 2-D array
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, dates, syms, fields):
+    self.dates = dates
+    self.syms = syms
+    self.fields = fields
+    for name in fields:
+      setattr(self, name, fields[name])
+##############################################  __init__(dates, syms, fields)
+
+
+################################################################################
+# build(syms, lengths, columns, days) <static>
+# Lays out symbols' series, stored back to back (as in the columnar store),
+#  as a Panel: every row is scattered into place at once by its date's
+#  position among all the dates and its symbol's column.
+#
+# @param syms    - symbols, in the order their rows are stored
+# @param lengths - number of rows of each symbol
+# @param columns - dict of field name -> concatenated rows of every symbol,
+#                  each symbol's in date order
+# @param days    - number of most recent dates to keep, or None for all
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def build(syms, lengths, columns, days=None):
+    dates = np.unique(columns['date'])
+    if days is not None:
+      dates = dates[-days:]
+    keep = columns['date'] >= (dates[0] if len(dates) else 0)
+    row = np.searchsorted(dates, columns['date'][keep])
+    col = np.repeat(np.arange(len(syms)), lengths)[keep]
+
+    shape = (len(dates), len(syms))
+    fields = dict()
+    for name, kind in Columns.fields[1:]:
+      fields[name] = np.full(shape, np.nan)
+      fields[name][row, col] = columns[name][keep]
+
+    #carry prices forward over gaps (days other symbols traded); a gap's
+    # volume is 0
+    have = np.zeros(shape, dtype=bool)
+    have[row, col] = True
+    last = np.maximum.accumulate(np.where(have, np.arange(len(dates))[:, None],
+                                          0), axis=0)
+    cols = np.arange(len(syms))[None, :]
+    for name in Panel.prices:
+      fields[name] = fields[name][last, cols]
+    started = np.isfinite(fields['close'])
+    fields['volume'][started & ~have] = 0.0
+    return Panel(dates, list(syms), fields)
+###########################################  build(syms, lengths, ...) <static>
+
+
+################################################################################
+# load(prefix, syms, days, format) <static>
+# Loads a Panel from a history directory: from its columnar store or from its
+#  csvs (or gzipped csvs), whichever the histories are kept as
+#  (Param.history_format).  csvs without any history rows are skipped.
+#
+# @param prefix - history directory
+# @param syms   - symbols to load, or None for all stored
+# @param days   - number of most recent dates to keep, or None for all
+# @param format - 'csv' or 'columns', as Param.history_format
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def load(prefix='./hist/', syms=None, days=None, format='csv'):
+    if format == 'columns':
+      return Panel.from_store(Columns(os.path.join(prefix, 'columns')), syms,
+                              days)
+
+    series = dict()
+    for name in sorted(os.listdir(prefix)):
+      if name.endswith('.csv'):
+        sym, opener = name[:-4], open
+      elif name.endswith('.csv.gz'):
+        sym, opener = name[:-7], gzip.open
+      else:
+        continue
+      if syms is None or sym in syms:
+        with opener(os.path.join(prefix, name), 'rb') as f:
+          parsed = Columns.parse(f.read())
+        if len(parsed['date']) > 0:
+          series[sym] = parsed
+    return Panel.from_series(series, days)
+
+  @staticmethod
+  def from_store(store, syms=None, days=None):
+    syms = sorted(store.index if syms is None else
+                  [s for s in syms if s in store.index])
+    spans = [store.index[s] for s in syms]
+    if spans == sorted(spans) and len(syms) == len(store.index):
+      #the whole store, already back to back in symbol order
+      columns = store.columns
+    else:
+      take = np.concatenate([np.arange(a, b) for a, b in spans]) if spans \
+               else np.zeros(0, dtype=np.intp)
+      columns = dict((name, store.columns[name][take])
+                     for name, kind in Columns.fields)
+    return Panel.build(syms, [b - a for a, b in spans], columns, days)
+
+  @staticmethod
+  def from_series(series, days=None):
+    syms = sorted(series)
+    columns = dict((name, np.concatenate([series[s][name] for s in syms])
+                          if syms else np.zeros(0, dtype=kind))
+                   for name, kind in Columns.fields)
+    return Panel.build(syms, [len(series[s]['date']) for s in syms], columns,
+                       days)
+##################################################  load(prefix, ...) <static>
+
+
+################################################################################
+# class Indicators
+# The indicators, each a function of date x symbol arrays returning one of
+#  the same shape; a row is NaN for a symbol until it has enough days.
+#
+# @created 10/18/26
+# @updated 10/18/26
+class Indicators:
+  def_sma = 50         #default moving average windows, days
+  def_ema = 20
+  def_rsi = 14         #default Wilder smoothing periods
+  def_atr = 14
+  def_volume = 50      #default volume average window
+  def_year = 252       #trading days in 52 weeks
+
+  #largest power an exponential average's decay is raised to before it's
+  # restarted from a carried value, well inside float64's range
+  max_exponent = 300.0
+
+################################################################################
+# sma(x, n) / ema(x, n, wilder)
+# Moving averages down the rows of x: the mean of the last n rows, and the
+#  exponential average with alpha 2/(n+1) (or Wilder's 1/n), weighted over
+#  every row so far (so it's seeded by the first rows rather than a single
+#  one).  Both are NaN until a series has n rows.
+#
+# @param x      - 2-D array, NaN only before each series starts (as in a
+#                 Panel)
+# @param n      - window / span, rows
+# @param wilder - Wilder's smoothing (alpha 1/n) instead of 2/(n+1)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def sma(x, n):
+    filled, age = Indicators.started(x)
+    out = Indicators.window_sum(filled, n)
+    out /= n
+    out[age < n] = np.nan
+    return out
+
+  @staticmethod
+  def ema(x, n, wilder=False):
+    filled, age = Indicators.started(x)
+    return Indicators.smooth(filled, age, n, 1.0 / n if wilder else
+                                             2.0 / (n + 1))
+#########################################################  sma() / ema()
+
+
+################################################################################
+# rsi(close, n) / atr(high, low, close, n)
+# Wilder's relative strength index (100 * average gain over average gain +
+#  loss, of the day-to-day changes of the close) and average true range (of
+#  the greatest of the day's range and its high & low against the previous
+#  close).
+#
+# @param close     - date x symbol closes
+# @param high, low - date x symbol highs & lows
+# @param n         - smoothing period, days
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def rsi(close, n=def_rsi):
+    change = np.full(close.shape, np.nan)
+    np.subtract(close[1:], close[:-1], out=change[1:])
+    change, age = Indicators.started(change)
+    gain = Indicators.smooth(np.maximum(change, 0.0), age, n, 1.0 / n)
+    loss = Indicators.smooth(np.maximum(-change, 0.0), age, n, 1.0 / n)
+    loss += gain
+    with np.errstate(invalid='ignore', divide='ignore'):
+      gain *= 100.0
+      gain /= loss
+    return gain
+
+  @staticmethod
+  def atr(high, low, close, n=def_atr):
+    true_range = high - low
+    np.fmax(true_range[1:], np.abs(high[1:] - close[:-1]),
+            out=true_range[1:])
+    np.fmax(true_range[1:], np.abs(low[1:] - close[:-1]), out=true_range[1:])
+    return Indicators.ema(true_range, n, True)
+############################################################  rsi() / atr()
+
+
+################################################################################
+# avg_volume(volume, n) / rel_volume(volume, n, average)
+# The average daily volume of the last n days, and each day's volume relative
+#  to the average of the n days before it.
+#
+# @param volume  - date x symbol volumes
+# @param n       - window, days
+# @param average - avg_volume(volume, n), if it's been computed already
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def avg_volume(volume, n=def_volume):
+    return Indicators.sma(volume, n)
+
+  @staticmethod
+  def rel_volume(volume, n=def_volume, average=None):
+    if average is None:
+      average = Indicators.avg_volume(volume, n)
+    out = np.full(volume.shape, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+      np.divide(volume[1:], average[:-1], out=out[1:])
+    out[np.isinf(out)] = np.nan
+    return out
+######################################################  avg_volume() / rel_volume()
+
+
+################################################################################
+# rolling_max(x, n) / rolling_min(x, n)
+# Highest & lowest value of the last n rows (fewer at the start), ignoring
+#  NaNs.  The rows are split into blocks of n; a window spans at most two,
+#  so its maximum is that of the suffix maximum of one block and the prefix
+#  maximum of the next.
+#
+# @param x - 2-D array
+# @param n - window, rows
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def rolling_max(x, n):
+    rows = x.shape[0]
+    if n >= rows:
+      return np.fmax.accumulate(x, axis=0)
+
+    blocks = -(-rows // n)
+    padded = np.full((blocks * n,) + x.shape[1:], np.nan)
+    padded[:rows] = x
+    padded = padded.reshape((blocks, n) + x.shape[1:])
+    prefix = np.fmax.accumulate(padded, axis=1).reshape((-1,) + x.shape[1:])
+    suffix = np.fmax.accumulate(padded[:, ::-1], axis=1)[:, ::-1] \
+               .reshape((-1,) + x.shape[1:])
+    out = prefix[:rows].copy()
+    np.fmax(suffix[:rows - n + 1], prefix[n - 1:rows], out=out[n - 1:])
+    return out
+
+  @staticmethod
+  def rolling_min(x, n):
+    return -Indicators.rolling_max(-x, n)
+#############################################  rolling_max() / rolling_min()
+
+
+################################################################################
+# started(x) / smooth(filled, age, n, alpha) <static>
+# The helpers the averages share.  started() returns x with its NaNs zeroed,
+#  and how many rows each series has had by each row (0 or less before it
+#  starts).  smooth() is the exponential average of such a series: the
+#  decayed sum of the rows so far over the decayed count of them, which for
+#  a series of age a is (1 - d^a) / (1 - d).
+#
+# @param x      - 2-D array, NaN only before each series starts
+# @param filled - x with its NaNs zeroed
+# @param age    - rows each series has had, from started()
+# @param n      - rows a series needs before it has an average
+# @param alpha  - smoothing factor, 0 < alpha <= 1
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def started(x):
+    valid = np.isfinite(x)
+    first = valid.argmax(axis=0)
+    first[~valid.any(axis=0)] = x.shape[0]
+    age = np.arange(1, x.shape[0] + 1)[:, None] - first[None, :]
+    return np.where(valid, x, 0.0), age
+
+  @staticmethod
+  def smooth(filled, age, n, alpha):
+    d = 1.0 - alpha
+    powers = d ** np.arange(filled.shape[0] + 1)
+    out = Indicators.decayed_sum(filled, d)
+    out *= alpha
+    with np.errstate(invalid='ignore', divide='ignore'):
+      out /= 1.0 - powers.take(np.maximum(age, 0))
+    out[age < n] = np.nan
+    return out
+############################################  started() / smooth() <static>
+
+
+################################################################################
+# window_sum(x, n) / decayed_sum(x, d) <static>
+# Sums down the rows of x: of the last n rows (fewer at the start), from a
+#  cumulative sum; and sum_k d^(t-k) x_k over every row so far, which is
+#  d^t times the cumulative sum of d^-k x_k, taken in blocks short enough
+#  that d^-k can't overflow.
+#
+# @param x - 2-D array without NaNs
+# @param n - window, rows
+# @param d - decay per row, 0 <= d < 1
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def window_sum(x, n):
+    total = np.cumsum(x, axis=0)
+    total[n:] = total[n:] - total[:-n]
+    return total
+
+  @staticmethod
+  def decayed_sum(x, d):
+    if d <= 0.0:
+      return x.copy()
+    block = max(1, int(Indicators.max_exponent / -np.log(d)))
+    out = np.empty(x.shape)
+    for start in range(0, x.shape[0], block):
+      stop = min(start + block, x.shape[0])
+      k = np.arange(stop - start, dtype=float)[:, None]
+      part = out[start:stop]
+      np.multiply(x[start:stop], d ** -k, out=part)
+      np.cumsum(part, axis=0, out=part)
+      part *= d ** k
+      if start > 0:
+        part += d ** (k + 1) * out[start - 1]
+    return out
+######################################  window_sum() / decayed_sum() <static>
+
+
+################################################################################
+# screen(panel) / latest(panel, table) <static>
+# Computes every indicator over a Panel (windows from the def_* constants),
+#  and reads off each symbol's values on the panel's last day.
+#
+# @param panel - Panel of the histories
+# @param table - dict of indicator name -> date x symbol array, from screen()
+#
+# @return screen(): dict of indicator name -> date x symbol array;
+#         latest(): dict of symbol -> dict of indicator name -> value (None
+#                   where there weren't enough days)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def screen(panel):
+    I = Indicators
+    volume = I.avg_volume(panel.volume, I.def_volume)
+    return {'close' : panel.close,
+            'sma' : I.sma(panel.close, I.def_sma),
+            'ema' : I.ema(panel.close, I.def_ema),
+            'rsi' : I.rsi(panel.close, I.def_rsi),
+            'atr' : I.atr(panel.high, panel.low, panel.close, I.def_atr),
+            'avg_volume' : volume,
+            'rel_volume' : I.rel_volume(panel.volume, I.def_volume, volume),
+            'high_52' : I.rolling_max(panel.high, I.def_year),
+            'low_52' : I.rolling_min(panel.low, I.def_year)}
+
+  @staticmethod
+  def latest(panel, table):
+    if len(panel.dates) == 0:
+      return dict((sym, dict()) for sym in panel.syms)
+    last = dict((name, table[name][-1].tolist()) for name in table)
+    return dict((sym, dict((name, None if last[name][i] != last[name][i]
+                                  else last[name][i]) for name in last))
+                for i, sym in enumerate(panel.syms))
+###############################################  screen() / latest() <static>
+
+
+################################################################################
+# synthetic(syms, days) <static>
+# A Panel of random walks, for timing.
+#
+# @param syms - number of symbols
+# @param days - number of days
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def synthetic(syms, days):
+    rng = np.random.RandomState(410)
+    close = 50.0 * np.exp(np.cumsum(rng.normal(0, 0.02, (days, syms)),
+                                    axis=0))
+    spread = close * rng.uniform(0, 0.03, (days, syms))
+    fields = {'open' : close + rng.uniform(-0.5, 0.5, (days, syms)) * spread,
+              'high' : close + spread, 'low' : close - spread,
+              'close' : close, 'adj_close' : close,
+              'volume' : rng.lognormal(13, 1, (days, syms))}
+    return Panel(np.arange(days, dtype=np.int32) + 736000,
+                 ['S%05i' % i for i in range(syms)], fields)
+###########################################################  synthetic() <static>
+
+
+################################################################################
+# __main__
+# Times the indicators over a synthetic panel (5000 symbols x 250 days by
+#  default), and screens a history directory if one is passed, printing the
+#  symbols with the highest relative volume.
+#
+# @created 10/18/26
+# @updated 10/18/26
+if __name__ == '__main__':
+  syms = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+  days = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+
+  panel = Indicators.synthetic(syms, days)
+  start = time.time()
+  table = Indicators.screen(panel)
+  latest = Indicators.latest(panel, table)
+  print 'screened %i symbols x %i days in %.3fs' % \
+          (syms, days, time.time() - start)
+
+  if len(sys.argv) > 3:
+    start = time.time()
+    panel = Panel.load(sys.argv[3], days=Indicators.def_year,
+                       format=sys.argv[4] if len(sys.argv) > 4 else 'csv')
+    loaded = time.time() - start
+    latest = Indicators.latest(panel, Indicators.screen(panel))
+    print 'loaded %i histories (%i days) in %.3fs, screened in %.3fs' % \
+            (len(panel.syms), len(panel.dates), loaded,
+             time.time() - start - loaded)
+    ranked = sorted((v['rel_volume'], sym) for sym, v in latest.iteritems()
+                    if v.get('rel_volume') is not None)
+    for rel, sym in ranked[::-1][:10]:
+      v = latest[sym]
+      print '%-8s close %8.2f  rsi %5.1f  rel volume %5.2f  52w %.2f-%.2f' % \
+              (sym, v['close'], v['rsi'] or 0, rel, v['low_52'], v['high_52'])
+######################################################################  __main__
+
+#//yassIndicators.py
@@ -0,0 +1,187 @@
+################################################################################
+# File:    yassLexicon.py
+# Author:  Ryan Yusko
+#
+# Sentiment lexicon used by Rank: a dict of term -> weight, so looking a token
+# up is a single hash probe instead of a scan over the word lists.  The word
+# lists (config/positive-words.txt, config/negative-words.txt) are read once,
+# with ';' comment lines and blanks skipped and every term decoded to unicode
+# (the lists aren't all in the same encoding).  Positive terms weigh +1 and
+# negative terms -1, unless a line gives its own weight after the term; a
+# term in both lists counts as positive.
+#
+# The lexicon is compiled to a small marshal file (config/lexicon.bin) that
+# later runs load instead of the word lists, for as long as the lists don't
+# change.
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import os, os.path, marshal, hashlib
+
+class Lexicon:
+  def_positive = 'config/positive-words.txt'
+  def_negative = 'config/negative-words.txt'
+  def_compiled = 'config/lexicon.bin'
+  format = 1 #version of the compiled file's layout
+
+  #lexicons already loaded in this process, by compiled file name
+  loaded = dict()
+
+################################################################################
+# __init__(weights, sources)
+# Initializes the lexicon from a dict of (unicode) term -> weight.  Use
+#  Lexicon.load() to get the one built from the word lists.  The version is a
+#  hash of the terms & weights.
+#
+# @param weights - dict of term -> weight
+# @param sources - list of (file name, mtime, size) the lexicon was read from
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, weights, sources=()):
+    self.weights = weights
+    self.sources = list(sources)
+
+    #identifies the contents, for caches of scores computed with it
+    self.version = hashlib.sha1(repr(sorted(weights.iteritems()))).hexdigest()
+
+    #where the lexicon came from: 'lists' or 'compiled'
+    self.origin = 'lists'
+################################################################  __init__()
+
+
+################################################################################
+# weight(term)
+# Returns the weight of a term (0 if it isn't in the lexicon).
+#
+# @param term - token; utf-8 str or unicode
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def weight(self, term):
+    if isinstance(term, str):
+      term = term.decode('utf-8', 'replace')
+    return self.weights.get(term, 0)
+###############################################################  weight(term)
+
+
+################################################################################
+# score(counts)
+# Returns the sentiment score of a bag of words: each term's count times its
+#  weight, summed.
+#
+# @param counts - dict-like of term -> count (e.g. a metapy feature vector)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def score(self, counts):
+    score = 0
+    for term in counts:
+      w = self.weight(term)
+      if w != 0:
+        score += w * counts[term]
+    return score
+##############################################################  score(counts)
+
+
+################################################################################
+# save(name)
+# Writes the compiled lexicon.
+#
+# @param name - file to write
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def save(self, name):
+    with open(name + '.tmp', 'wb') as f:
+      marshal.dump({'format' : Lexicon.format, 'sources' : self.sources,
+                    'weights' : self.weights}, f)
+    os.rename(name + '.tmp', name)
+################################################################  save(name)
+
+
+################################################################################
+# load(positive, negative, compiled) <static>
+# Returns the lexicon for the passed word lists, loading it only once per
+#  process: from the compiled file if it's up to date with the lists,
+#  otherwise from the lists themselves (and then compiling it for next time).
+#
+# @param positive - positive word list
+# @param negative - negative word list
+# @param compiled - compiled lexicon file
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def load(positive=def_positive, negative=def_negative,
+           compiled=def_compiled):
+    if compiled in Lexicon.loaded:
+      return Lexicon.loaded[compiled]
+
+    sources = [Lexicon.stamp(positive), Lexicon.stamp(negative)]
+    lex = None
+    try:
+      with open(compiled, 'rb') as f:
+        data = marshal.load(f)
+      if data['format'] == Lexicon.format and \
+         [tuple(s) for s in data['sources']] == sources:
+        lex = Lexicon(data['weights'], sources)
+        lex.origin = 'compiled'
+    except (IOError, EOFError, ValueError, TypeError, KeyError):
+      lex = None
+
+    if lex is None:
+      #negative first, so positive wins for a term in both lists
+      weights = Lexicon.read(negative, -1)
+      weights.update(Lexicon.read(positive, 1))
+      lex = Lexicon(weights, sources)
+      try:
+        lex.save(compiled)
+      except (IOError, OSError):
+        pass
+
+    Lexicon.loaded[compiled] = lex
+    return lex
+###################################  load(positive, negative, compiled) <static>
+
+
+################################################################################
+# read(name, weight) / stamp(name) <static>
+# Reads a word list into a dict of term -> weight: one term per line, with
+#  an optional weight after it, skipping blanks and ';' comments.  Terms are
+#  decoded as utf-8, or latin-1 where that fails, and lowercased.
+#  stamp() identifies a version of a file by its name, mtime and size.
+#
+# @param name   - word list to read
+# @param weight - weight of a term that doesn't give its own
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def read(name, weight):
+    weights = dict()
+    with open(name, 'rb') as f:
+      for line in f:
+        line = line.strip()
+        if len(line) == 0 or line.startswith(';'):
+          continue
+        try:
+          line = line.decode('utf-8')
+        except UnicodeDecodeError:
+          line = line.decode('latin-1')
+
+        fields = line.split()
+        if len(fields) > 1:
+          weights[fields[0].lower()] = float(fields[1])
+        else:
+          weights[fields[0].lower()] = weight
+    return weights
+
+  @staticmethod
+  def stamp(name):
+    st = os.stat(name)
+    return (name, int(st.st_mtime), st.st_size)
+####################################################  read() / stamp() <static>
+
+#//yassLexicon.py
@@ -0,0 +1,182 @@
+################################################################################
+# File:    yassMatrix.py
+# Author:  Ryan Yusko
+#
+# Document-term matrix of the mined documents, for ranking the whole corpus
+# at once.  Each document's term counts (from the unigram analyzer chain,
+# yassScore.py) are kept as a row of a sparse matrix in CSR form (numpy
+# arrays indptr, indices & data) over a vocabulary shared by all documents.
+# Scoring every symbol is then a single sparse matrix-vector product with
+# the lexicon's weights laid out as a vector over the vocabulary, so a
+# changed lexicon (or weights) re-ranks the corpus without tokenizing any
+# of it again.
+#
+# The matrix is saved in ./docs/terms.npz along with a digest of each
+# document it was built from; next run, the rows of unchanged documents are
+# kept, and only new or changed documents go through the analyzer.  Terms
+# only ever get new ids, so kept rows stay valid.
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import os, os.path, hashlib
+import numpy as np
+
+class TermMatrix:
+  def_name = './docs/terms.npz' #default matrix file
+  format = 1                    #version of the saved file's layout
+
+################################################################################
+# __init__(name)
+# Loads the saved matrix, if there is one (and it's readable).
+#
+# @param name - matrix file
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, name=def_name):
+    self.name = name
+    self.vocab = []        #term id -> term
+    self.ids = dict()      #term -> term id
+    self.labels = []       #row -> symbol
+    self.digests = []      #row -> digest of the document it came from
+    self.indptr = np.zeros(1, dtype=np.int64)
+    self.indices = np.zeros(0, dtype=np.int32)
+    self.data = np.zeros(0, dtype=np.int32)
+
+    #rows kept & rebuilt by the last update()
+    self.kept = 0
+    self.built = 0
+
+    try:
+      saved = np.load(name)
+      if int(saved['format']) == TermMatrix.format:
+        self.vocab = [unicode(t) for t in saved['vocab']]
+        self.labels = [unicode(t) for t in saved['labels']]
+        self.digests = [unicode(t) for t in saved['digests']]
+        self.indptr = saved['indptr']
+        self.indices = saved['indices']
+        self.data = saved['data']
+        self.ids = dict((t, i) for i, t in enumerate(self.vocab))
+    except (IOError, KeyError, ValueError):
+      pass
+###############################################################  __init__(name)
+
+
+################################################################################
+# update(documents, counter)
+# Makes the matrix hold exactly the passed documents, in order: rows of
+#  documents unchanged since they were counted are kept, the rest are
+#  counted with the passed counter.
+#
+# @param documents - iterable of (symbol, utf-8 text)
+# @param counter   - function of a text returning its term -> count (e.g.
+#                    BatchScorer.counts)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def update(self, documents, counter):
+    rows = dict((sym, (i, d)) for i, (sym, d) in
+                enumerate(zip(self.labels, self.digests)))
+    labels, digests, parts_i, parts_d, lengths = [], [], [], [], []
+    self.kept = self.built = 0
+
+    for sym, text in documents:
+      digest = hashlib.sha1(text).hexdigest()
+      if sym in rows and rows[sym][1] == digest:
+        i = rows[sym][0]
+        lo, hi = self.indptr[i], self.indptr[i + 1]
+        parts_i.append(self.indices[lo:hi])
+        parts_d.append(self.data[lo:hi])
+        self.kept += 1
+      else:
+        counts = counter(text)
+        row = sorted((self.term_id(t), counts[t]) for t in counts)
+        parts_i.append(np.array([t for t, n in row], dtype=np.int32))
+        parts_d.append(np.array([n for t, n in row], dtype=np.int32))
+        self.built += 1
+      labels.append(sym)
+      digests.append(digest)
+      lengths.append(len(parts_i[-1]))
+
+    self.labels = labels
+    self.digests = digests
+    self.indptr = np.concatenate(([0], np.cumsum(lengths, dtype=np.int64)))
+    self.indices = np.concatenate(parts_i) if parts_i else \
+                     np.zeros(0, dtype=np.int32)
+    self.data = np.concatenate(parts_d) if parts_d else \
+                  np.zeros(0, dtype=np.int32)
+##########################################################  update(documents, ...)
+
+
+################################################################################
+# term_id(term)
+# Returns a term's id in the vocabulary, adding it if it's new.
+#
+# @param term - term; utf-8 str or unicode
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def term_id(self, term):
+    if isinstance(term, str):
+      term = term.decode('utf-8', 'replace')
+    if term not in self.ids:
+      self.ids[term] = len(self.vocab)
+      self.vocab.append(term)
+    return self.ids[term]
+#############################################################  term_id(term)
+
+
+################################################################################
+# weights(lexicon)
+# Lays a lexicon's weights out as a vector over the vocabulary.
+#
+# @param lexicon - Lexicon of sentiments (yassLexicon.py)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def weights(self, lexicon):
+    return np.array([lexicon.weights.get(t, 0) for t in self.vocab],
+                    dtype=float)
+###########################################################  weights(lexicon)
+
+
+################################################################################
+# scores(weights)
+# Scores every document: the sparse matrix-vector product of the matrix with
+#  a weight vector, and each document's token count (its row sum).
+#
+# @param weights - vector over the vocabulary, as from weights()
+#
+# @return dict of symbol -> (score, tokens)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def scores(self, weights):
+    n = len(self.labels)
+    row = np.repeat(np.arange(n), np.diff(self.indptr))
+    score = np.bincount(row, weights=self.data * weights[self.indices],
+                        minlength=n)
+    tokens = np.bincount(row, weights=self.data, minlength=n)
+    return dict((sym, (float(score[i]), int(tokens[i])))
+                for i, sym in enumerate(self.labels))
+#############################################################  scores(weights)
+
+
+################################################################################
+# save()
+# Writes the matrix (and what it was built from) for the next run.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def save(self):
+    tmp = self.name + '.tmp.npz'
+    np.savez(tmp, format=TermMatrix.format,
+             vocab=np.array(self.vocab, dtype=np.unicode_),
+             labels=np.array(self.labels, dtype=np.unicode_),
+             digests=np.array(self.digests, dtype=np.unicode_),
+             indptr=self.indptr, indices=self.indices, data=self.data)
+    os.rename(tmp, self.name)
+#######################################################################  save()
+
+#//yassMatrix.py
@@ -0,0 +1,221 @@
+################################################################################
+# File:    yassMemo.py
+# Author:  Ryan Yusko
+#
+# Persistent cache of per-headline sentiment scores.  The same wire headline
+# turns up under many symbols and stays on finviz for days, so rather than
+# scoring whole documents, each line (rating or headline, less its date) is
+# normalised, hashed and looked up; only lines not seen before are scored,
+# and a document's score is the sum over its lines.  Scores are kept in a
+# SQLite file for the scorer version (lexicon, scorer & phrases) that
+# computed them, and the least recently used are evicted past def_max_rows.
+#
+# HeadlineCache wraps a scorer (yassScore.py or yassPhrase.py) and has the
+# same score()/run() interface, so Rank can use it in their place (set
+# headline_cache in yassParam.py).  Token counts are the scorer's counts for
+# the lines, so they leave out the dates.
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import os.path, re, sqlite3, hashlib, unicodedata
+
+class HeadlineCache:
+  def_name = './cache/headlines.db' #default cache file
+  def_max_rows = 1000000            #default number of headlines kept
+
+  #the date each line of a mined document starts with
+  date_re = re.compile(r'^[A-Z][a-z]{2}-\d\d-\d\d, ')
+  space_re = re.compile(r'\s+', re.U)
+
+################################################################################
+# __init__(scorer, name, max_rows)
+# Opens (creating if need be) the cache for the passed scorer.  Scores left
+#  by any other scorer version are dropped.
+#
+# @param scorer   - scorer to compute the scores of headlines not cached
+# @param name     - cache file
+# @param max_rows - number of headlines kept
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, scorer, name=def_name, max_rows=def_max_rows):
+    self.scorer = scorer
+    self.name = name
+    self.max_rows = max_rows
+    self.version = scorer.version
+
+    if not os.path.exists(os.path.dirname(name) or '.'):
+      os.makedirs(os.path.dirname(name))
+    self.db = sqlite3.connect(name, timeout=30)
+    self.db.execute('PRAGMA journal_mode=WAL')
+    with self.db:
+      self.db.execute('CREATE TABLE IF NOT EXISTS scores (hash TEXT PRIMARY '
+                      'KEY, version TEXT, score REAL, tokens INTEGER, '
+                      'used INTEGER)')
+      self.db.execute('CREATE INDEX IF NOT EXISTS scores_used ON scores '
+                      '(used)')
+      self.db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY '
+                      'KEY, value)')
+      self.db.execute('DELETE FROM scores WHERE version != ?',
+                      (self.version,))
+
+      #runs are numbered, to tell which headlines were used least recently
+      row = self.db.execute("SELECT value FROM meta WHERE key = 'run'") \
+                   .fetchone()
+      self.run_no = (row[0] if row else 0) + 1
+      self.db.execute("INSERT OR REPLACE INTO meta VALUES ('run', ?)",
+                      (self.run_no,))
+
+    #documents and tokens scored, and headlines found & not found
+    self.documents = 0
+    self.tokens = 0
+    self.hits = 0
+    self.misses = 0
+
+    #cached headlines used this run, marked as such on close()
+    self.used = set()
+##############################################  __init__(scorer, name, max_rows)
+
+
+################################################################################
+# score(text)
+# Scores one (utf-8 encoded) document as the sum of its lines' scores,
+#  looking each line up in the cache and scoring (and caching) the rest.
+#
+# @param text - document to score
+#
+# @return (score, tokens), as the wrapped scorer's score()
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def score(self, text):
+    lines = dict()
+    for line in text.decode('utf-8').splitlines():
+      line = HeadlineCache.normalise(line)
+      if len(line) > 0:
+        key = HeadlineCache.key(line)
+        if key in lines:
+          lines[key][1] += 1
+        else:
+          lines[key] = [line, 1]
+
+    #what's cached already
+    found = dict()
+    keys = lines.keys()
+    for i in range(0, len(keys), 500):
+      chunk = keys[i:i + 500]
+      found.update((k, (s, t)) for k, s, t in self.db.execute(
+                     'SELECT hash, score, tokens FROM scores WHERE hash IN '
+                     '(%s)' % ','.join('?' * len(chunk)), chunk))
+
+    #and what isn't
+    new = []
+    for key, (line, n) in lines.iteritems():
+      if key not in found:
+        found[key] = self.scorer.score(line.encode('utf-8'))
+        new.append((key, self.version, found[key][0], found[key][1],
+                    self.run_no))
+        self.misses += n
+      else:
+        self.hits += n
+
+    if len(new) > 0:
+      with self.db:
+        self.db.executemany('INSERT OR REPLACE INTO scores VALUES '
+                            '(?, ?, ?, ?, ?)', new)
+    scored = set(row[0] for row in new)
+    self.used.update(k for k in keys if k not in scored)
+
+    score = sum(found[key][0] * n for key, (line, n) in lines.iteritems())
+    tokens = sum(found[key][1] * n for key, (line, n) in lines.iteritems())
+    self.documents += 1
+    self.tokens += tokens
+    return score, tokens
+##################################################################  score(text)
+
+
+################################################################################
+# run(documents)
+# Scores a stream of documents, as the scorers' run().
+#
+# @param documents - iterable of (symbol, utf-8 text)
+#
+# @return dict of symbol -> (score, tokens)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def run(self, documents):
+    table = dict()
+    for sym, text in documents:
+      table[sym] = self.score(text)
+    return table
+##############################################################  run(documents)
+
+
+################################################################################
+# close()
+# Marks the cached headlines used this run, evicts the least recently used
+#  past max_rows and closes the cache.  Returns a summary (hit rate etc.) for
+#  logging.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def close(self):
+    with self.db:
+      used = list(self.used)
+      for i in range(0, len(used), 500):
+        chunk = used[i:i + 500]
+        self.db.execute('UPDATE scores SET used = ? WHERE hash IN (%s)' %
+                        ','.join('?' * len(chunk)), [self.run_no] + chunk)
+
+      rows = self.db.execute('SELECT COUNT(*) FROM scores').fetchone()[0]
+      evicted = max(0, rows - self.max_rows)
+      if evicted > 0:
+        self.db.execute('DELETE FROM scores WHERE rowid IN (SELECT rowid '
+                        'FROM scores ORDER BY used, rowid LIMIT ?)',
+                        (evicted,))
+    self.db.close()
+    return self.summary(rows - evicted, evicted)
+#######################################################################  close()
+
+
+################################################################################
+# summary(rows, evicted)
+# Returns a one-line summary of how the cache did.
+#
+# @param rows    - headlines kept in the cache
+# @param evicted - headlines evicted
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def summary(self, rows=None, evicted=0):
+    looked = self.hits + self.misses
+    return '%i headline lookups, %.1f%% hits, %i scored%s%s' % \
+             (looked, 100.0 * self.hits / max(looked, 1), self.misses,
+              '' if rows is None else ', %i cached' % rows,
+              ', %i evicted' % evicted if evicted else '')
+###############################################################  summary(...)
+
+
+################################################################################
+# normalise(line) / key(line) <static>
+# Normalises a document line for lookup (date dropped, unicode normalised,
+#  lowercased, whitespace collapsed), and hashes it.
+#
+# @param line - unicode line of a mined document
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def normalise(line):
+    line = HeadlineCache.date_re.sub(u'', line)
+    line = unicodedata.normalize('NFKC', line).lower()
+    return HeadlineCache.space_re.sub(u' ', line).strip()
+
+  @staticmethod
+  def key(line):
+    return hashlib.sha1(line.encode('utf-8')).hexdigest()
+##################################################  normalise() / key() <static>
+
+#//yassMemo.py
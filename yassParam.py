@@ -5,7 +5,7 @@
 # Class that encompasses some common parameters.
 #
 # @created 12/1/17
-# @updated 12/14/17
+# @updated 10/18/26
 ################################################################################
 from datetime import date, timedelta, datetime, time
 import os.path
@@ -23,9 +23,100 @@ class Param:
 # @param symbols  - list to open containing symbols
 #
 # @created 12/1/17
-# @updated 12/4/17
+# @updated 10/18/26
   def __init__(self, symbols=False):
     self.verbose_logging = False
+    
+    #how pages are fetched from finviz:
+    #  'pool'   - persistent keep-alive connections shared by all threads
+    #  'thread' - a fresh urllib connection per symbol (original behavior)
+    self.fetch_mode = 'pool'
+    
+    #directory for the on-disk http response cache (None disables caching)
+    self.cache_dir = './cache/'
+    
+    #pull bulk tabular data for all symbols from finviz's screener pages
+    # (docs/screener.csv), and/or each symbol's quote page for the ratings & 
+    # headlines that Rank needs
+    self.screener = False
+    self.headlines = True
+    
+    #mine incrementally: append only the ratings & headlines that are new 
+    # since the last run to docs/SYM.txt, and rank only what was appended
+    self.incremental = False
+    
+    #where mined ratings & headlines are kept:
+    #  'files' - one docs/SYM.txt per symbol
+    #  'db'    - a single indexed SQLite file, docs/yass.db (yassStore.py)
+    self.storage = 'files'
+    
+    #number of processes parsing the fetched quote pages, so parsing doesn't
+    # hold up the fetch threads (None for one per core, 0 to parse in the 
+    # fetch threads themselves)
+    self.parse_workers = 0
+    
+    #directory to record every page & csv fetched into (yassArchive.py), for
+    # replaying with yassFixture.py; None to not record
+    self.record = None
+    
+    #how Rank scores documents:
+    #  'unigram' - lexicon terms, through the metapy analyzer (yassScore.py)
+    #  'phrase'  - lexicon terms & phrases with negation (yassPhrase.py)
+    self.scorer = 'unigram'
+    
+    #number of processes Rank scores documents in (None for one per core, 
+    # 1 to score them all in this one)
+    self.rank_workers = 1
+    
+    #rank unigram scores through a metapy inverted index over ./docs/ 
+    # (yassIndex.py, configured by config.toml) instead of tokenizing every
+    # document on every run; only used with scorer 'unigram' & storage 'files'
+    self.use_index = False
+    
+    #rank unigram scores as one product of a document-term matrix of every
+    # document with the lexicon's weights (yassMatrix.py, needs numpy); only
+    # documents that changed since last run are tokenized
+    self.use_matrix = False
+    
+    #number of top & bottom ranked symbols Rank prints, and the format of the
+    # full ranking it writes to docs/ranking-export.csv or .json (None for
+    # none)
+    self.top_k = 5
+    self.export = None
+    
+    #file caching the scores of individual headlines across symbols & runs
+    # (yassMemo.py), e.g. './cache/headlines.db'; None to score documents
+    # whole.  Ranking with the cache stays in one process (rank_workers is
+    # ignored)
+    self.headline_cache = None
+    
+    #rank from per-day aggregates of the documents (yassDaily.py) instead of
+    # whole documents: the last window days (e.g. '1d', '7d', '30d'), and/or
+    # each day decayed by half_life days; as of as_of (a date, None for
+    # today).  All None to rank whole documents
+    self.window = None
+    self.half_life = None
+    self.as_of = None
+    
+    #weight of the analyst ratings' score (yassRatings.py, needs numpy) added
+    # to each symbol's headline sentiment; 0 to rank on headlines alone (the
+    # ratings aren't recorded then, so mine in full after turning them on)
+    self.ratings_weight = 0
+    
+    #days of history yassHistory.py looks back (None for its default), and
+    # whether it only downloads the days missing from each stored history
+    # (merging them in) instead of the whole lookback every time
+    self.history_days = None
+    self.history_incremental = False
+    
+    #what yassHistory.py writes the histories as: 'csv' (hist/SYM.csv) or
+    # 'columns' (the memory-mapped columnar store in hist/columns/,
+    # yassColumns.py, needs numpy)
+    self.history_format = 'csv'
+    
+    #keep the csv histories gzipped (hist/SYM.csv.gz)
+    self.history_gzip = False
+    
     self.version = 0.015
     self.versionDate = date(2017, 12, 19)
     if symbols == False:
@@ -0,0 +1,223 @@
+################################################################################
+# File:    yassPhrase.py
+# Author:  Ryan Yusko
+#
+# Phrase- and negation-aware sentiment scoring, as an alternative to Rank's
+# unigram scorer (set scorer = 'phrase' in yassParam.py).  The phrases in
+# config/phrases.txt ("price target raised", "misses estimates", ...) and
+# the terms of the unigram lexicon are compiled into one Aho-Corasick
+# automaton over tokens, so each document is scanned once, in time linear in
+# its length, however many phrases there are.  Where matches overlap, the
+# longest (then leftmost) wins, so "misses estimates" isn't also counted as
+# "misses".
+#
+# A negation ("not", "no", "never", "isn't", ...) flips the polarity of any
+# match starting within the next def_window tokens.  Punctuation, line ends
+# and "but" close the scope.
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import re, hashlib
+
+################################################################################
+# class Automaton
+# Aho-Corasick automaton whose alphabet is tokens rather than characters.
+#  Add every phrase, build(), then scan() token lists.
+#
+# @created 10/18/26
+# @updated 10/18/26
+class Automaton:
+  def __init__(self):
+    self.goto = [dict()]   #node -> {token : node}
+    self.fail = [0]        #node -> longest proper suffix that is a node
+    self.out = [[]]        #node -> [(phrase length, weight)] ending here
+
+  #adds a phrase (list of tokens); a phrase added twice keeps the last weight
+  def add(self, tokens, weight):
+    node = 0
+    for tok in tokens:
+      nxt = self.goto[node].get(tok)
+      if nxt is None:
+        nxt = len(self.goto)
+        self.goto[node][tok] = nxt
+        self.goto.append(dict())
+        self.fail.append(0)
+        self.out.append([])
+      node = nxt
+    self.out[node] = [(len(tokens), weight)]
+
+  #computes the failure links (breadth first), and merges the outputs of
+  # each node's suffixes into its own
+  def build(self):
+    queue = list(self.goto[0].values())
+    head = 0
+    while head < len(queue):
+      node = queue[head]
+      head += 1
+      for tok, child in self.goto[node].iteritems():
+        f = self.fail[node]
+        while f and tok not in self.goto[f]:
+          f = self.fail[f]
+        if node != 0 and tok in self.goto[f]:
+          self.fail[child] = self.goto[f][tok]
+        self.out[child] = self.out[child] + self.out[self.fail[child]]
+        queue.append(child)
+
+  #yields (first token, last token, weight) for every phrase occurring in
+  # tokens; None in tokens is a boundary no phrase crosses
+  def scan(self, tokens):
+    node = 0
+    for i, tok in enumerate(tokens):
+      if tok is None:
+        node = 0
+        continue
+      while node and tok not in self.goto[node]:
+        node = self.fail[node]
+      node = self.goto[node].get(tok, 0)
+      for length, weight in self.out[node]:
+        yield i - length + 1, i, weight
+##############################################################  class Automaton
+
+
+class PhraseScorer:
+  def_phrases = 'config/phrases.txt'
+  def_window = 3  #tokens after a negation whose polarity it flips
+
+  negations = frozenset([u'not', u'no', u'never', u'without', u'neither',
+                         u'nor', u'cannot', u"can't", u"isn't", u"aren't",
+                         u"wasn't", u"weren't", u"don't", u"doesn't",
+                         u"didn't", u"won't", u"hasn't", u"haven't"])
+  breaks = frozenset([u'but'])
+
+  #words (with any apostrophe suffix), and the punctuation that ends a scope
+  token_re = re.compile(u"[a-z0-9]+(?:['\u2019][a-z]+)*|[.,;:!?\n]", re.U)
+
+################################################################################
+# __init__(lexicon, phrases)
+# Compiles the automaton from the unigram lexicon and the phrase list.
+#
+# @param lexicon - Lexicon of (unigram) sentiments (yassLexicon.py)
+# @param phrases - phrase list: one phrase per line with its weight last,
+#                  ';' comments and blank lines skipped
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, lexicon, phrases=def_phrases):
+    self.lexicon = lexicon
+    self.automaton = Automaton()
+
+    #terms the tokenizer would split become phrases; ones it would change
+    # (e.g. 'a+' -> 'a') can never match, so they're left out
+    for term, weight in lexicon.weights.iteritems():
+      tokens = PhraseScorer.tokenize(term)
+      if len(tokens) > 1 or tokens == [term]:
+        self.automaton.add(tokens, weight)
+
+    self.phrases = 0
+    digest = hashlib.sha1()
+    with open(phrases, 'rb') as f:
+      for line in f:
+        digest.update(line)
+        line = line.decode('utf-8').strip()
+        if len(line) == 0 or line.startswith(';'):
+          continue
+        words, weight = line.rsplit(None, 1)
+        self.automaton.add(PhraseScorer.tokenize(words), float(weight))
+        self.phrases += 1
+
+    self.automaton.build()
+
+    #what the scores depend on, for caches of them (yassMemo.py)
+    self.version = 'phrase:%s:%s:%i' % (lexicon.version, digest.hexdigest(),
+                                        PhraseScorer.def_window)
+
+    #documents and tokens scored so far
+    self.documents = 0
+    self.tokens = 0
+###################################################  __init__(lexicon, phrases)
+
+
+################################################################################
+# score(text)
+# Scores one (utf-8 encoded) document, in the same form as
+#  BatchScorer.score() (yassScore.py), so Rank can use either.
+#
+# @param text - text to score
+#
+# @return (score, tokens) - sentiment score, and the number of word tokens
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def score(self, text):
+    tokens = PhraseScorer.tokenize(text.decode('utf-8'))
+
+    #where each negation's scope ends (exclusive); -1 where there's none
+    negated = [-1] * len(tokens)
+    until = -1
+    words = 0
+    for i, tok in enumerate(tokens):
+      if tok is None or tok in PhraseScorer.breaks:
+        until = -1
+      elif tok in PhraseScorer.negations:
+        until = i + PhraseScorer.def_window + 1
+      else:
+        negated[i] = until
+      if tok is not None:
+        words += 1
+
+    #longest match first, then leftmost; skip anything overlapping a match
+    # already taken
+    matches = sorted(self.automaton.scan(tokens),
+                     key=lambda (first, last, w): (first - last, first))
+    taken = [False] * len(tokens)
+    score = 0
+    for first, last, weight in matches:
+      if any(taken[first:last + 1]):
+        continue
+      for i in range(first, last + 1):
+        taken[i] = True
+      if negated[first] > first:
+        weight = -weight
+      score += weight
+
+    self.documents += 1
+    self.tokens += words
+    return score, words
+##################################################################  score(text)
+
+
+################################################################################
+# run(documents)
+# Scores a stream of documents, as BatchScorer.run().
+#
+# @param documents - iterable of (symbol, utf-8 text)
+#
+# @return dict of symbol -> (score, tokens)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def run(self, documents):
+    table = dict()
+    for sym, text in documents:
+      table[sym] = self.score(text)
+    return table
+##############################################################  run(documents)
+
+
+################################################################################
+# tokenize(text) <static>
+# Lowercases and splits (unicode) text into word tokens, with None for each
+#  punctuation mark or line end.
+#
+# @param text - unicode text
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def tokenize(text):
+    return [tok if tok[0].isalnum() else None
+            for tok in PhraseScorer.token_re.findall(text.lower())]
+##########################################################  tokenize(text) <static>
+
+#//yassPhrase.py
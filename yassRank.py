@@ -6,11 +6,21 @@
 # news data retrieved from Finviz.
 #
 # @created 12/16/17
-# @updated 12/19/17
+# @updated 10/18/26
 ################################################################################
-import os, yassMenu, metapy
+import os, json, yassMenu, metapy, multiprocessing
 from yassFinviz import Finviz
 from yassParam import Param
+from yassStore import Store
+from yassLexicon import Lexicon
+from yassScore import BatchScorer
+from yassPhrase import PhraseScorer
+from yassIndex import DocIndex
+from yassTopK import TopK, Export
+from yassMemo import HeadlineCache
+from yassDaily import Daily
+from yassRatings import Ratings
+from datetime import date
 
 #unicode error handling
 from exceptions import UnicodeWarning 
@@ -25,6 +35,7 @@ filterwarnings(action="error", category=UnicodeWarning)
 # @created 12/16/17
 # @updated 12/19/17
 class Rank:
+  def_shard = 50 #symbols per task handed to a ranking worker process
 
 ################################################################################
 # __init__(yf,yp)
@@ -37,25 +48,46 @@ class Rank:
 # @param yp - Param() object from yassParam.py that handles logging.
 #
 # @created 12/16/17
-# @updated 12/18/17
+# @updated 10/18/26
   def __init__(self, yf, yp):
-    #store symbols and reference to prefs (for logging)
+    #store symbols and reference to prefs (for logging); symbols that
+    # couldn't be mined this run are ranked from what they already have (the
+    # document left from an earlier run, or their previous score)
     self.symbols = yf.symbols
     self.yp = yp
+    if len(yf.failed) > 0:
+      self.yp.log('%i symbols could not be mined, ranking them from earlier '
+                  'runs (Rank.__init__)' % len(yf.failed))
+    
+    #text appended to each symbol's document by an incremental mine, and
+    # the symbols that were mined at all
+    self.delta = yf.delta
+    self.fresh = yf.fresh
     
     #prefix for doc data
     self.doc_prefix = "./docs/"
     
-    #load the positive sentiments
-    self.pos = [line.rstrip('\r\n') for line in open('config/positive-words.txt')]
-    self.yp.log('read %i positive sentiments (Rank.__init__)' % len(self.pos))
+    #or the single-file store, if that's where the data went
+    if self.yp.storage == 'db':
+      self.store = Store()
+    else:
+      self.store = None
+    
+    #load the positive & negative sentiments (once, as a hashed lexicon)
+    self.lexicon = Lexicon.load()
+    self.yp.log('loaded %i sentiments from the %s (Rank.__init__)' % 
+                  (len(self.lexicon.weights), self.lexicon.origin))
+    
+    #one analyzer chain (or phrase automaton) for every document we score
+    self.scorer = Rank.make_scorer(self.yp.scorer, self.lexicon,
+                                   self.yp.headline_cache)
     
-    #load the negative sentiments
-    self.neg = [line.rstrip('\r\n') for line in open('config/negative-words.txt')]
-    self.yp.log('read %i negative sentiments (Rank.__init__)' % len(self.neg))
+    #number of tokens in each document ranked in full
+    self.tokens = dict()
     
-    #dictionary for final ranking
+    #dictionary for final ranking, and the headline sentiment it's made of
     self.ranking = dict()
+    self.sentiment = dict()
     
     #run the ranking
     self.do_ranking()
@@ -65,106 +97,428 @@ class Rank:
 ################################################################################
 # do_ranking()
 # Ranks each of the gathered data in ./docs/
+# When mining incrementally, a symbol that was ranked last run only has the 
+#  text appended to its document ranked, and added to its previous rank.
+# With a window or half-life set, every symbol is ranked from its per-day
+#  aggregates instead (see rank_daily()).
 #
 # @created 12/18/17
-# @updated 12/19/17
+# @updated 10/18/26
   def do_ranking(self):
-    for tick in self.symbols:
-      dat = self.doc_prefix + tick + '.txt'
-      self.ranking[tick] = self.get_rank(dat)
+    daily = self.yp.window is not None or self.yp.half_life is not None
+    
+    #ranks from the last run
+    saved = self.doc_prefix + 'ranking.json'
+    previous = dict()
+    if self.yp.incremental and not daily:
+      try:
+        with open(saved, 'r') as f:
+          previous = json.load(f)
+      except (IOError, ValueError):
+        previous = dict()
+      if not isinstance(previous, dict):
+        self.yp.log('ignoring %s, not a saved ranking (Rank.do_ranking)' % 
+                      saved)
+        previous = dict()
+    
+    #best & worst so far, and the full ranking, as the scores come in (kept
+    # apart from the ranks saved above)
+    self.selected = TopK(self.yp.top_k)
+    if self.yp.export:
+      export = Export(self.doc_prefix + 'ranking-export.' + self.yp.export, 
+                      self.yp.export)
+    else:
+      export = None
+    
+    #a partial export isn't left behind if ranking fails
+    try:
+      #analyst ratings, blended into every symbol's rank
+      if self.yp.ratings_weight:
+        self.blend = self.rank_ratings(self.symbols)
+      else:
+        self.blend = dict()
+    
+      partial = 0
+      full = []
+      for tick in self.symbols:
+        if daily:
+          full.append(tick)
+        elif tick in previous and tick in self.delta:
+          score = previous[tick]
+          if len(self.delta[tick]) > 0:
+            score += self.rank_text(self.delta[tick])
+          self.keep(tick, score, None, export)
+          partial += 1
+        elif tick in previous and tick not in self.fresh:
+          #couldn't mine this one, so its document hasn't changed
+          self.keep(tick, previous[tick], None, export)
+          partial += 1
+        else:
+          full.append(tick)
+    
+      #look the rest up in the term matrix or the index, stream them through
+      # the scorer in one batch, or shard them across worker processes
+      workers = self.yp.rank_workers
+      if workers is None:
+        workers = multiprocessing.cpu_count()
+      if self.yp.headline_cache:
+        #the headline cache is one sqlite file, kept (and its recently used
+        # headlines marked) by this process's scorer only
+        workers = 1
+      if daily:
+        table = self.rank_daily(full)
+        workers = 1
+      elif self.yp.use_matrix and self.yp.scorer == 'unigram':
+        table = self.rank_matrix(full)
+        workers = 1
+      elif self.yp.use_index and self.yp.scorer == 'unigram' and \
+         self.store is None:
+        table = self.rank_indexed(full)
+        workers = 1
+      elif workers > 1 and len(full) > Rank.def_shard:
+        table = self.rank_parallel(full, workers)
+      else:
+        table = self.scorer.run(self.documents(full))
+      for tick in full:
+        score, tokens = table.get(tick, (0, 0))
+        self.keep(tick, score, tokens, export)
+    except:
+      if export is not None:
+        export.abort()
+      raise
       
-    self.yp.log('ranked %i documents (Rank.do_ranking)' % len(self.ranking))
-    
-    #data structure for storing sorted key,value pairs
-    s_ranking = list()
-    
-    #sort based on ranking "value"
-    for key, value in sorted(self.ranking.iteritems(), key=lambda (k,v): (v,k)):
-      s_ranking.append('%s: %i' % (key, value))
-    
-    if len(s_ranking) >= 5:
-      print 'bottom 5:'
-      for tick in s_ranking[:5]:
-        print tick
-      print 'top 5:'
-      for tick in s_ranking[-5:]:
-        print tick
+    self.yp.log('ranked %i documents, %i from their deltas, %i tokens, %i '
+                'worker(s) (Rank.do_ranking)' % 
+                  (len(self.ranking), partial, sum(self.tokens.values()),
+                   workers))
+    
+    if self.yp.incremental and not daily:
+      previous.update(self.sentiment)
+      with open(saved, 'w') as f:
+        json.dump(previous, f)
+    
+    if self.yp.headline_cache:
+      summary = self.scorer.close()
+      self.yp.log('headline cache: %s (Rank.do_ranking)' % summary)
+    
+    if export is not None:
+      self.yp.log('wrote %i ranks to %s (Rank.do_ranking)' % 
+                    (export.close(), export.filename))
+    
+    #worst first, then best last, as always
+    if self.selected.seen > 0 and self.selected.k > 0:
+      print 'bottom %i:' % self.selected.k
+      for tick, value in self.selected.bottom():
+        print '%s: %g' % (tick, value)
+      print 'top %i:' % self.selected.k
+      for tick, value in reversed(self.selected.top()):
+        print '%s: %g' % (tick, value)
 ##################################################################  do_ranking()
 
 
 ################################################################################
-# get_rank(doc)
-# Assigns a rank to the passed document based on pre-loaded sentiments
+# keep(tick, score, tokens, export)
+# Records a symbol's rank (its headline sentiment, plus its ratings score if
+#  they're blended in), and passes it on to the top/bottom selection and the
+#  export.
 #
-# @param doc - relative path with data to rank
+# @param tick   - symbol
+# @param score  - its headline sentiment
+# @param tokens - tokens in its document, or None if it was ranked from a
+#                 delta or the previous run
+# @param export - Export (yassTopK.py) of the full ranking, or None
 #
-# @created 12/17/17
-# @updated 12/19/17
-  def get_rank(self, doc):
-    #rank starts at 0 :)
-    rank = 0
+# @created 10/18/26
+# @updated 10/18/26
+  def keep(self, tick, score, tokens, export):
+    #a symbol listed twice is only ranked once
+    if tick in self.ranking:
+      return
+    self.sentiment[tick] = score
+    score += self.blend.get(tick, 0)
+    self.ranking[tick] = score
+    if tokens is not None:
+      self.tokens[tick] = tokens
+    self.selected.add(tick, score)
+    if export is not None:
+      export.add(tick, score, tokens)
+###########################################  keep(tick, score, tokens, export)
+
+
+################################################################################
+# document(tick) / documents(ticks)
+# Returns the mined data (utf-8 text) for a symbol, from ./docs/SYM.txt or 
+#  from the store; and yields (symbol, text) for each of the passed symbols
+#  that has a document (a symbol without one is skipped).
+#
+# @param tick  - symbol to look up
+# @param ticks - symbols to look up
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def document(self, tick):
+    return Rank.read_document(tick, self.doc_prefix, self.store)
+  
+  def documents(self, ticks):
+    for tick in ticks:
+      try:
+        yield tick, self.document(tick)
+      except IOError:
+        #nothing mined for it (yet), so it ranks (0, 0)
+        pass
+##################################################  document() / documents()
+
+
+################################################################################
+# rank_indexed(ticks)
+# Scores the documents of the passed symbols through the inverted index over
+#  ./docs/ (yassIndex.py).
+#
+# @param ticks - symbols whose documents to score
+#
+# @return dict of symbol -> (score, tokens)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def rank_indexed(self, ticks):
+    #documents are kept without the '^' some symbols are listed with
+    names = dict((tick, tick[1:] if tick[0] == '^' else tick) 
+                 for tick in ticks)
     
-    #open the file
-    f = open(doc, 'r')
+    index = DocIndex(self.yp, self.lexicon)
+    found = index.scores(sorted(set(names.values())), self.scorer)
+    return dict((tick, found[name]) for tick, name in names.iteritems())
+###########################################################  rank_indexed(ticks)
+
+
+################################################################################
+# rank_matrix(ticks)
+# Scores the documents of the passed symbols as one product of their
+#  document-term matrix (yassMatrix.py) with the lexicon's weights.  The
+#  matrix is kept in ./docs/terms.npz, so only documents that changed since
+#  are run through the analyzer.
+#
+# @param ticks - symbols whose documents to score
+#
+# @return dict of symbol -> (score, tokens)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def rank_matrix(self, ticks):
+    from yassMatrix import TermMatrix
     
-    #set up analyzer
-    tok = metapy.analyzers.ICUTokenizer(suppress_tags=True)
-    tok = metapy.analyzers.LengthFilter(tok, min=2, max=30)
-    tok = metapy.analyzers.ListFilter(tok, "config/lemur-stopwords.txt", metapy.analyzers.ListFilter.Type.Reject)
-    #the Porter2Filter was not producing acceptable results
-    # -> for example, it changed 'splurge' to 'splurg' as well as other changes
-    #    inconsistent with natural language
-    #tok = metapy.analyzers.Porter2Filter(tok)
-    tok = metapy.analyzers.LowercaseFilter(tok)
+    #documents are kept without the '^' some symbols are listed with
+    names = dict((tick, tick[1:] if tick[0] == '^' else tick) 
+                 for tick in ticks)
     
-    #set up doc content
-    doc = metapy.index.Document()
-    doc.content(f.read().decode('utf-8').strip())
-    tok.set_content(doc.content())
-    f.close()
+    def documents():
+      for name in sorted(set(names.values())):
+        try:
+          yield name, self.document(name)
+        except IOError:
+          #nothing mined for it (yet)
+          pass
     
-    #analyze away!
-    ana = metapy.analyzers.NGramWordAnalyzer(1, tok)
-    vec = ana.analyze(doc)
+    matrix = TermMatrix(self.doc_prefix + 'terms.npz')
+    matrix.update(documents(), BatchScorer(self.lexicon).counts)
+    matrix.save()
+    found = matrix.scores(matrix.weights(self.lexicon))
+    self.yp.log('term matrix: %i documents (%i counted, %i kept), %i terms, '
+                '%i entries (Rank.rank_matrix)' % 
+                  (len(matrix.labels), matrix.built, matrix.kept, 
+                   len(matrix.vocab), len(matrix.data)))
+    return dict((tick, found.get(name, (0, 0))) 
+                for tick, name in names.iteritems())
+###########################################################  rank_matrix(ticks)
+
+
+################################################################################
+# rank_daily(ticks)
+# Scores the passed symbols from their per-day aggregates (yassDaily.py):
+#  brings those up to date with the documents (scoring only new text), then
+#  sums them over Param.window days and/or decays them by Param.half_life,
+#  as of Param.as_of.
+#
+# @param ticks - symbols to score
+#
+# @return dict of symbol -> (score, tokens)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def rank_daily(self, ticks):
+    #documents are kept without the '^' some symbols are listed with
+    names = dict((tick, tick[1:] if tick[0] == '^' else tick) 
+                 for tick in ticks)
     
-    #check it out
-    for word in vec:
+    aggregates = Daily(self.scorer)
+    for name in sorted(set(names.values())):
       try:
-        if word in self.pos:
-          rank += vec[word]
-        elif word in self.neg:
-          rank -= vec[word]
-      except UnicodeWarning as uw:
-        #we don't care about non-interpretable characters, so continue
-        continue  
-      
-    return rank
-#################################################################  get_rank(doc)
+        aggregates.update(name, self.document(name))
+      except IOError:
+        #nothing mined for it (yet)
+        pass
+    
+    asof = self.yp.as_of or date.today()
+    found = aggregates.rank(names.values(), asof, Daily.days(self.yp.window),
+                            self.yp.half_life)
+    self.yp.log('daily aggregates: %s; ranked as of %s, window %s, half-life '
+                '%s (Rank.rank_daily)' % (aggregates.close(), asof, 
+                                          self.yp.window, self.yp.half_life))
+    return dict((tick, found[name]) for tick, name in names.iteritems())
+###########################################################  rank_daily(ticks)
+
+
+################################################################################
+# rank_ratings(ticks)
+# Scores the analyst ratings of the passed symbols (yassRatings.py), all at
+#  once, over the same window & half-life as rank_daily(), and weighs them by
+#  Param.ratings_weight.
+#
+# @param ticks - symbols to score
+#
+# @return dict of symbol -> weighted ratings score
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def rank_ratings(self, ticks):
+    #documents are kept without the '^' some symbols are listed with
+    names = dict((tick, tick[1:] if tick[0] == '^' else tick) 
+                 for tick in ticks)
+    
+    book = Ratings(self.doc_prefix + 'ratings.db')
+    found = book.records(names.values())
+    book.close()
+    
+    asof = self.yp.as_of or date.today()
+    scores = Ratings.score(found, asof, Daily.days(self.yp.window), 
+                           self.yp.half_life)
+    self.yp.log('scored %i analyst ratings of %i symbols (Rank.rank_ratings)' %
+                  (sum(len(r) for r in found.itervalues()), len(found)))
+    return dict((tick, self.yp.ratings_weight * scores.get(name, 0.0)) 
+                for tick, name in names.iteritems())
+###########################################################  rank_ratings(ticks)
+
+
+################################################################################
+# rank_parallel(ticks, workers)
+# Scores the documents of the passed symbols in a pool of worker processes.
+#  Symbols are sharded into def_shard-sized tasks; each worker loads the 
+#  lexicon and builds its scorer once (initRanker), and the shards come back
+#  in order, so the result doesn't depend on the number of workers.  Not
+#  used with a headline cache, whose scorer stays in this process.
+#
+# @param ticks   - symbols whose documents to score
+# @param workers - number of worker processes
+#
+# @return dict of symbol -> (score, tokens)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def rank_parallel(self, ticks, workers):
+    shards = [ticks[i:i + Rank.def_shard] 
+              for i in range(0, len(ticks), Rank.def_shard)]
+    store = self.store.name if self.store is not None else None
+    
+    pool = multiprocessing.Pool(workers, initRanker, 
+                                (self.yp.scorer, self.doc_prefix, store))
+    table = dict()
+    try:
+      for shard in pool.imap(rankShard, shards):
+        for tick, score, tokens in shard:
+          table[tick] = (score, tokens)
+    finally:
+      pool.close()
+      pool.join()
+    return table
+#################################################  rank_parallel(ticks, workers)
 
 
 ################################################################################
-# get_rank(doc) <static>
+# get_rank(doc)
 # Assigns a rank to the passed document based on pre-loaded sentiments
-# This method loads the positive & negative sentiments separately...and should
-#  really only be used for testing, since the constructor stores these 
-#  sentiments in memory for constant access; class method should be used for
-#  regular implementation.
 #
 # @param doc - relative path with data to rank
 #
-# @created 12/18/17
-# @updated 12/19/17
+# @created 12/17/17
+# @updated 10/18/26
+  def get_rank(self, doc):
+    #open the file
+    with open(doc, 'r') as f:
+      return self.rank_text(f.read())
+#################################################################  get_rank(doc)
+
+
+################################################################################
+# rank_text(text)
+# Assigns a rank to the passed (utf-8 encoded) text based on pre-loaded 
+#  sentiments
+#
+# @param text - text to rank, e.g. a document or the lines appended to one
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def rank_text(self, text):
+    return self.scorer.score(text)[0]
+##############################################################  rank_text(text)
+
+
+################################################################################
+# make_scorer(kind, lexicon, cache) / read_document(tick, prefix, store) 
+#  <static>
+# Builds the scorer named in Param.scorer ('unigram' or 'phrase'), behind a
+#  headline cache if one is named, and reads a symbol's mined data (utf-8 
+#  text) from prefix/SYM.txt or the store.  Shared by Rank and its worker 
+#  processes.
+#
+# @param kind    - 'unigram' (yassScore.py) or 'phrase' (yassPhrase.py)
+# @param lexicon - Lexicon of sentiments
+# @param cache   - headline cache file (yassMemo.py), or None
+# @param tick    - symbol to look up
+# @param prefix  - directory holding the mined documents
+# @param store   - Store (yassStore.py) holding them instead, or None
+#
+# @created 10/18/26
+# @updated 10/18/26
   @staticmethod
-  def get_rank(doc):
-    pos = [line.rstrip('\r\n') for line in open('config/positive-words.txt')]
-    neg = [line.rstrip('\r\n') for line in open('config/negative-words.txt')]
-    
-    #rank starts at 0 :)
-    rank = 0
+  def make_scorer(kind, lexicon, cache=None):
+    if kind == 'phrase':
+      scorer = PhraseScorer(lexicon)
+    else:
+      scorer = BatchScorer(lexicon)
+    if cache:
+      scorer = HeadlineCache(scorer, cache)
+    return scorer
+  
+  @staticmethod
+  def read_document(tick, prefix, store):
+    #mined data is kept without the '^' some symbols are listed with
+    if tick[0] == '^':
+      tick = tick[1:]
     
-    #open the file
-    f = open(doc, 'r')
+    if store is not None:
+      return store.document(tick)
     
+    with open(prefix + tick + '.txt', 'r') as f:
+      return f.read()
+##########################################  make_scorer() / read_document() <static>
+
+
+################################################################################
+# score(text, lexicon) <static>
+# Assigns a rank to the passed (utf-8 encoded) text based on the sentiments
+#  in the passed lexicon (yassLexicon.py), building the analyzer just for it.
+#  Rank itself scores through its BatchScorer (yassScore.py); this is the
+#  per-document path, kept for testing and benchmarking.
+# This replaces the static get_rank(doc), which re-read both word lists for
+#  every document (and, having the same name, hid the instance method).
+#
+# @param text    - text to rank
+# @param lexicon - Lexicon of sentiments, e.g. Lexicon.load()
+#
+# @created 12/18/17
+# @updated 10/18/26
+  @staticmethod
+  def score(text, lexicon):
     #set up analyzer
     tok = metapy.analyzers.ICUTokenizer(suppress_tags=True)
     tok = metapy.analyzers.LengthFilter(tok, min=2, max=30)
@@ -177,27 +531,54 @@ class Rank:
     
     #set up doc content
     doc = metapy.index.Document()
-    doc.content(f.read().decode('utf-8').strip())
+    doc.content(text.decode('utf-8').strip())
     tok.set_content(doc.content())
-    f.close()
     
     #analyze away!
     ana = metapy.analyzers.NGramWordAnalyzer(1, tok)
     vec = ana.analyze(doc)
     
-    #check it out
-    for word in vec:
-      try:
-        if word in pos:
-          rank += vec[word]
-        elif word in neg:
-          rank -= vec[word]
-      except UnicodeWarning as uw:
-        #we don't care about non-interpretable characters, so continue
-        continue  
-      
-    return rank
-########################################################  get_rank(doc) <static>
+    #check it out; rank starts at 0 :)
+    return lexicon.score(vec)
+################################################  score(text, lexicon) <static>
+
+
+################################################################################
+# initRanker(kind, prefix, store) / rankShard(ticks)
+# Run in Rank's worker processes (see Rank.rank_parallel): initRanker sets up
+#  the process's lexicon, scorer (never behind a headline cache, which only
+#  the parent process opens) and document source once, and rankShard scores
+#  a shard of symbols with them.  Module level, so the worker processes can
+#  find them.
+#
+# @param kind   - Param.scorer
+# @param prefix - directory holding the mined documents
+# @param store  - file name of the Store holding them instead, or None
+# @param ticks  - symbols to score
+#
+# @return (rankShard) list of (symbol, score, tokens), in shard order
+#
+# @created 10/18/26
+# @updated 10/18/26
+ranker = dict()
+
+def initRanker(kind, prefix, store):
+  ranker['scorer'] = Rank.make_scorer(kind, Lexicon.load())
+  ranker['prefix'] = prefix
+  ranker['store'] = Store(store) if store is not None else None
+
+def rankShard(ticks):
+  out = list()
+  for tick in ticks:
+    try:
+      text = Rank.read_document(tick, ranker['prefix'], ranker['store'])
+    except IOError:
+      #nothing mined for it (yet)
+      out.append((tick, 0, 0))
+      continue
+    out.append((tick,) + ranker['scorer'].score(text))
+  return out
+######################################################  initRanker() / rankShard()
 
 
 ################################################################################
@@ -205,13 +586,15 @@ class Rank:
 # This stub created for testing purposes.
 #
 # @created 12/17/17
-# @updated 12/18/17
+# @updated 10/18/26
 if __name__ == '__main__':
   yp = Param()
   print yassMenu.getHeader(yp.version, yp.versionDate)
   
-  print 'AAPL rank: %i' % Rank.get_rank('docs/AAPL.txt')
-  print 'GOOG rank: %i' % Rank.get_rank('docs/GOOG.txt')
+  lexicon = Lexicon.load()
+  for tick in ('AAPL', 'GOOG'):
+    with open('docs/%s.txt' % tick, 'r') as f:
+      print '%s rank: %i' % (tick, Rank.score(f.read(), lexicon))
 ######################################################################  __main__
 
 
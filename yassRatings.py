@@ -0,0 +1,300 @@
+################################################################################
+# File:    yassRatings.py
+# Author:  Ryan Yusko
+#
+# Analyst ratings as typed records, and a score for them that Rank can blend
+# with headline sentiment.  Finviz's ratings rows (FinOne.rate: date, action,
+# rating change, firm, price target change) are parsed into Rating records:
+# the date, the action (upgrade, downgrade, initiated, reiterated...), the
+# firm, the rating before & after, and the price target before & after.
+# They're kept per symbol in a SQLite file (./docs/ratings.db) as they're
+# mined.
+#
+# The score is computed for every rating of every symbol at once with numpy:
+# the action's direction, the level of the new rating (strong sell -2 ...
+# strong buy +2) and the relative change of the price target, weighted
+# (def_weights), optionally windowed & decayed by age, and summed per symbol.
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import os.path, re, sqlite3, threading
+from collections import namedtuple
+from datetime import datetime, date
+
+#one analyst rating: day is a date (None for none), ratings are text (None
+# if not given), targets are floats (None if not given)
+Rating = namedtuple('Rating', 'day action firm rating_from rating_to '
+                              'target_from target_to')
+
+class Ratings:
+  def_name = './docs/ratings.db' #default ratings file
+  def_batch = 5000               #rows buffered before a write
+  def_chunk = 500                #symbols looked up per query
+
+  #direction of each action (any other counts 0)
+  actions = {'upgrade' : 1, 'downgrade' : -1, 'initiated' : 0,
+             'reiterated' : 0, 'resumed' : 0}
+
+  #level of each rating, by the words brokers use for them
+  levels = {'strong buy' : 2, 'conviction buy' : 2, 'top pick' : 2,
+            'buy' : 1, 'outperform' : 1, 'overweight' : 1,
+            'accumulate' : 1, 'add' : 1, 'positive' : 1,
+            'market outperform' : 1, 'sector outperform' : 1,
+            'hold' : 0, 'neutral' : 0, 'market perform' : 0,
+            'sector perform' : 0, 'peer perform' : 0, 'equal weight' : 0,
+            'equal-weight' : 0, 'in-line' : 0, 'perform' : 0,
+            'sector weight' : 0,
+            'underperform' : -1, 'underweight' : -1, 'reduce' : -1,
+            'negative' : -1, 'market underperform' : -1,
+            'sector underperform' : -1, 'sell' : -1,
+            'strong sell' : -2}
+
+  #weights of the action, new rating level & price target change in a
+  # rating's score, and the largest target change counted (either way)
+  def_weights = {'action' : 1.0, 'level' : 0.5, 'target' : 2.0}
+  def_target_cap = 0.5
+
+  schema = ['CREATE TABLE IF NOT EXISTS ratings ('
+            '  symbol TEXT NOT NULL, day INTEGER, action TEXT, firm TEXT,'
+            '  rating_from TEXT, rating_to TEXT, target_from REAL,'
+            '  target_to REAL)',
+            'CREATE INDEX IF NOT EXISTS ratings_symbol ON ratings (symbol)']
+
+  #'before -> after' in the rating & price target columns
+  arrow_re = re.compile(u'\\s*(?:\u2192|->)\\s*')
+  price_re = re.compile(r'[-+]?\d[\d,]*(?:\.\d+)?')
+
+################################################################################
+# __init__(name)
+# Opens (creating if need be) the ratings file.  The connection is shared by
+#  all threads, serialized by self.lock, as in Store.
+#
+# @param name - path of the ratings file
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, name=def_name):
+    self.name = name
+    self.lock = threading.Lock()
+    if not os.path.exists(os.path.dirname(name) or '.'):
+      os.makedirs(os.path.dirname(name))
+    self.db = sqlite3.connect(name, check_same_thread=False)
+    self.db.execute('PRAGMA journal_mode=WAL')
+    with self.db:
+      for statement in Ratings.schema:
+        self.db.execute(statement)
+
+    #rows waiting for the next batch, the symbols they're for, and the
+    # symbols whose stored ratings the batch replaces
+    self.pending = []
+    self.batched = set()
+    self.clear = set()
+    self.written = 0
+###############################################################  __init__(name)
+
+
+################################################################################
+# add(sym, rate, replace)
+# Buffers a symbol's ratings (as in FinOne.rate) as records, writing a batch
+#  once enough are waiting.  A symbol's stored ratings, when replaced, are
+#  deleted in the same transaction as the batch is written.
+#
+# @param sym     - symbol the ratings belong to
+# @param rate    - list of [date, action, rating change, firm, target change]
+# @param replace - True if these are all of the symbol's ratings (it was
+#                  mined from scratch), False if they're new ones
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def add(self, sym, rate, replace=True):
+    rows = []
+    for row in rate:
+      r = Ratings.record(row)
+      rows.append((sym, r.day.toordinal() if r.day else None, r.action,
+                   r.firm, r.rating_from, r.rating_to, r.target_from,
+                   r.target_to))
+
+    with self.lock:
+      if replace:
+        self.clear.add(sym)
+        if sym in self.batched:
+          self.pending = [row for row in self.pending if row[0] != sym]
+      self.pending.extend(rows)
+      self.batched.add(sym)
+      if len(self.pending) >= Ratings.def_batch:
+        self.write()
+#######################################################  add(sym, rate, replace)
+
+
+################################################################################
+# write()
+# Writes the buffered rows in a single transaction, after deleting the
+#  stored ratings of the symbols they replace.  Caller holds self.lock.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def write(self):
+    if not self.pending and not self.clear:
+      return
+    with self.db:
+      self.db.executemany('DELETE FROM ratings WHERE symbol = ?',
+                          [(sym,) for sym in self.clear])
+      self.db.executemany('INSERT INTO ratings VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                          self.pending)
+    self.written += len(self.pending)
+    self.pending = []
+    self.batched = set()
+    self.clear = set()
+#######################################################################  write()
+
+
+################################################################################
+# records(syms)
+# Returns the ratings of the passed symbols.
+#
+# @param syms - symbols to look up
+#
+# @return dict of symbol -> list of Rating, newest first
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def records(self, syms):
+    wanted = sorted(set(syms))
+    rows = []
+    with self.lock:
+      self.write()
+      #by the symbol index, a chunk of symbols at a time
+      for i in range(0, len(wanted), Ratings.def_chunk):
+        chunk = wanted[i:i + Ratings.def_chunk]
+        rows.extend(self.db.execute(
+          'SELECT symbol, day, action, firm, rating_from, rating_to, '
+          'target_from, target_to FROM ratings WHERE symbol IN (%s) '
+          'ORDER BY symbol, day DESC, rowid' % ','.join('?' * len(chunk)),
+          chunk))
+    table = dict()
+    for row in rows:
+      day = date.fromordinal(row[1]) if row[1] else None
+      table.setdefault(row[0], []).append(Rating(day, *row[2:]))
+    return table
+##############################################################  records(syms)
+
+
+################################################################################
+# close()
+# Writes anything still buffered and closes the file.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def close(self):
+    with self.lock:
+      self.write()
+    self.db.close()
+#######################################################################  close()
+
+
+################################################################################
+# record(row) / change(text) / price(text) <static>
+# Parses a ratings row (as in FinOne.rate) into a Rating; a rating or target
+#  column ('Hold -> Buy', '$10 -> $12', or just the new one) into (before,
+#  after); and a price ('$1,234.50') into a float, or None.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def record(row):
+    try:
+      day = datetime.strptime(row[0], '%b-%d-%y').date()
+    except ValueError:
+      day = None
+    action = row[1].strip().lower()
+    firm = row[3].strip() if len(row) > 3 else u''
+    before, after = Ratings.change(row[2])
+    low, high = Ratings.change(row[4] if len(row) > 4 else u'')
+    return Rating(day, action, firm, before, after, Ratings.price(low),
+                  Ratings.price(high))
+
+  @staticmethod
+  def change(text):
+    parts = Ratings.arrow_re.split(text.strip())
+    parts = [p.strip() or None for p in parts]
+    if len(parts) == 1:
+      return None, parts[0]
+    return parts[0], parts[-1]
+
+  @staticmethod
+  def price(text):
+    if text is None:
+      return None
+    found = Ratings.price_re.search(text)
+    if found is None:
+      return None
+    return float(found.group(0).replace(',', ''))
+##########################################  record() / change() / price() <static>
+
+
+################################################################################
+# score(table, asof, window, half_life) <static>
+# Scores the ratings of every symbol at once.  Each rating scores the
+#  direction of its action, the level of its new rating and the relative
+#  change of its price target (capped at def_target_cap either way), weighted
+#  by def_weights; ratings are then summed per symbol.  With a window, only
+#  ratings from the last window days up to asof count; with a half-life,
+#  each is decayed by its age.  Ratings without a date only count when
+#  there's neither.
+#
+# @param table     - dict of symbol -> list of Rating (as from records())
+# @param asof      - date to score as of
+# @param window    - number of days (1 for just asof), or None for all
+# @param half_life - days for a rating to decay to half, or None for no decay
+#
+# @return dict of symbol -> score
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def score(table, asof, window=None, half_life=None):
+    import numpy as np
+
+    syms = sorted(table)
+    flat = [(i, r) for i, sym in enumerate(syms) for r in table[sym]]
+    if len(flat) == 0:
+      return dict((sym, 0.0) for sym in syms)
+
+    nan = float('nan')
+    owner = np.array([i for i, r in flat], dtype=np.intp)
+    action = np.array([Ratings.actions.get(r.action, 0) for i, r in flat],
+                      dtype=float)
+    level = np.array([Ratings.levels.get((r.rating_to or u'').lower(), 0)
+                      for i, r in flat], dtype=float)
+    low = np.array([nan if r.target_from is None else r.target_from
+                    for i, r in flat], dtype=float)
+    high = np.array([nan if r.target_to is None else r.target_to
+                     for i, r in flat], dtype=float)
+    day = np.array([r.day.toordinal() if r.day else 0 for i, r in flat],
+                   dtype=float)
+
+    #relative target change, where there was a target before & after
+    moved = np.isfinite(low) & np.isfinite(high) & (low > 0)
+    target = np.zeros(len(flat))
+    target[moved] = high[moved] / low[moved] - 1.0
+    target = np.clip(target, -Ratings.def_target_cap, Ratings.def_target_cap)
+
+    w = Ratings.def_weights
+    each = w['action'] * action + w['level'] * level + w['target'] * target
+
+    #which ratings count, and how much, by age
+    age = asof.toordinal() - day
+    weight = np.ones(len(flat))
+    if window is not None or half_life is not None:
+      weight[(day == 0) | (age < 0)] = 0.0
+    if window is not None:
+      weight[age >= window] = 0.0
+    if half_life is not None:
+      weight *= 0.5 ** (np.maximum(age, 0) / float(half_life))
+
+    totals = np.bincount(owner, weights=each * weight, minlength=len(syms))
+    return dict((sym, float(totals[i])) for i, sym in enumerate(syms))
+##########################################  score(table, asof, ...) <static>
+
+#//yassRatings.py
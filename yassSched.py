@@ -0,0 +1,343 @@
+################################################################################
+# File:    yassSched.py
+# Author:  Ryan Yusko
+#
+# Job scheduler shared by the Finviz and history threads.  Worker threads ask
+# the scheduler for their next job instead of pulling from a plain Queue; the
+# scheduler only hands one out when
+#   - the job's retry backoff has elapsed,
+#   - the concurrency limit allows another request in flight, and
+#   - the host's token bucket has a token available.
+# Concurrency is adjusted AIMD-style: it grows additively while responses are
+# quick and successful, and is halved on errors, slow responses or throttling
+# (HTTP 429/503), which also halves the host's request rate.  Each job has a
+# capped retry budget with exponential backoff, so a run always ends.
+#
+# Workers can also record each attempt's outcome in a StatusTable, which says
+# whether a failure is worth retrying at all and reports per job at the end.
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import os, threading, time, heapq, random, csv
+
+################################################################################
+# class TokenBucket
+# Classic token bucket: holds up to 'burst' tokens and refills at 'rate'
+#  tokens per second.  Not thread-safe on its own; the Scheduler serializes
+#  access under its lock.
+#
+# @created 10/18/26
+# @updated 10/18/26
+class TokenBucket:
+  def __init__(self, rate, burst):
+    self.rate = float(rate)
+    self.base_rate = float(rate)
+    self.burst = float(burst)
+    self.tokens = float(burst)
+    self.stamp = time.time()
+
+  #takes a token if one is available, returning 0; otherwise returns the
+  # number of seconds until one will be
+  def take(self, now):
+    self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+    self.stamp = now
+    if self.tokens >= 1.0:
+      self.tokens -= 1.0
+      return 0
+    return (1.0 - self.tokens) / self.rate
+###########################################################  class TokenBucket
+
+
+################################################################################
+# class Scheduler
+# Hands jobs out to worker threads; see the file header for the policy.
+#
+# @created 10/18/26
+# @updated 10/18/26
+class Scheduler:
+  def_rate = 10.0      #default requests per second, per host
+  def_burst = 10       #default token bucket size
+  def_start = 4        #default starting concurrency
+  def_retries = 4      #default number of retries per job
+  def_backoff = 1.0    #default first retry delay (seconds), doubled per retry
+  def_max_backoff = 60.0 #longest we'll ever wait before a retry (seconds)
+  def_slow = 10.0      #responses slower than this (seconds) count as congestion
+
+  throttle_codes = (429, 503) #statuses that mean the host wants us to slow down
+
+################################################################################
+# __init__(jobs, ...)
+# Initializes the scheduler with the jobs to run.
+#
+# @param jobs     - list of (hashable) jobs, e.g. symbols or history tuples
+# @param hostOf   - function(job) returning the host a job talks to; all jobs
+#                   share one host if not given
+# @param rate     - requests per second allowed per host
+# @param burst    - token bucket size per host
+# @param start    - starting concurrency
+# @param most     - concurrency ceiling (normally the number of worker threads)
+# @param retries  - number of retries a job gets after its first attempt
+# @param backoff  - first retry delay (seconds); doubled for each retry
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, jobs, hostOf=None, rate=def_rate, burst=def_burst,
+               start=def_start, most=20, retries=def_retries,
+               backoff=def_backoff):
+    self.hostOf = hostOf
+    self.rate = rate
+    self.burst = burst
+    self.most = max(1, most)
+    self.limit = float(min(start, self.most))
+    self.retries = retries
+    self.backoff = backoff
+
+    self.cond = threading.Condition()
+    self.buckets = dict()
+
+    #heap of (ready time, sequence, job) -- sequence keeps the original order
+    # for jobs that are ready at the same time
+    self.ready = []
+    self.seq = 0
+    self.attempts = dict()
+    for job in jobs:
+      if job not in self.attempts:
+        self.push(job, 0)
+        self.attempts[job] = 0
+
+    self.active = 0
+    self.outstanding = len(self.attempts)
+    self.last_cut = 0
+
+    #results & counters for reporting
+    self.failed = []
+    self.done = 0
+    self.errors = 0
+    self.throttled = 0
+    self.peak = int(self.limit)
+########################################################  __init__(jobs, ...)
+
+
+################################################################################
+# get()
+# Blocks until a job may start, and returns it.  Returns None once every job
+#  has either finished or used up its retries, which is the worker thread's
+#  signal to exit.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def get(self):
+    with self.cond:
+      while 1:
+        if self.outstanding == 0:
+          return None
+
+        wait = None
+        if self.ready and self.active < int(self.limit):
+          now = time.time()
+          when, seq, job = self.ready[0]
+          if when <= now:
+            wait = self.bucket(job).take(now)
+            if wait == 0:
+              heapq.heappop(self.ready)
+              self.active += 1
+              self.attempts[job] += 1
+              return job
+          else:
+            wait = when - now
+
+        #nothing startable yet...sleep until a job finishes or is ready
+        self.cond.wait(wait)
+#########################################################################  get()
+
+
+################################################################################
+# success(job, latency)
+# Reports a finished job.  Quick responses grow the concurrency limit by
+#  roughly one per limit's worth of successes; slow ones cut it.
+#
+# @param job     - job returned by get()
+# @param latency - seconds the job took
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def success(self, job, latency):
+    with self.cond:
+      self.active -= 1
+      self.outstanding -= 1
+      self.done += 1
+
+      if latency > Scheduler.def_slow:
+        self.cut()
+      else:
+        self.limit = min(self.most, self.limit + 1.0 / self.limit)
+        self.peak = max(self.peak, int(self.limit))
+
+        #let a throttled host's rate creep back up
+        bucket = self.bucket(job)
+        bucket.rate = min(bucket.base_rate, bucket.rate + 0.05*bucket.base_rate)
+
+      self.cond.notify_all()
+###########################################################  success(job, ...)
+
+
+################################################################################
+# failure(job, status)
+# Reports a failed job.  The concurrency limit is halved, and a throttling
+#  status also halves the host's request rate.  The job is queued again after
+#  an exponentially growing (jittered) delay, unless it is out of retries (or
+#  isn't to be retried at all).
+#
+# @param job    - job returned by get()
+# @param status - HTTP status of the failed response, if there was one
+# @param retry  - False to give up on the job now
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def failure(self, job, status=None, retry=True):
+    with self.cond:
+      self.active -= 1
+      self.errors += 1
+      self.cut()
+
+      if status in Scheduler.throttle_codes:
+        self.throttled += 1
+        bucket = self.bucket(job)
+        bucket.rate = max(bucket.base_rate / 16.0, bucket.rate / 2.0)
+
+      tries = self.attempts[job]
+      if tries > self.retries or not retry:
+        self.failed.append(job)
+        self.outstanding -= 1
+      else:
+        delay = min(Scheduler.def_max_backoff, self.backoff * 2 ** (tries-1))
+        self.push(job, time.time() + delay * random.uniform(0.5, 1.0))
+
+      self.cond.notify_all()
+############################################################  failure(job, ...)
+
+
+################################################################################
+# cut()
+# Multiplicative decrease of the concurrency limit.  A burst of failures from
+#  requests that were all in flight together only counts once, so we cut at
+#  most once a second.  Caller must hold self.cond.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def cut(self):
+    now = time.time()
+    if now - self.last_cut >= 1.0:
+      self.limit = max(1.0, self.limit / 2.0)
+      self.last_cut = now
+#########################################################################  cut()
+
+
+################################################################################
+# push(job, when) / bucket(job)
+# Queues a job to become ready at 'when', and returns the token bucket for
+#  the job's host.  Caller must hold self.cond (or be __init__).
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def push(self, job, when):
+    heapq.heappush(self.ready, (when, self.seq, job))
+    self.seq += 1
+
+  def bucket(self, job):
+    host = self.hostOf(job) if self.hostOf is not None else None
+    if host not in self.buckets:
+      self.buckets[host] = TokenBucket(self.rate, self.burst)
+    return self.buckets[host]
+##############################################################  push() / bucket()
+
+
+################################################################################
+# summary()
+# Returns a one-line summary of the run, for logging.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def summary(self):
+    with self.cond:
+      return '%i done, %i failed, %i errors (%i throttled), ' \
+             'peak concurrency %i, final %i' % \
+                (self.done, len(self.failed), self.errors, self.throttled,
+                 self.peak, int(self.limit))
+#####################################################################  summary()
+
+
+################################################################################
+# class StatusTable
+# Thread-safe table of each job's latest outcome (keyed by, e.g., symbol):
+#  attempts, HTTP status, bytes received, rows parsed, error and time taken.
+#  record() says whether a failed job is worth retrying, in O(1): statuses
+#  that won't change on a retry (def_permanent) aren't.
+#
+# @created 10/18/26
+# @updated 10/18/26
+class StatusTable:
+  def_permanent = (400, 401, 403, 404, 410) #statuses not worth retrying
+  columns = ['key', 'ok', 'attempts', 'status', 'bytes', 'rows', 'error',
+             'seconds']
+
+  def __init__(self):
+    self.lock = threading.Lock()
+    self.table = dict()
+
+  #records an attempt at a job, and returns whether (if it failed) to retry
+  def record(self, key, ok, status=None, size=0, rows=0, error=None,
+             seconds=0.0):
+    with self.lock:
+      entry = self.table.get(key)
+      attempts = entry['attempts'] + 1 if entry is not None else 1
+      self.table[key] = {'key' : key, 'ok' : ok, 'attempts' : attempts,
+                         'status' : status, 'bytes' : size, 'rows' : rows,
+                         'error' : error, 'seconds' : round(seconds, 3)}
+    return not ok and status not in StatusTable.def_permanent
+
+  #whether a job's latest attempt succeeded (False if it never ran)
+  def ok(self, key):
+    with self.lock:
+      entry = self.table.get(key)
+      return entry is not None and entry['ok']
+
+  #the jobs whose latest attempt failed
+  def failed(self):
+    with self.lock:
+      return sorted(k for k, e in self.table.iteritems() if not e['ok'])
+
+  #writes one row per job to a csv file
+  def save(self, filename):
+    with self.lock:
+      entries = [self.table[k] for k in sorted(self.table)]
+    if not os.path.exists(os.path.dirname(filename) or '.'):
+      os.makedirs(os.path.dirname(filename))
+    with open(filename + '.tmp', 'wb') as f:
+      out = csv.writer(f)
+      out.writerow(StatusTable.columns)
+      for e in entries:
+        out.writerow(['' if e[c] is None else e[c] 
+                      for c in StatusTable.columns])
+    os.rename(filename + '.tmp', filename)
+
+  #one-line summary for logging
+  def summary(self):
+    with self.lock:
+      entries = self.table.values()
+    bad = [e for e in entries if not e['ok']]
+    codes = dict()
+    for e in bad:
+      what = e['status'] if e['status'] is not None else (e['error'] or '?')
+      codes[what] = codes.get(what, 0) + 1
+    return '%i ok, %i failed%s, %i bytes, %i rows, %i attempts' % \
+             (len(entries) - len(bad), len(bad),
+              ' (%s)' % ', '.join('%s: %i' % (k, codes[k]) 
+                                  for k in sorted(codes)) if codes else '',
+              sum(e['bytes'] for e in entries),
+              sum(e['rows'] for e in entries),
+              sum(e['attempts'] for e in entries))
+##################################################################  class StatusTable
+
+#//yassSched.py
@@ -0,0 +1,168 @@
+################################################################################
+# File:    yassScore.py
+# Author:  Ryan Yusko
+#
+# Batch sentiment scoring for Rank.  The metapy analyzer chain (tokenizer,
+# length filter, stopword list, lowercase, unigram analyzer) is built once
+# and every document is streamed through it, rather than rebuilding the
+# chain (and re-reading the stopword list) for each document.  The result is
+# a table of symbol -> (score, tokens).
+#
+# Running this file times the batch scorer against the per-document path
+# (Rank.score) over synthetic documents:
+#   python yassScore.py {documents=10000}
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import sys, time, metapy
+from yassLexicon import Lexicon
+
+class BatchScorer:
+  def_stopwords = 'config/lemur-stopwords.txt'
+
+################################################################################
+# __init__(lexicon, stopwords)
+# Builds the analyzer chain that every document will go through.
+#
+# @param lexicon   - Lexicon of sentiments (yassLexicon.py)
+# @param stopwords - stopword list for the ListFilter
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, lexicon, stopwords=def_stopwords):
+    self.lexicon = lexicon
+
+    #same chain Rank has always used (see Rank.score)
+    tok = metapy.analyzers.ICUTokenizer(suppress_tags=True)
+    tok = metapy.analyzers.LengthFilter(tok, min=2, max=30)
+    tok = metapy.analyzers.ListFilter(tok, stopwords, metapy.analyzers.ListFilter.Type.Reject)
+    tok = metapy.analyzers.LowercaseFilter(tok)
+    self.analyzer = metapy.analyzers.NGramWordAnalyzer(1, tok)
+
+    #what the scores depend on, for caches of them (yassMemo.py)
+    self.version = 'unigram:' + lexicon.version
+
+    #documents and tokens scored so far
+    self.documents = 0
+    self.tokens = 0
+###################################################  __init__(lexicon, stopwords)
+
+
+################################################################################
+# score(text)
+# Scores one (utf-8 encoded) document.
+#
+# @param text - text to score
+#
+# @return (score, tokens) - sentiment score, and the number of tokens left
+#                           after filtering
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def score(self, text):
+    vec = self.counts(text)
+
+    tokens = sum(vec[word] for word in vec)
+    self.documents += 1
+    self.tokens += tokens
+    return self.lexicon.score(vec), tokens
+##################################################################  score(text)
+
+
+################################################################################
+# counts(text)
+# Runs one (utf-8 encoded) document through the analyzer chain.
+#
+# @param text - text to analyze
+#
+# @return metapy feature vector of term -> count
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def counts(self, text):
+    doc = metapy.index.Document()
+    doc.content(text.decode('utf-8').strip())
+    return self.analyzer.analyze(doc)
+#################################################################  counts(text)
+
+
+################################################################################
+# run(documents)
+# Scores a stream of documents.
+#
+# @param documents - iterable of (symbol, utf-8 text); a generator keeps only
+#                    one document in memory at a time
+#
+# @return dict of symbol -> (score, tokens)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def run(self, documents):
+    table = dict()
+    for sym, text in documents:
+      table[sym] = self.score(text)
+    return table
+##############################################################  run(documents)
+
+
+################################################################################
+# benchmark(texts, lexicon) <static>
+# Times the per-document path (Rank.score, which builds the analyzer for each
+#  document) against the batch scorer over the same texts, and checks that
+#  they agree.
+#
+# @param texts   - list of utf-8 documents
+# @param lexicon - Lexicon of sentiments
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def benchmark(texts, lexicon):
+    from yassRank import Rank
+
+    start = time.time()
+    single = [Rank.score(text, lexicon) for text in texts]
+    per_doc = time.time() - start
+
+    start = time.time()
+    scorer = BatchScorer(lexicon)
+    batch = [scorer.score(text)[0] for text in texts]
+    batched = time.time() - start
+
+    print '%i documents, %i tokens' % (len(texts), scorer.tokens)
+    print '  per document: %.2fs (%.3f ms/doc)' % \
+            (per_doc, 1000.0 * per_doc / len(texts))
+    print '  batch:        %.2fs (%.3f ms/doc), %.1fx' % \
+            (batched, 1000.0 * batched / len(texts), per_doc / max(batched, 1e-6))
+    print '  scores %s' % ('agree' if single == batch else 'DISAGREE')
+    return single == batch
+#############################################  benchmark(texts, lexicon) <static>
+
+
+################################################################################
+# __main__
+# Benchmarks over synthetic documents, mined from the fixture's quote pages
+#  (yassFixture.py) as Finviz would write them.  Exits non-zero if the two
+#  paths disagree.
+#
+# @created 10/18/26
+# @updated 10/18/26
+if __name__ == '__main__':
+  from yassFixture import Fixture
+  from yassFinOne import FinOne
+
+  n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+  texts = list()
+  for sym in Fixture.symbols(n):
+    fv1 = FinOne(sym)
+    fv1.parse(Fixture.quotePage(sym))
+    lines = ['%s, %s, %s\n' % tuple(r[:3]) for r in fv1.rate]
+    lines.extend('%s, %s\n' % (s[0], s[1]) for s in fv1.news)
+    texts.append(u''.join(lines).encode('utf-8'))
+
+  if not BatchScorer.benchmark(texts, Lexicon.load()):
+    exit(1)
+######################################################################  __main__
+
+#//yassScore.py
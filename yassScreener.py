@@ -0,0 +1,226 @@
+################################################################################
+# File:    yassScreener.py
+# Author:  Ryan Yusko
+#
+# Class that pulls tabular data for many tickers per request from finviz's
+# paginated screener views, instead of one quote page per ticker.  Tickers
+# are sent in chunks (t=AAPL,GOOG,...), and each chunk comes back 20 rows to
+# a page (r=1, 21, 41, ...), so a universe of n symbols takes about n/20
+# requests.  Every page a chunk needs is known up front, so the pages are
+# spread over threads through the shared Scheduler (yassSched.py).
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import threading, time, csv
+from bs4 import BeautifulSoup
+from yassFinOne import FinOne
+from yassSched import Scheduler
+
+class Screener:
+  base_url = "https://finviz.com/screener.ashx?v=111&t=TTTT&r=RRRR"
+  def_chunk = 100       #default number of tickers per screener query
+  def_rows = 20         #rows finviz shows per screener page
+  def_connections = 10  #default maximum number of threads
+  def_rate = 10.0       #default maximum requests per second to finviz
+
+################################################################################
+# class ScreenerThread
+# Establishes a thread for loading screener pages.  Pages are handed out by
+#  the Scheduler as (chunk number, first row) jobs, and the parsed rows are
+#  merged into the screener's table.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  class ScreenerThread(threading.Thread):
+    def __init__(self, sched, screener):
+      threading.Thread.__init__(self)
+      self.sched = sched
+      self.sc = screener
+
+    def run(self):
+      while 1:
+        job = self.sched.get()
+        if job is None:
+          raise SystemExit
+
+        chunk, row = job
+        url = self.sc.pageUrl(self.sc.chunks[chunk], row)
+
+        start = time.time()
+        try:
+          html = FinOne.fetch(url, self.sc.pool, self.sc.cache)
+          columns, rows = Screener.parse(html)
+          self.sc.merge(columns, rows)
+          self.sc.yp.log('retrieved %s (ScreenerThread.run)' % url)
+          self.sched.success(job, time.time() - start)
+        except IOError as ioe:
+          self.sc.yp.log('IOError loading %s: %s (ScreenerThread.run)' %
+                            (url, ioe))
+          self.sched.failure(job, getattr(ioe, 'status', None))
+        except Exception as e:
+          self.sc.yp.log('error parsing %s: %r (ScreenerThread.run)' %
+                            (url, e))
+          self.sched.failure(job)
+########################################################  class ScreenerThread
+
+
+################################################################################
+# __init__(yp, symbols, pool, cache)
+# Initializes the screener for a list of symbols.  Call fetch() to retrieve.
+#
+# @param yp      - Param() object from yassParam.py that handles logging
+# @param symbols - list of symbols to screen
+# @param pool    - optional ConnPool (yassConn.py) shared with other fetches
+# @param cache   - optional HttpCache (yassCache.py) shared with other fetches
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, yp, symbols, pool=None, cache=None):
+    self.yp = yp
+    self.pool = pool
+    self.cache = cache
+
+    #finviz doesn't know about the '^' we sometimes put in front of symbols
+    self.symbols = [sym[1:] if sym[0] == '^' else sym for sym in symbols]
+    self.chunks = [self.symbols[i:i + Screener.def_chunk]
+                   for i in range(0, len(self.symbols), Screener.def_chunk)]
+    self.wanted = set(self.symbols)
+
+    #symbol -> {column : value}, and the columns in the order finviz shows them
+    self.table = dict()
+    self.columns = []
+    self.lock = threading.Lock()
+
+    #number of pages requested
+    self.requests = 0
+#####################################################  __init__(yp, symbols, ...)
+
+
+################################################################################
+# fetch()
+# Retrieves every screener page needed to cover the symbols, and returns the
+#  table of symbol -> {column : value}.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def fetch(self):
+    jobs = []
+    for chunk in range(len(self.chunks)):
+      for row in range(1, len(self.chunks[chunk]) + 1, Screener.def_rows):
+        jobs.append((chunk, row))
+    self.requests = len(jobs)
+
+    sched = Scheduler(jobs, rate=Screener.def_rate,
+                      most=Screener.def_connections)
+
+    threads = []
+    for dummy in range(min(Screener.def_connections, len(jobs))):
+      t = self.ScreenerThread(sched, self)
+      t.start()
+      threads.append(t)
+
+    for thread in threads:
+      thread.join()
+
+    self.yp.log('scheduler: %s (Screener.fetch)' % sched.summary())
+    return self.table
+#######################################################################  fetch()
+
+
+################################################################################
+# merge(columns, rows)
+# Adds the rows parsed from one screener page to the table.  Rows for symbols
+#  we didn't ask for are ignored (finviz repeats its last page when asked for
+#  rows past the end of a chunk whose symbols weren't all found).
+#
+# @param columns - column headers of the page
+# @param rows    - list of cell lists, one per ticker
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def merge(self, columns, rows):
+    with self.lock:
+      if not self.columns:
+        self.columns = columns
+      for cells in rows:
+        entry = dict(zip(columns, cells))
+        sym = entry.get('Ticker')
+        if sym in self.wanted:
+          self.table[sym] = entry
+##########################################################  merge(columns, rows)
+
+
+################################################################################
+# missing()
+# Returns the symbols that didn't show up in any screener page.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def missing(self):
+    return [sym for sym in self.symbols if sym not in self.table]
+#####################################################################  missing()
+
+
+################################################################################
+# write(filename)
+# Writes the table to a csv file, one row per symbol in symbol list order.
+#
+# @param filename - path of the csv file to write
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def write(self, filename):
+    with open(filename, 'wb') as f:
+      out = csv.writer(f)
+      out.writerow([col.encode('utf-8') for col in self.columns])
+      for sym in self.symbols:
+        if sym in self.table:
+          out.writerow([self.table[sym].get(col, u'').encode('utf-8')
+                        for col in self.columns])
+#############################################################  write(filename)
+
+
+################################################################################
+# pageUrl(tickers, row)
+# Returns the url of a screener page for the passed tickers, starting at row.
+#
+# @param tickers - list of symbols to screen
+# @param row     - 1-based first row of the page
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def pageUrl(self, tickers, row):
+    return Screener.base_url.replace('TTTT', ','.join(tickers)) \
+                            .replace('RRRR', str(row))
+#####################################################  pageUrl(tickers, row)
+
+
+################################################################################
+# parse(html) <static>
+# Extracts the column headers and ticker rows from a screener page, parsing
+#  only the regions of FinOne's 'screener' extraction profile.
+#
+# @param html - raw html of a finviz screener page
+#
+# @return (columns, rows) - list of column headers, and a list of cell lists
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def parse(html):
+    soup = BeautifulSoup(html, "html.parser",
+                         parse_only=FinOne.strainer('screener'))
+
+    columns = []
+    rows = []
+    for tag in soup.find_all(['td', 'tr'], recursive=False):
+      if tag.name == 'tr':
+        rows.append([td.text.strip() for td in tag.find_all('td')])
+      else:
+        columns.append(tag.text.strip())
+
+    return columns, rows
+#################################################################  parse(html)
+
+#//yassScreener.py
@@ -0,0 +1,244 @@
+################################################################################
+# File:    yassStore.py
+# Author:  Ryan Yusko
+#
+# Single-file (SQLite) storage for mined ratings and headlines, as an
+# alternative to one docs/SYM.txt file per symbol.  Rows are buffered and
+# written in batches, one transaction per batch, and both tables are indexed
+# by symbol and date so readers can pull a symbol (or a date range of it)
+# without scanning everything.
+#
+# Dates are stored as ISO strings (2017-12-18) so that they sort and compare
+# correctly in range queries; finviz's placeholder date is stored as NULL.
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import sqlite3, threading
+from datetime import datetime
+from yassWatermark import Watermarks
+
+class Store:
+  def_name = './docs/yass.db' #default database file
+  def_batch = 2000            #default number of rows buffered per transaction
+
+  schema = ['CREATE TABLE IF NOT EXISTS ratings ('
+            '  symbol TEXT NOT NULL, day TEXT, action TEXT, rating TEXT)',
+            'CREATE INDEX IF NOT EXISTS ratings_symbol_day '
+            '  ON ratings (symbol, day)',
+            'CREATE TABLE IF NOT EXISTS headlines ('
+            '  symbol TEXT NOT NULL, day TEXT, time TEXT, headline TEXT,'
+            '  link TEXT, source TEXT, hash TEXT NOT NULL)',
+            'CREATE UNIQUE INDEX IF NOT EXISTS headlines_symbol_hash '
+            '  ON headlines (symbol, hash)',
+            'CREATE INDEX IF NOT EXISTS headlines_symbol_day '
+            '  ON headlines (symbol, day)',
+            'CREATE INDEX IF NOT EXISTS headlines_day ON headlines (day)']
+
+################################################################################
+# __init__(name)
+# Opens (creating if need be) the database.  The connection is shared by all
+#  threads, serialized by self.lock.
+#
+# @param name - path of the database file
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, name=def_name):
+    self.name = name
+    self.lock = threading.Lock()
+    self.db = sqlite3.connect(name, check_same_thread=False)
+    self.db.execute('PRAGMA journal_mode=WAL')
+    self.db.execute('PRAGMA synchronous=NORMAL')
+    with self.db:
+      for statement in Store.schema:
+        self.db.execute(statement)
+
+    #rows waiting for the next batch, the symbols they're for, and the
+    # symbols whose stored rows the batch replaces
+    self.pending_rate = []
+    self.pending_news = []
+    self.batched = set()
+    self.clear = set()
+    self.written = 0
+###############################################################  __init__(name)
+
+
+################################################################################
+# add(sym, rate, news)
+# Buffers a symbol's ratings and news stories (as in FinOne.rate/FinOne.news)
+#  and writes a batch once enough rows are waiting.  Headlines already stored
+#  for the symbol are skipped.
+#
+# @param sym  - symbol the rows belong to
+# @param rate - list of [date, action, rating change]
+# @param news - list of [date, headline, time, link, source]
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def add(self, sym, rate, news):
+    rate_rows = [(sym, Store.day(r[0]), r[1], r[2]) for r in rate]
+    news_rows = [(sym, Store.day(n[0]), n[2], n[1], n[3], n[4],
+                  Watermarks.digest(n)) for n in news]
+
+    with self.lock:
+      self.pending_rate.extend(rate_rows)
+      self.pending_news.extend(news_rows)
+      self.batched.add(sym)
+      if len(self.pending_rate) + len(self.pending_news) >= Store.def_batch:
+        self.write()
+#######################################################  add(sym, rate, news)
+
+
+################################################################################
+# replace(sym)
+# Removes everything stored for a symbol, before it is mined from scratch.
+#  Buffered rows for the symbol are dropped, and the stored ones are deleted
+#  by the next write(), in the same transaction as the batch.
+#
+# @param sym - symbol to clear
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def replace(self, sym):
+    with self.lock:
+      self.clear.add(sym)
+      if sym in self.batched:
+        self.pending_rate = [row for row in self.pending_rate if row[0] != sym]
+        self.pending_news = [row for row in self.pending_news if row[0] != sym]
+        self.batched.discard(sym)
+#################################################################  replace(sym)
+
+
+################################################################################
+# flush()
+# Writes whatever is still buffered.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def flush(self):
+    with self.lock:
+      self.write()
+#######################################################################  flush()
+
+
+################################################################################
+# write()
+# Writes the buffered rows in a single transaction, after deleting the
+#  stored rows of the symbols they replace.  Caller holds self.lock.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def write(self):
+    if not self.pending_rate and not self.pending_news and not self.clear:
+      return
+    with self.db:
+      clear = [(sym,) for sym in self.clear]
+      self.db.executemany('DELETE FROM ratings WHERE symbol = ?', clear)
+      self.db.executemany('DELETE FROM headlines WHERE symbol = ?', clear)
+      self.db.executemany('INSERT INTO ratings VALUES (?, ?, ?, ?)',
+                          self.pending_rate)
+      self.db.executemany('INSERT OR IGNORE INTO headlines '
+                          'VALUES (?, ?, ?, ?, ?, ?, ?)', self.pending_news)
+    self.written += len(self.pending_rate) + len(self.pending_news)
+    self.pending_rate = []
+    self.pending_news = []
+    self.batched = set()
+    self.clear = set()
+#######################################################################  write()
+
+
+################################################################################
+# ratings(sym, start, end) / headlines(sym, start, end)
+# Range queries: a symbol's ratings or headlines, newest first, optionally
+#  limited to days between start and end (inclusive, ISO date strings).
+#
+# @param sym   - symbol to look up
+# @param start - first day to include, or None
+# @param end   - last day to include, or None
+#
+# @return list of (day, action, rating) or (day, time, headline, link, source)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def ratings(self, sym, start=None, end=None):
+    where, args = Store.between(sym, start, end)
+    with self.lock:
+      return self.db.execute('SELECT day, action, rating FROM ratings '
+                             'WHERE ' + where + ' ORDER BY day DESC, rowid',
+                             args).fetchall()
+
+  def headlines(self, sym, start=None, end=None):
+    where, args = Store.between(sym, start, end)
+    with self.lock:
+      return self.db.execute('SELECT day, time, headline, link, source '
+                             'FROM headlines WHERE ' + where +
+                             ' ORDER BY day DESC, rowid', args).fetchall()
+#####################################################  ratings() / headlines()
+
+
+################################################################################
+# document(sym, start, end)
+# Returns a symbol's stored ratings and headlines as utf-8 text, one per line
+#  in the same form as docs/SYM.txt, for ranking.
+#
+# @param sym   - symbol to look up
+# @param start - first day to include, or None
+# @param end   - last day to include, or None
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def document(self, sym, start=None, end=None):
+    lines = [u'%s, %s, %s\n' % (Store.finviz(d), a, r)
+             for d, a, r in self.ratings(sym, start, end)]
+    lines.extend(u'%s, %s\n' % (Store.finviz(d), h)
+                 for d, t, h, l, s in self.headlines(sym, start, end))
+    return u''.join(lines).encode('utf-8')
+###################################################  document(sym, start, end)
+
+
+################################################################################
+# close()
+# Writes anything still buffered and closes the database.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def close(self):
+    self.flush()
+    self.db.close()
+#######################################################################  close()
+
+
+################################################################################
+# between(sym, start, end) / day(date) / finviz(day) <static>
+# Helpers: the where clause for a range query, and finviz date <-> ISO day.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def between(sym, start, end):
+    where = 'symbol = ?'
+    args = [sym]
+    if start is not None:
+      where += ' AND day >= ?'
+      args.append(start)
+    if end is not None:
+      where += ' AND day <= ?'
+      args.append(end)
+    return where, args
+
+  @staticmethod
+  def day(date):
+    try:
+      return datetime.strptime(date, '%b-%d-%y').strftime('%Y-%m-%d')
+    except ValueError:
+      return None
+
+  @staticmethod
+  def finviz(day):
+    if day is None:
+      return 'Jan-00-00'
+    return datetime.strptime(day, '%Y-%m-%d').strftime('%b-%d-%y')
+##########################################################  helpers <static>
+
+#//yassStore.py
@@ -0,0 +1,212 @@
+################################################################################
+# File:    yassTopK.py
+# Author:  Ryan Yusko
+#
+# Streaming selection and export of Rank's results.  TopK keeps the k best and
+# k worst scores seen so far in two bounded heaps, so they can be read at any
+# time while scores are still arriving, without sorting the whole universe.
+# Export writes the full ranking (csv or json) by external merge sort:
+# scores are sorted in runs of def_run that are spilled to temporary files,
+# and the runs are merged into the ranked file as they're read back, so
+# memory stays bounded however many symbols there are.  Until the ranked file
+# is written, each score is also appended to an unsorted csv next to it
+# (e.g. ranking-export.unsorted.csv) as soon as it's known, so results can be
+# read while ranking is still going.
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import os, heapq, json, csv, tempfile
+
+################################################################################
+# class TopK
+# The k highest and k lowest (score, symbol) pairs seen.  Ties are broken by
+#  symbol, so the selection doesn't depend on the order scores arrive in.
+#
+# @created 10/18/26
+# @updated 10/18/26
+class TopK:
+  def __init__(self, k=5):
+    self.k = k
+    self.high = []  #min-heap of the k highest: the weakest of them on top
+    self.low = []   #min-heap of the k lowest, negated
+    self.seen = 0
+
+  #adds a symbol's score
+  def add(self, sym, score):
+    self.seen += 1
+    if self.k <= 0:
+      return
+    if len(self.high) < self.k:
+      heapq.heappush(self.high, (score, sym))
+    elif (score, sym) > self.high[0]:
+      heapq.heapreplace(self.high, (score, sym))
+
+    item = (-score, TopK.Reverse(sym))
+    if len(self.low) < self.k:
+      heapq.heappush(self.low, item)
+    elif item > self.low[0]:
+      heapq.heapreplace(self.low, item)
+
+  #the k highest so far, best first, as (symbol, score)
+  def top(self):
+    return [(sym, score) for score, sym in sorted(self.high, reverse=True)]
+
+  #the k lowest so far, worst first, as (symbol, score)
+  def bottom(self):
+    return [(r.sym, -score) for score, r in sorted(self.low, reverse=True)]
+
+  #symbol wrapper that sorts backwards, so that among equal (negated) scores
+  # the low heap keeps the same symbols a full sort would
+  class Reverse:
+    def __init__(self, sym):
+      self.sym = sym
+    def __lt__(self, other):
+      return self.sym > other.sym
+    def __gt__(self, other):
+      return self.sym < other.sym
+    def __eq__(self, other):
+      return self.sym == other.sym
+    def __le__(self, other):
+      return self.sym >= other.sym
+    def __ge__(self, other):
+      return self.sym <= other.sym
+######################################################################  class TopK
+
+
+class Export:
+  def_run = 100000 #scores sorted in memory before spilling a run to disk
+  def_flush = 1000 #scores appended to the unsorted csv between flushes
+
+################################################################################
+# __init__(filename, kind, run)
+# Starts a ranked export, and the unsorted csv scores are streamed to until
+#  it's written.  add() every score, then close() to write it (or abort() to
+#  give up on it).
+#
+# @param filename - file to write the ranking to
+# @param kind     - 'csv' or 'json'
+# @param run      - number of scores held in memory at a time
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, filename, kind='csv', run=def_run):
+    self.filename = filename
+    self.kind = kind
+    self.run = run
+    self.buffer = []
+    self.runs = []  #temporary files, each a sorted run
+    self.count = 0
+    
+    self.unsorted = os.path.splitext(filename)[0] + '.unsorted.csv'
+    self.stream = open(self.unsorted, 'wb')
+    self.rows = csv.writer(self.stream)
+    self.rows.writerow(['symbol', 'score', 'tokens'])
+    self.stream.flush()
+################################################  __init__(filename, kind, run)
+
+
+################################################################################
+# add(sym, score, tokens)
+# Adds a symbol's score (and the number of tokens it came from): appends it
+#  to the unsorted csv (flushed every def_flush scores), and spills a sorted
+#  run to disk once def_run of them are buffered.
+#
+# @param sym    - symbol
+# @param score  - its sentiment score
+# @param tokens - tokens in its document (or None)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def add(self, sym, score, tokens=None):
+    self.buffer.append((-score, sym, tokens))
+    self.count += 1
+    self.rows.writerow([sym, score, '' if tokens is None else tokens])
+    if self.count % Export.def_flush == 0:
+      self.stream.flush()
+    if len(self.buffer) >= self.run:
+      self.spill()
+###########################################################  add(sym, score, ...)
+
+
+################################################################################
+# spill()
+# Writes the buffered scores, sorted best first, to a temporary run file.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def spill(self):
+    self.buffer.sort()
+    f = tempfile.TemporaryFile()
+    for row in self.buffer:
+      f.write(json.dumps(row) + '\n')
+    f.seek(0)
+    self.runs.append(f)
+    self.buffer = []
+#######################################################################  spill()
+
+
+################################################################################
+# close()
+# Merges the runs (and whatever is still buffered) into the ranked file, best
+#  first: rank, symbol, score, tokens, and removes the unsorted csv once the
+#  ranked file is in place.  Returns the number of rows written.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def close(self):
+    self.buffer.sort()
+    streams = [(tuple(json.loads(line)) for line in f) for f in self.runs]
+    streams.append(iter(self.buffer))
+
+    tmp = self.filename + '.tmp'
+    with open(tmp, 'wb') as f:
+      if self.kind == 'json':
+        f.write('[\n')
+      else:
+        out = csv.writer(f)
+        out.writerow(['rank', 'symbol', 'score', 'tokens'])
+
+      for rank, (score, sym, tokens) in enumerate(heapq.merge(*streams)):
+        if self.kind == 'json':
+          f.write('%s%s\n' % (',' if rank > 0 else ' ',
+                              json.dumps({'rank' : rank + 1, 'symbol' : sym,
+                                          'score' : -score,
+                                          'tokens' : tokens})))
+        else:
+          out.writerow([rank + 1, sym, -score, '' if tokens is None else tokens])
+
+      if self.kind == 'json':
+        f.write(']\n')
+    os.rename(tmp, self.filename)
+    self.stream.close()
+    os.remove(self.unsorted)
+
+    for f in self.runs:
+      f.close()
+    self.runs = []
+    self.buffer = []
+    return self.count
+#######################################################################  close()
+
+
+################################################################################
+# abort()
+# Gives up on the export: closes and removes the unsorted csv (and any
+#  partly written ranked file) and drops the runs, leaving no file behind.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def abort(self):
+    self.stream.close()
+    for name in [self.unsorted, self.filename + '.tmp']:
+      if os.path.exists(name):
+        os.remove(name)
+
+    for f in self.runs:
+      f.close()
+    self.runs = []
+    self.buffer = []
+#######################################################################  abort()
+
+#//yassTopK.py
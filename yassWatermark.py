@@ -0,0 +1,163 @@
+################################################################################
+# File:    yassWatermark.py
+# Author:  Ryan Yusko
+#
+# Class that keeps a persisted, per-symbol watermark of the newest rating and
+# headline already mined, so that each run only has to append (and rank) the
+# ratings & headlines that are new since the last one.
+#
+# Finviz lists both newest first, so everything above the row matching the
+# watermark's hash (of the whole row, so two firms' ratings or two stories of
+# the same day are told apart) is new.  A row older than the watermark's date
+# ends the scan as well, in case the watermarked row itself has been taken
+# down.
+#
+# @created 10/18/26
+# @updated 10/18/26
+################################################################################
+import os.path, json, hashlib, threading
+from datetime import datetime
+
+class Watermarks:
+  def_name = 'watermarks.json' #default file name, kept with the mined docs
+  format = 2                   #version of the watermarks' hash
+
+################################################################################
+# __init__(prefix)
+# Loads the watermarks saved with the mined documents, if there are any.
+#
+# @param prefix - directory holding the mined documents (e.g. ./docs/)
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def __init__(self, prefix):
+    self.filename = os.path.join(prefix, Watermarks.def_name)
+    self.lock = threading.Lock()
+    try:
+      with open(self.filename, 'r') as f:
+        self.marks = json.load(f)
+    except (IOError, ValueError):
+      self.marks = dict()
+#############################################################  __init__(prefix)
+
+
+################################################################################
+# update(sym, rate, news)
+# Returns the ratings and headlines that are newer than the symbol's
+#  watermarks, and moves the watermarks up to the newest of each.  Watermarks
+#  of an older format are dropped, so the symbol counts as not seen.
+#
+# @param sym  - symbol the rows belong to
+# @param rate - ratings, newest first, as in FinOne.rate
+# @param news - news stories, newest first, as in FinOne.news
+#
+# @return (rate, news, seen) - the new ratings and stories, and whether the
+#                              symbol had been mined before
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def update(self, sym, rate, news):
+    with self.lock:
+      mark = self.marks.get(sym)
+      #a watermark saved before the whole row was hashed can't tell rows of
+      # its day apart, so the symbol is mined again from scratch
+      if mark is not None and not Watermarks.current(mark):
+        mark = None
+      seen = mark is not None
+      if not seen:
+        mark = {'rate' : None, 'news' : None}
+
+      new_rate = Watermarks.above(rate, mark['rate'])
+      new_news = Watermarks.above(news, mark['news'])
+
+      #the newest row becomes the watermark (keep the old one if there's none)
+      if len(rate) > 0:
+        mark['rate'] = Watermarks.mark(rate[0])
+      if len(news) > 0:
+        mark['news'] = Watermarks.mark(news[0])
+      self.marks[sym] = mark
+
+    return new_rate, new_news, seen
+######################################################  update(sym, rate, news)
+
+
+################################################################################
+# save()
+# Writes the watermarks back to disk.
+#
+# @created 10/18/26
+# @updated 10/18/26
+  def save(self):
+    with self.lock:
+      tmp = self.filename + '.tmp'
+      with open(tmp, 'w') as f:
+        json.dump(self.marks, f)
+      os.rename(tmp, self.filename)
+########################################################################  save()
+
+
+################################################################################
+# above(rows, mark) <static>
+# Returns the rows (newest first) that come before the watermark.
+#
+# @param rows - ratings or news rows; row[0] is the date, row[1] the text
+# @param mark - watermark, as returned by mark(), or None for no watermark
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def above(rows, mark):
+    if mark is None:
+      return list(rows)
+
+    since = Watermarks.day(mark['date'])
+    new = list()
+    for row in rows:
+      if Watermarks.digest(row) == mark['hash']:
+        break
+      day = Watermarks.day(row[0])
+      if since is not None and day is not None and day < since:
+        break
+      new.append(row)
+    return new
+###################################################  above(rows, mark) <static>
+
+
+################################################################################
+# mark(row) / current(mark) / digest(row) / day(date) <static>
+# Builds the watermark for a row: its date and a hash of the whole row (date,
+#  action, rating change, firm & price target of a rating; date, headline,
+#  time, link & source of a story).  current() says whether a symbol's
+#  watermarks are all of this format.  day() turns a finviz date (Dec-18-17)
+#  into a date object, or None for the placeholder date or anything else it
+#  can't read.
+#
+# @param row  - ratings or news row
+# @param mark - a symbol's watermarks, {'rate' : ..., 'news' : ...}
+# @param date - finviz date string
+#
+# @created 10/18/26
+# @updated 10/18/26
+  @staticmethod
+  def mark(row):
+    return {'date' : row[0], 'hash' : Watermarks.digest(row),
+            'format' : Watermarks.format}
+
+  @staticmethod
+  def current(mark):
+    return all(m is None or m.get('format') == Watermarks.format
+               for m in mark.values())
+
+  @staticmethod
+  def digest(row):
+    return hashlib.sha1(u'|'.join(row).encode('utf-8')).hexdigest()
+
+  @staticmethod
+  def day(date):
+    try:
+      return datetime.strptime(date, '%b-%d-%y').date()
+    except ValueError:
+      return None
+#########################################  mark() / current() / digest() / day()
+
+#//yassWatermark.py